@@ -1,2 +1,8 @@
 # App package initialization
+import sys
+from pathlib import Path
+
 __version__ = "1.0.0"
+
+# The `shared` package lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parents[3]))
@@ -1,9 +1,9 @@
 import asyncio
-import json
+from contextlib import aclosing
 from typing import Dict, Any, AsyncGenerator
 from datetime import datetime
-import httpx
 from app.config import config
+from app.llm_gateway import llm_gateway
 import logging
 
 logger = logging.getLogger(__name__)
@@ -108,33 +108,24 @@ Do NOT include:
 - Any explanatory notes about the post"""
 
         # Stream from Ollama
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            try:
-                async with client.stream(
-                    'POST',
-                    f'{self.ollama_url}/api/generate',
-                    json={
-                        'model': self.model,
-                        'prompt': prompt,
-                        'stream': True,
-                        'options': {
-                            'temperature': 0.7,
-                            'num_predict': 800
-                        }
-                    }
-                ) as response:
-                    response.raise_for_status()
-                    async for line in response.aiter_lines():
-                        if line:
-                            try:
-                                chunk = json.loads(line)
-                                if 'response' in chunk:
-                                    yield chunk['response']
-                            except json.JSONDecodeError:
-                                continue
-            except Exception as e:
-                logger.error(f"Ollama streaming error: {e}")
-                yield f"[Error generating post: {str(e)}]"
+        try:
+            # Closed even if our caller stops early, so the Ollama slot is freed
+            async with aclosing(llm_gateway.stream_generate(
+                prompt,
+                model=self.model,
+                options={
+                    'temperature': 0.7,
+                    'num_predict': 800
+                },
+                timeout=90.0,
+                max_retries=self.max_retries,
+                retry_delay=self.retry_delay
+            )) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+        except Exception as e:
+            logger.error(f"Ollama streaming error: {e}")
+            yield f"[Error generating post: {str(e)}]"
     
     async def generate_post(
         self,
@@ -189,28 +180,30 @@ Do NOT include:
     
     async def post_to_social_media(self, post_content: str) -> Dict[str, Any]:
         """Post the approved content to social media simulator"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.post(
-                    self.social_media_url,
-                    json={
-                        "content": post_content,
-                        "channel_id": "bank-official",
-                        "image_url": None,
-                        "scheduled_at": None
-                    }
-                )
-                response.raise_for_status()
-                return {
-                    "success": True,
-                    "response": response.json()
-                }
-            except Exception as e:
-                logger.error(f"Social media posting error: {e}")
-                return {
-                    "success": False,
-                    "error": str(e)
-                }
+        try:
+            # Not retried: a timed-out POST may still have created the post
+            response = await llm_gateway.post(
+                self.social_media_url,
+                json={
+                    "content": post_content,
+                    "channel_id": "bank-official",
+                    "image_url": None,
+                    "scheduled_at": None
+                },
+                target="social_media",
+                timeout=30.0,
+                max_retries=0
+            )
+            return {
+                "success": True,
+                "response": response.json()
+            }
+        except Exception as e:
+            logger.error(f"Social media posting error: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
 
 # Global instance
 eba_agent = ExecutiveBriefingAgent()
@@ -2,10 +2,12 @@ import asyncio
 import json
 from typing import List, Dict, Any, AsyncGenerator
 from datetime import datetime, timedelta
-import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import AgentWorkflow, AgentWorkflowStatus
 from app.config import config
+from app.etag_cache import social_etag_cache
+from app.llm_gateway import llm_gateway
+from app.embeddings import get_embedding_store
 import logging
 from collections import Counter
 
@@ -24,38 +26,80 @@ class InternalAnalysisAgent:
         self.model = config.ollama_model
         self.max_retries = config.get('agents.iaa.max_retries', 3)
         self.retry_delay = config.get('agents.iaa.retry_delay', 2)
+        # Cosine similarity a post needs to the signal to count as related,
+        # and between related posts to be grouped as one narrative
+        self.search_threshold = config.get('agents.iaa.search_threshold', 0.6)
+        self.cluster_threshold = config.get('agents.iaa.cluster_threshold', 0.8)
         self.social_media_api = "http://localhost:8001/api"  # Social media platform
     
     async def _fetch_social_posts(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Fetch recent posts from social media platform for pattern analysis"""
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                # Fetch posts across all channels
-                response = await client.get("http://localhost:8001/posts/")
-                response.raise_for_status()
-                posts_data = response.json()
-                
-                if not isinstance(posts_data, list):
-                    logger.warning(f"Unexpected posts response format: {type(posts_data)}")
-                    return []
-                
-                # Transform to expected format (no time filtering - use all available posts for demo)
-                recent_posts = []
-                for post in posts_data:
-                    recent_posts.append({
-                        'post_id': post.get('id'),
-                        'content': post.get('content', ''),
-                        'channel': post.get('channel_id', 'general'),
-                        'timestamp': post.get('created_at', ''),
-                        'author': 'social_user'
-                    })
-                
-                logger.info(f"Fetched {len(recent_posts)} posts for analysis")
-                return recent_posts[:limit]
+            # Fetch the most recent posts across all channels; unchanged
+            # lists come back as a 304 and are served from the ETag cache
+            posts_data = await social_etag_cache.get_json(
+                llm_gateway,
+                "http://localhost:8001/posts/",
+                params={"limit": limit},
+                target="social_media",
+                timeout=15.0,
+                max_retries=self.max_retries,
+                retry_delay=self.retry_delay
+            )
+            
+            if not isinstance(posts_data, list):
+                logger.warning(f"Unexpected posts response format: {type(posts_data)}")
+                return []
+            
+            # Transform to expected format (no time filtering - use all available posts for demo)
+            recent_posts = []
+            for post in posts_data:
+                recent_posts.append({
+                    'post_id': post.get('id'),
+                    'content': post.get('content', ''),
+                    'channel': post.get('channel_id', 'general'),
+                    'timestamp': post.get('created_at', ''),
+                    'author': 'social_user'
+                })
+            
+            logger.info(f"Fetched {len(recent_posts)} posts for analysis")
+            return recent_posts[:limit]
         except Exception as e:
             logger.error(f"Error fetching social posts: {e}")
             return []
     
+    def _find_related_posts(
+        self,
+        posts: List[Dict[str, Any]],
+        fda_signal: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Posts semantically close to the FDA signal (its type and drivers),
+        grouped into clusters of near-identical narratives. Blocking: encodes
+        posts not in the embedding cache yet.
+        """
+        store = get_embedding_store()
+        query = ". ".join([fda_signal.get('signal_type', '')] + list(fda_signal.get('drivers', [])))
+        rows = store.encode([post.get('content', '') for post in posts])
+        related = store.top_k(query, k=len(posts), rows=rows, threshold=self.search_threshold)
+        
+        related_rows = rows[[position for position, _ in related]]
+        clusters = []
+        for members in store.cluster(related_rows, self.cluster_threshold):
+            lead = posts[related[members[0]][0]]
+            clusters.append({
+                "size": len(members),
+                "sample": lead.get('content', '')[:120],
+                "channels": sorted({posts[related[m][0]].get('channel', 'general') for m in members})
+            })
+        clusters.sort(key=lambda c: c["size"], reverse=True)
+        
+        return {
+            "related_posts": len(related),
+            "related_narratives": len(clusters),
+            "related_clusters": clusters[:5]
+        }
+    
     async def _analyze_social_patterns(
         self,
         posts: List[Dict[str, Any]],
@@ -118,7 +162,15 @@ class InternalAnalysisAgent:
         # Velocity calculation
         velocity = f"{posts_last_hour} posts/hour" if posts_last_hour > 0 else "< 1 post/hour"
         
+        # Semantic match against the signal; keyword stats above still stand without it
+        try:
+            related = await asyncio.to_thread(self._find_related_posts, posts, fda_signal)
+        except Exception as e:
+            logger.warning(f"Embedding search unavailable: {e}")
+            related = {"related_posts": None, "related_narratives": 0, "related_clusters": []}
+        
         return {
+            **related,
             "posts_analyzed": len(posts),
             "spread_velocity": velocity,
             "posts_last_hour": posts_last_hour,
@@ -224,6 +276,8 @@ SOCIAL PATTERN ANALYSIS:
 - Posts analyzed: {social_patterns.get('posts_analyzed', 0)}
 - Spread velocity: {social_patterns.get('spread_velocity', 'unknown')}
 - Channels: {', '.join(social_patterns.get('channels', [])[:3])}
+- Posts related to this signal: {social_patterns.get('related_posts') if social_patterns.get('related_posts') is not None else 'unknown'}
+{chr(10).join(f'- Narrative repeated in {c["size"]} posts: "{c["sample"]}"' for c in social_patterns.get('related_clusters', [])[:3])}
 
 TASK: Generate concise explanations for:
 
@@ -240,20 +294,16 @@ RETURN ONLY JSON:
 """
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.ollama_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "format": "json"
-                    }
-                )
-                response.raise_for_status()
-                result = response.json()
-                explanation = json.loads(result['response'])
-                return explanation
+            response = await llm_gateway.generate(
+                prompt,
+                model=self.model,
+                format="json",
+                timeout=30.0,
+                max_retries=self.max_retries,
+                retry_delay=self.retry_delay
+            )
+            explanation = json.loads(response)
+            return explanation
         except Exception as e:
             logger.error(f"Error generating explainability: {e}")
             # Fallback explanation
@@ -326,7 +376,10 @@ RETURN ONLY JSON:
         yield f"- **Posts Analyzed**: {social_patterns.get('posts_analyzed', 0)}\n"
         yield f"- **Spread Velocity**: {social_patterns.get('spread_velocity', 'unknown')}\n"
         yield f"- **Channels**: {', '.join(social_patterns.get('channels', [])[:3])}\n"
-        yield f"- **Top Keywords**: {', '.join(social_patterns.get('top_keywords', [])[:5])}\n\n"
+        yield f"- **Top Keywords**: {', '.join(social_patterns.get('top_keywords', [])[:5])}\n"
+        if social_patterns.get('related_posts') is not None:
+            yield f"- **Related Posts**: {social_patterns['related_posts']} in {social_patterns['related_narratives']} narrative(s)\n"
+        yield "\n"
         
         yield f"### ⚠️ Risk Assessment: **{risk_assessment.get('risk_level', 'MEDIUM')}**\n\n"
         impact = risk_assessment.get('impact_assessment', {})
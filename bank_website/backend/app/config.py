@@ -48,6 +48,62 @@ class Config:
     @property
     def social_media_url(self) -> str:
         return self.get('agents.eba.social_media_url', 'http://localhost:8001/posts')
+    
+    @property
+    def compression_minimum_size(self) -> int:
+        return self.get('compression.minimum_size', 1024)
+    
+    @property
+    def compression_gzip_level(self) -> int:
+        return self.get('compression.gzip_level', 6)
+    
+    @property
+    def compression_brotli_quality(self) -> int:
+        return self.get('compression.brotli_quality', 4)
+
+    @property
+    def llm_max_concurrency(self) -> int:
+        return self.get('llm.max_concurrency', 2)
+    
+    @property
+    def llm_timeout_s(self) -> float:
+        return self.get('llm.timeout_s', 60)
+    
+    @property
+    def llm_connect_timeout_s(self) -> float:
+        return self.get('llm.connect_timeout_s', 5)
+    
+    @property
+    def llm_max_connections(self) -> int:
+        return self.get('llm.max_connections', 20)
+    
+    @property
+    def llm_max_keepalive_connections(self) -> int:
+        return self.get('llm.max_keepalive_connections', 10)
+    
+    @property
+    def llm_keepalive_expiry_s(self) -> float:
+        return self.get('llm.keepalive_expiry_s', 30)
+    
+    @property
+    def llm_max_retry_delay_s(self) -> float:
+        return self.get('llm.max_retry_delay_s', 30)
+    
+    @property
+    def embeddings_model(self) -> str:
+        return self.get('embeddings.model', 'all-MiniLM-L6-v2')
+    
+    @property
+    def embeddings_device(self) -> str:
+        return self.get('embeddings.device', 'cpu')
+    
+    @property
+    def embeddings_batch_size(self) -> int:
+        return self.get('embeddings.batch_size', 64)
+    
+    @property
+    def embeddings_cache_dir(self) -> str:
+        return self.get('embeddings.cache_dir', './embeddings')
 
 # Global config instance
 config = Config()
@@ -1,6 +1,8 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.config import config
+from app import migrations
+from shared.migrations import run_migrations
 
 # Create async engine
 engine = create_async_engine(
@@ -33,3 +35,5 @@ async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # Columns and indexes create_all cannot add to existing tables (see app/migrations)
+        await conn.run_sync(run_migrations, migrations)
@@ -0,0 +1,36 @@
+"""
+The bank backend's embedding store (shared.embeddings), configured from the
+`embeddings` settings.
+"""
+
+import threading
+from typing import Optional
+
+from app.config import config
+from shared.embeddings import EmbeddingStore
+
+
+# Shared by the agents; opened on first use, so importing this module touches no files
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> EmbeddingStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore(
+                config.embeddings_cache_dir,
+                model_name=config.embeddings_model,
+                device=config.embeddings_device,
+                batch_size=config.embeddings_batch_size,
+            )
+        return _store
+
+
+def close_embedding_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
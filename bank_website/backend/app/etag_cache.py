@@ -0,0 +1,68 @@
+"""
+Client-side ETag cache for GETs against the social media backend.
+
+The social media read endpoints (/posts/, /comments/{id}, /api/sync) send an
+ETag. Cached responses are revalidated with If-None-Match, and a 304 is
+answered from the cache without transferring or parsing the body again.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class ETagCache:
+    """LRU of URL -> (etag, parsed JSON body)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_json(
+        self,
+        client,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        **request_kwargs,
+    ) -> Any:
+        """
+        GET `url` and return its parsed JSON, reusing the cached body on 304.
+
+        `client` is an httpx.AsyncClient or the LLMGateway; extra keyword
+        arguments (timeout, target, ...) go to its get().
+        """
+        key = str(httpx.URL(url, params=params))
+        cached = self._entries.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+
+        response = await client.get(key, headers=headers, **request_kwargs)
+        if response.status_code == 304 and cached:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        response.raise_for_status()
+        self.misses += 1
+
+        data = response.json()
+        etag = response.headers.get("etag")
+        if etag:
+            self._entries[key] = (etag, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.pop(key, None)
+        return data
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Shared by the agents that read the social media backend
+social_etag_cache = ETagCache()
@@ -0,0 +1,24 @@
+"""
+The bank backend's LLM gateway (shared.llm_gateway), configured from the
+`llm` settings.
+
+Agents pass their `agents.<name>.max_retries` / `retry_delay` settings per
+call; metrics are served by GET /api/llm/metrics.
+"""
+
+from app.config import config
+from shared.llm_gateway import LLMGateway
+
+
+# Shared by the IAA and EBA agents
+llm_gateway = LLMGateway(
+    ollama_url=config.ollama_base_url,
+    model=config.ollama_model,
+    max_concurrency=config.llm_max_concurrency,
+    timeout=config.llm_timeout_s,
+    connect_timeout=config.llm_connect_timeout_s,
+    max_connections=config.llm_max_connections,
+    max_keepalive_connections=config.llm_max_keepalive_connections,
+    keepalive_expiry=config.llm_keepalive_expiry_s,
+    max_retry_delay=config.llm_max_retry_delay_s,
+)
@@ -0,0 +1,17 @@
+"""
+Uncertainty, risk and discard columns on agent_workflows (was migrate_add_fields.py).
+"""
+
+from sqlalchemy.engine import Connection
+
+from shared.migrations import add_missing_columns
+
+
+def upgrade(conn: Connection):
+    add_missing_columns(conn, "agent_workflows", {
+        "confidence_score": "FLOAT",
+        "data_quality": "VARCHAR(20)",
+        "risk_level": "VARCHAR(20)",
+        "escalation_recommendation": "TEXT",
+        "discarded_by": "VARCHAR(200)",
+    })
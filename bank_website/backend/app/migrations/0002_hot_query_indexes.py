@@ -0,0 +1,39 @@
+"""
+Composite indexes for the hot read paths.
+
+- agent_workflows(status, created_at): GET /api/workflows?status=... newest first
+- agent_workflows(created_at): GET /api/workflows newest first
+- transactions(status, timestamp): GET /api/database/transactions?status=...
+  newest first, and the IAA per-status transaction counts
+- customer_reviews(sentiment, timestamp): per-sentiment review lists and counts
+
+Status and sentiment arrive as bound parameters, which SQLite cannot match
+against a partial index's WHERE clause, so these are full composite indexes.
+"""
+
+from sqlalchemy.engine import Connection
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_agent_workflows_status_created ON agent_workflows (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_agent_workflows_created_at ON agent_workflows (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_status_timestamp ON transactions (status, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_customer_reviews_sentiment_timestamp ON customer_reviews (sentiment, timestamp)",
+]
+
+PLAN_CHECKS = [
+    ("SELECT * FROM agent_workflows WHERE status = 'AWAITING_APPROVAL' ORDER BY created_at DESC LIMIT 50",
+     "INDEX ix_agent_workflows_status_created"),
+    ("SELECT * FROM agent_workflows ORDER BY created_at DESC LIMIT 50",
+     "INDEX ix_agent_workflows_created_at"),
+    ("SELECT * FROM transactions WHERE status = 'FLAGGED' ORDER BY timestamp DESC LIMIT 100",
+     "INDEX ix_transactions_status_timestamp"),
+    ("SELECT count(id) FROM transactions WHERE status IN ('FLAGGED', 'PENDING', 'FAILED')",
+     "INDEX ix_transactions_status_timestamp"),
+    ("SELECT count(id) FROM customer_reviews WHERE sentiment = 'negative'",
+     "INDEX ix_customer_reviews_sentiment_timestamp"),
+]
+
+
+def upgrade(conn: Connection):
+    for statement in INDEXES:
+        conn.exec_driver_sql(statement)
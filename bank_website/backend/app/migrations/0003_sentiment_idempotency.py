@@ -0,0 +1,28 @@
+"""
+Idempotency key and workflow id on sentiments.
+
+The FDA agent redelivers a signal until the bank acknowledges it; the unique
+index on idempotency_key lets a redelivery be recognized (and answered with
+the original workflow id) instead of starting a second workflow. SQLite
+allows any number of NULLs in a unique index, so signals sent without a key
+are unaffected.
+"""
+
+from sqlalchemy.engine import Connection
+
+from shared.migrations import add_missing_columns
+
+PLAN_CHECKS = [
+    ("SELECT * FROM sentiments WHERE idempotency_key = 'k'",
+     "INDEX ix_sentiments_idempotency_key"),
+]
+
+
+def upgrade(conn: Connection):
+    add_missing_columns(conn, "sentiments", {
+        "idempotency_key": "VARCHAR(64)",
+        "workflow_id": "VARCHAR(50)",
+    })
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_sentiments_idempotency_key ON sentiments (idempotency_key)"
+    )
@@ -0,0 +1,4 @@
+"""
+Schema migrations of the bank backend, one NNNN_description.py module each.
+They are discovered and applied by shared.migrations (see its docstring).
+"""
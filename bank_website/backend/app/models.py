@@ -55,6 +55,9 @@ class Sentiment(Base):
     uncertainty_notes = Column(Text, nullable=True)
     recommend_escalation = Column(Integer)  # 0 or 1 (boolean)
     raw_data = Column(JSON)  # Store complete FDA agent response
+    # Set by the FDA agent's outbox; a redelivered signal carries the same key
+    idempotency_key = Column(String(64), nullable=True, unique=True, index=True)
+    workflow_id = Column(String(50), nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from typing import List
 from datetime import datetime
@@ -13,7 +15,7 @@ from app.models import (
     AgentWorkflowStatus, TransactionStatus as TransactionStatusEnum
 )
 from app.schemas import (
-    FDASentimentInput,
+    FDASentimentInput, FDASentimentBatchInput,
     TransactionCreate, TransactionUpdate, TransactionResponse,
     CustomerReviewCreate, CustomerReviewUpdate, CustomerReviewResponse,
     SentimentResponse,
@@ -21,11 +23,16 @@ from app.schemas import (
     WorkflowApproval
 )
 from app.agents import iaa_agent, eba_agent
+from app.embeddings import get_embedding_store
+from app.llm_gateway import llm_gateway
 from app.websocket import manager
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Validates and serializes workflow lists straight to JSON bytes in pydantic-core
+workflow_list_adapter = TypeAdapter(List[AgentWorkflowResponse])
+
 # ==================== FDA Sentiment Endpoint ====================
 async def process_sentiment_workflow(
     sentiment_id: int,
@@ -187,6 +194,89 @@ async def process_sentiment_workflow(
             "timestamp": datetime.utcnow().isoformat()
         })
 
+async def accept_fda_signal(
+    sentiment_input: FDASentimentInput,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession
+) -> dict:
+    """
+    Record one FDA signal and start its workflow. A signal whose
+    idempotency_key was seen before is not recorded again: the original
+    sentiment and workflow ids come back with status "duplicate".
+    """
+    async def find_duplicate():
+        if not sentiment_input.idempotency_key:
+            return None
+        result = await db.execute(
+            select(Sentiment).where(Sentiment.idempotency_key == sentiment_input.idempotency_key)
+        )
+        existing = result.scalar_one_or_none()
+        if existing is None:
+            return None
+        return {
+            "status": "duplicate",
+            "sentiment_id": existing.id,
+            "workflow_id": existing.workflow_id,
+            "idempotency_key": existing.idempotency_key,
+            "message": "Signal already received"
+        }
+    
+    duplicate = await find_duplicate()
+    if duplicate:
+        return duplicate
+    
+    # Generate workflow ID
+    workflow_id = f"WF-{uuid.uuid4().hex[:12].upper()}"
+    
+    # Create sentiment record
+    sentiment = Sentiment(
+        signal_type=sentiment_input.signal_type,
+        confidence=sentiment_input.confidence,
+        drivers=sentiment_input.drivers,
+        uncertainty_notes=sentiment_input.uncertainty_notes,
+        recommend_escalation=1 if sentiment_input.recommend_escalation else 0,
+        raw_data=sentiment_input.dict(),
+        idempotency_key=sentiment_input.idempotency_key,
+        workflow_id=workflow_id
+    )
+    db.add(sentiment)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # The same key committed concurrently
+        await db.rollback()
+        duplicate = await find_duplicate()
+        if duplicate:
+            return duplicate
+        raise
+    await db.refresh(sentiment)
+    
+    # Broadcast FDA received
+    await manager.broadcast({
+        "type": "fda_received",
+        "workflow_id": workflow_id,
+        "data": sentiment_input.dict(),
+        "sentiment_id": sentiment.id,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+    
+    # Start background processing
+    background_tasks.add_task(
+        process_sentiment_workflow,
+        sentiment.id,
+        sentiment_input.dict(),
+        workflow_id,
+        db
+    )
+    
+    return {
+        "status": "received",
+        "sentiment_id": sentiment.id,
+        "workflow_id": workflow_id,
+        "idempotency_key": sentiment_input.idempotency_key,
+        "message": "Sentiment received and processing started"
+    }
+
 @router.post("/send_social_sentiment")
 async def receive_fda_sentiment(
     sentiment_input: FDASentimentInput,
@@ -195,51 +285,31 @@ async def receive_fda_sentiment(
 ):
     """Endpoint for FDA agent to send sentiment data"""
     try:
-        # Create sentiment record
-        sentiment = Sentiment(
-            signal_type=sentiment_input.signal_type,
-            confidence=sentiment_input.confidence,
-            drivers=sentiment_input.drivers,
-            uncertainty_notes=sentiment_input.uncertainty_notes,
-            recommend_escalation=1 if sentiment_input.recommend_escalation else 0,
-            raw_data=sentiment_input.dict()
-        )
-        db.add(sentiment)
-        await db.commit()
-        await db.refresh(sentiment)
-        
-        # Generate workflow ID
-        workflow_id = f"WF-{uuid.uuid4().hex[:12].upper()}"
-        
-        # Broadcast FDA received
-        await manager.broadcast({
-            "type": "fda_received",
-            "workflow_id": workflow_id,
-            "data": sentiment_input.dict(),
-            "sentiment_id": sentiment.id,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        
-        # Start background processing
-        background_tasks.add_task(
-            process_sentiment_workflow,
-            sentiment.id,
-            sentiment_input.dict(),
-            workflow_id,
-            db
-        )
-        
-        return {
-            "status": "received",
-            "sentiment_id": sentiment.id,
-            "workflow_id": workflow_id,
-            "message": "Sentiment received and processing started"
-        }
-        
+        return await accept_fda_signal(sentiment_input, background_tasks, db)
     except Exception as e:
         logger.error(f"Error receiving sentiment: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/send_social_sentiment/batch")
+async def receive_fda_sentiment_batch(
+    batch: FDASentimentBatchInput,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Several FDA signals in one request (the FDA agent's outbox). Results come
+    back in input order; redelivered signals are reported as duplicates, so
+    retrying a whole batch is safe.
+    """
+    try:
+        results = []
+        for sentiment_input in batch.signals:
+            results.append(await accept_fda_signal(sentiment_input, background_tasks, db))
+        return {"results": results}
+    except Exception as e:
+        logger.error(f"Error receiving sentiment batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ==================== Workflow Management ====================
 @router.get("/workflows", response_model=List[AgentWorkflowResponse])
 async def get_workflows(
@@ -293,7 +363,9 @@ async def get_workflows(
         }
         response_data.append(workflow_dict)
     
-    return response_data
+    # Skip FastAPI's response_model round trip through Python objects and json.dumps
+    body = workflow_list_adapter.dump_json(workflow_list_adapter.validate_python(response_data))
+    return Response(content=body, media_type="application/json")
 
 @router.get("/workflows/{workflow_id}", response_model=AgentWorkflowResponse)
 async def get_workflow(
@@ -484,6 +556,17 @@ async def delete_workflow(
     
     return {"status": "deleted", "workflow_id": workflow.workflow_id}
 
+# ==================== Gateway Metrics ====================
+@router.get("/llm/metrics")
+async def get_llm_metrics():
+    """Outbound request counts, retries and latency per target (Ollama, social media)"""
+    return llm_gateway.snapshot()
+
+@router.get("/embeddings/stats")
+async def get_embedding_stats():
+    """Embedding cache size and how many lookups were served without encoding"""
+    return get_embedding_store().stats()
+
 # ==================== WebSocket Endpoint ====================
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
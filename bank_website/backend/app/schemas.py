@@ -10,6 +10,10 @@ class FDASentimentInput(BaseModel):
     drivers: List[str]
     uncertainty_notes: Optional[str] = None
     recommend_escalation: bool
+    idempotency_key: Optional[str] = Field(None, max_length=64)
+
+class FDASentimentBatchInput(BaseModel):
+    signals: List[FDASentimentInput] = Field(..., max_length=100)
 
 # ==================== Transaction Schemas ====================
 class TransactionStatus(str, Enum):
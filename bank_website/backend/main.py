@@ -3,8 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 from contextlib import asynccontextmanager
 
+from app.config import config
 from app.database import init_db
+from app.embeddings import close_embedding_store
+from app.llm_gateway import llm_gateway
 from app.routes import sentiment_router, database_router
+from shared.compression import CompressionMiddleware
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +27,8 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     logger.info("Shutting down SLM Desk API...")
+    await llm_gateway.aclose()
+    close_embedding_store()
 
 # Create FastAPI app
 app = FastAPI(
@@ -32,6 +38,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Compress large responses (gzip, or brotli when installed)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=config.compression_minimum_size,
+    gzip_level=config.compression_gzip_level,
+    brotli_quality=config.compression_brotli_quality,
+)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -54,6 +68,7 @@ async def root():
         "status": "running",
         "endpoints": {
             "sentiment": "/api/send_social_sentiment",
+            "sentiment_batch": "/api/send_social_sentiment/batch",
             "workflows": "/api/workflows",
             "websocket": "/api/ws",
             "database": "/api/database"
@@ -0,0 +1,130 @@
+"""
+Benchmark GET /api/workflows response encoding: FastAPI's response_model path
+(validate, dump to Python objects, json.dumps) vs the TypeAdapter.dump_json
+path the endpoint now uses, plus gzip/brotli sizes from CompressionMiddleware.
+
+Uses synthetic workflows carrying IAA analysis and EBA post markdown of
+realistic length; no database or server is needed.
+
+Usage (from bank_website/backend):
+    python scripts/benchmark_workflows_response.py
+    python scripts/benchmark_workflows_response.py --workflows 50 200 --repeat 20
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.models import AgentWorkflowStatus
+from app.routes.sentiment_routes import workflow_list_adapter
+from shared.compression import brotli
+
+PARAGRAPH = (
+    "Social chatter about a suspected phishing campaign spread across three channels "
+    "within the last hour. Posts reference a look-alike rewards portal and ask for CVV "
+    "and OTP codes. Matched transactions show a rise in declined card-not-present "
+    "payments, and recent reviews mention unexpected SMS messages. "
+)
+
+
+def make_workflows(count: int):
+    """Rows shaped like the dicts get_workflows builds"""
+    rng = random.Random(7)
+    now = datetime(2026, 2, 1, 9, 0, 0)
+    workflows = []
+    for i in range(count):
+        created = now - timedelta(minutes=i * 7)
+        workflows.append({
+            "id": i + 1,
+            "workflow_id": f"wf-{i:08d}",
+            "sentiment_id": i + 1,
+            "status": rng.choice(list(AgentWorkflowStatus)),
+            "signal_type": "phishing_campaign",
+            "iaa_matched_transactions": [{"transaction_id": f"TXN{j:06d}", "amount": 120.5 + j} for j in range(10)],
+            "iaa_matched_reviews": [{"review_id": f"REV{j:06d}", "rating": 1 + j % 5} for j in range(10)],
+            "iaa_analysis": "## Analysis\n\n" + PARAGRAPH * 12,
+            "iaa_completed_at": created + timedelta(seconds=40),
+            "eba_original_post": "# Customer advisory\n\n" + PARAGRAPH * 6,
+            "eba_edited_post": "# Customer advisory\n\n" + PARAGRAPH * 6,
+            "eba_completed_at": created + timedelta(seconds=90),
+            "confidence_score": 82.5,
+            "data_quality": "good",
+            "risk_level": "HIGH",
+            "escalation_recommendation": "Notify the fraud desk and publish an advisory.",
+            "approved_by": None,
+            "approved_at": None,
+            "posted_at": None,
+            "discarded_by": None,
+            "escalated_by": None,
+            "escalated_at": None,
+            "escalation_type": None,
+            "error_message": None,
+            "retry_count": 0,
+            "timestamp": created,
+            "created_at": created,
+            "updated_at": created + timedelta(seconds=90),
+        })
+    return workflows
+
+
+def default_encoding(rows) -> bytes:
+    """What FastAPI does for response_model=List[AgentWorkflowResponse]"""
+    validated = workflow_list_adapter.validate_python(rows)
+    return JSONResponse(workflow_list_adapter.dump_python(validated, mode="json")).body
+
+
+def fast_encoding(rows) -> bytes:
+    return workflow_list_adapter.dump_json(workflow_list_adapter.validate_python(rows))
+
+
+def best_of(repeat: int, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(count: int, repeat: int) -> bool:
+    rows = make_workflows(count)
+    default_s, default_body = best_of(repeat, lambda: default_encoding(rows))
+    fast_s, fast_body = best_of(repeat, lambda: fast_encoding(rows))
+    identical = json.loads(default_body) == json.loads(fast_body)
+    gzipped = gzip.compress(fast_body, config.compression_gzip_level)
+    line = (
+        f"{count:>5} workflows | default {default_s * 1000:7.2f}ms {len(default_body):>9,}B | "
+        f"dump_json {fast_s * 1000:7.2f}ms ({default_s / fast_s:4.1f}x) | gzip {len(gzipped):>8,}B"
+    )
+    if brotli is not None:
+        line += f" | br {len(brotli.compress(fast_body, quality=config.compression_brotli_quality)):>8,}B"
+    print(line + f" | same JSON: {'yes' if identical else 'NO'}")
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflows", type=int, nargs="+", default=[50, 500],
+                        help="number of workflows per response")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"/api/workflows encoding benchmark (brotli: {'yes' if brotli is not None else 'not installed'})")
+    results = [run(count, args.repeat) for count in args.workflows]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Token-budgeted batching for aggregate post analysis.
+
+A batch prompt has to fit the model's context window with room left for the
+answer; past that, Ollama silently drops the start of the prompt. The planner
+estimates tokens per post, orders posts by channel and then time (so a batch
+sees one conversation rather than a random sample) and packs them greedily
+into batches that fit the budget. Very long posts are clipped so a single
+post cannot take a whole batch.
+
+Each batch gets its own verdict; merge_verdicts combines the verdicts that
+name the same signal type into one aggregate signal, summing the affected
+post counts so a pattern spread across batches is still counted in full.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from near_dupes import combine
+
+# Conservative for English under the small models' tokenizers (~4 chars/token)
+CHARS_PER_TOKEN = 3.5
+
+# Drivers kept on a merged signal
+MAX_DRIVERS = 8
+
+# Near-duplicate clusters described in a merged signal's drivers, largest first
+MAX_CLUSTER_DRIVERS = 3
+# Post ids listed per cluster driver
+MAX_CLUSTER_IDS = 5
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to roughly `max_tokens` tokens, marking the cut"""
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 3, 0)] + "..."
+
+
+@dataclass
+class Batch:
+    posts: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+
+    @property
+    def channels(self) -> List[str]:
+        return sorted({p.get('channel') or 'general' for p in self.posts})
+
+
+class BatchPlanner:
+    """Packs posts into batches whose prompts fit `context_tokens`"""
+
+    def __init__(
+        self,
+        format_post: Callable[[Dict[str, Any]], str],
+        prompt_overhead_tokens: int,
+        context_tokens: int = 4096,
+        response_tokens: int = 512,
+        max_post_tokens: int = 400,
+        max_posts_per_batch: int = 50,
+    ):
+        self.format_post = format_post
+        self.context_tokens = context_tokens
+        self.max_post_tokens = max_post_tokens
+        self.max_posts_per_batch = max_posts_per_batch
+        # What is left for post text once the instructions and the answer are accounted for
+        self.budget = context_tokens - prompt_overhead_tokens - response_tokens
+        if self.budget < max_post_tokens:
+            raise ValueError(
+                f"context_tokens={context_tokens} leaves {self.budget} tokens for posts, "
+                f"less than max_post_tokens={max_post_tokens}"
+            )
+
+    def fit(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        """The post as it will be sent: content clipped to max_post_tokens"""
+        content = post.get('content', '') or ''
+        clipped = clip_to_tokens(content, self.max_post_tokens)
+        return post if clipped is content else {**post, 'content': clipped}
+
+    def plan(self, posts: List[Dict[str, Any]], time_key: Optional[Callable] = None) -> List[Batch]:
+        """Split `posts` into batches, ordered by channel then `time_key` (post id by default)"""
+        time_key = time_key or (lambda p: p.get('post_id') or 0)
+        ordered = sorted(posts, key=lambda p: (p.get('channel') or 'general', time_key(p)))
+
+        batches: List[Batch] = []
+        current = Batch()
+        for post in ordered:
+            post = self.fit(post)
+            tokens = estimate_tokens(self.format_post(post))
+            if current.posts and (
+                current.tokens + tokens > self.budget
+                or len(current.posts) >= self.max_posts_per_batch
+            ):
+                batches.append(current)
+                current = Batch()
+            current.posts.append(post)
+            current.tokens += tokens
+        if current.posts:
+            batches.append(current)
+        return batches
+
+
+def describe_cluster(cluster: Dict[str, Any]) -> str:
+    """A near-duplicate cluster summary as a signal driver"""
+    ids = [str(i) for i in cluster['post_ids'][:MAX_CLUSTER_IDS]]
+    if cluster['size'] > MAX_CLUSTER_IDS:
+        ids.append(f"+{cluster['size'] - MAX_CLUSTER_IDS} more")
+    channels = ", ".join(f"{name} ({count})" for name, count in cluster['channels'].items())
+    return f"Near-duplicate cluster of {cluster['size']} posts (ids {', '.join(ids)}) across {channels}"
+
+
+def merge_verdicts(verdicts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Combine per-batch threat verdicts into one signal per signal type.
+
+    Affected post counts and batch counts are summed, channels and drivers
+    unioned, escalation is recommended if any batch recommended it, and
+    confidence is the average weighted by affected posts. One-post verdicts
+    from the verdict cache (marked `cached`) count as cached posts rather
+    than batches. Near-duplicate clusters behind a signal are kept under
+    `clusters` and the largest are described in its drivers; the verdicts'
+    MinHash `fingerprint`s are combined. Signals come back most affected
+    posts first.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for verdict in verdicts:
+        signal_type = verdict.get('signal_type') or 'Unknown Threat'
+        affected = max(int(verdict.get('affected_posts_count') or 0), 1)
+        signal = merged.setdefault(signal_type.strip().lower(), {
+            'is_threat': True,
+            'signal_type': signal_type,
+            'confidence': 0.0,
+            'drivers': [],
+            'recommend_escalation': 0,
+            'uncertainty_notes': [],
+            'affected_posts_count': 0,
+            'affected_channels': [],
+            'batches': 0,
+            'cached_posts': 0,
+            'clusters': [],
+            'fingerprint': None,
+        })
+        signal['confidence'] += float(verdict.get('confidence') or 0) * affected
+        signal['affected_posts_count'] += affected
+        if verdict.get('cached'):
+            signal['cached_posts'] += 1
+        else:
+            signal['batches'] += 1
+        signal['recommend_escalation'] = max(signal['recommend_escalation'], int(bool(verdict.get('recommend_escalation'))))
+        for driver in verdict.get('drivers') or []:
+            if driver not in signal['drivers']:
+                signal['drivers'].append(driver)
+        for channel in verdict.get('affected_channels') or []:
+            if channel not in signal['affected_channels']:
+                signal['affected_channels'].append(channel)
+        for cluster in verdict.get('clusters') or []:
+            signal['clusters'].append(cluster)
+            for channel in cluster['channels']:
+                if channel not in signal['affected_channels']:
+                    signal['affected_channels'].append(channel)
+        if verdict.get('uncertainty_notes'):
+            signal['uncertainty_notes'].append(verdict['uncertainty_notes'])
+        signal['fingerprint'] = combine(f for f in (signal['fingerprint'], verdict.get('fingerprint')) if f)
+
+    signals = []
+    for signal in merged.values():
+        signal['confidence'] = round(signal['confidence'] / signal['affected_posts_count'], 1)
+        signal['drivers'] = signal['drivers'][:MAX_DRIVERS]
+        if signal['batches'] > 1:
+            signal['drivers'].append(
+                f"{signal['affected_posts_count']} posts across {signal['batches']} analysis batches"
+            )
+        signal['clusters'].sort(key=lambda c: c['size'], reverse=True)
+        for cluster in signal['clusters'][:MAX_CLUSTER_DRIVERS]:
+            signal['drivers'].append(describe_cluster(cluster))
+        signal['uncertainty_notes'] = " | ".join(signal['uncertainty_notes'])
+        signals.append(signal)
+    return sorted(signals, key=lambda s: s['affected_posts_count'], reverse=True)
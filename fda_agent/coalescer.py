@@ -0,0 +1,219 @@
+"""
+Coalescing of repeated signals during an ongoing incident.
+
+A campaign that runs for an hour is detected again every cycle, and every
+signal the bank receives starts its own IAA + EBA workflow. The coalescer
+keeps the signals sent recently open, keyed on signal type plus a
+fingerprint: the combined MinHash signature of the posts the signal was
+found in (near_dupes.combine), which does not depend on their order, so a
+different campaign of the same type still gets its own signal. A new
+signal that matches an open one is merged into it (drivers, channels and
+affected post counts accumulate) and is only sent again, as an update,
+when it changes the picture materially:
+
+- confidence moved by at least `confidence_delta` points since the last send;
+- the accumulated affected posts reached `magnitude_ratio` times the count
+  last sent;
+- escalation is now recommended and was not before.
+
+An open signal closes once `window_s` seconds pass without a match. Open
+signals are saved to an `open_signals` table (in the outbox database) by
+save(), which the agent calls once the signals offer() returned are in the
+outbox: a crash in between sends a detection again under the same key,
+which the outbox and the bank deduplicate. After a restart, the signals
+still inside their window are loaded back.
+"""
+
+import json
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from batch_planner import MAX_DRIVERS
+from near_dupes import similarity
+from outbox import signal_key
+
+# Fingerprints kept per open signal; a drifting campaign matches any of them
+MAX_FINGERPRINTS = 8
+
+
+@dataclass
+class OpenSignal:
+    key: str                # idempotency key of the first send
+    signal_type: str
+    opened_at: float
+    last_seen: float
+    fingerprints: List[List[int]]
+    drivers: List[str]
+    channels: List[str]
+    affected_posts_count: int
+    confidence: float
+    recommend_escalation: int
+    sent_confidence: float
+    sent_posts_count: int
+    sent_escalation: int
+    detections: int = 1
+    updates: int = 0
+    uncertainty_notes: str = ""
+
+
+@dataclass
+class CoalescerStats:
+    received: int = 0
+    sent: int = 0
+    suppressed: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"received": self.received, "sent": self.sent, "suppressed": self.suppressed}
+
+
+class SignalCoalescer:
+    """Merges repeats of an open signal; decides which signals reach the bank"""
+
+    def __init__(
+        self,
+        window_s: float = 900,
+        confidence_delta: float = 10,
+        magnitude_ratio: float = 2.0,
+        match_similarity: float = 0.5,
+        path: Optional[str] = None,
+    ):
+        self.window_s = window_s
+        self.confidence_delta = confidence_delta
+        self.magnitude_ratio = magnitude_ratio
+        self.match_similarity = match_similarity
+        self.open: List[OpenSignal] = []
+        self.stats = CoalescerStats()
+
+        # No path: open signals live in memory only
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(Path(path))
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS open_signals ("
+                " key TEXT PRIMARY KEY,"
+                " entry TEXT NOT NULL,"
+                " last_seen REAL NOT NULL)"
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT entry FROM open_signals WHERE last_seen >= ? ORDER BY last_seen",
+                (time.time() - self.window_s,),
+            ).fetchall()
+            self.open = [OpenSignal(**json.loads(row[0])) for row in rows]
+
+    @staticmethod
+    def fingerprint(signal: Dict[str, Any]) -> Optional[List[int]]:
+        return signal.get('fingerprint') or None
+
+    def _match(self, signal_type: str, fingerprint: Optional[List[int]]) -> Optional[OpenSignal]:
+        for entry in self.open:
+            if entry.signal_type != signal_type:
+                continue
+            if fingerprint is None or not entry.fingerprints:
+                return entry
+            if any(similarity(fingerprint, known) >= self.match_similarity for known in entry.fingerprints):
+                return entry
+        return None
+
+    def offer(self, signal: Dict[str, Any], key: str, now: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Take a detected signal (confidence 0-100). Returns the signal to send
+        and its idempotency key: the signal itself when it opens a new
+        incident, the merged signal when it is a material update, or None
+        when it is suppressed.
+        """
+        now = time.time() if now is None else now
+        self.stats.received += 1
+        self.open = [e for e in self.open if now - e.last_seen <= self.window_s]
+
+        signal_type = (signal.get('signal_type') or 'Unknown Threat').strip().lower()
+        fingerprint = self.fingerprint(signal)
+        confidence = float(signal.get('confidence') or 0)
+        affected = int(signal.get('affected_posts_count') or 1)
+        escalation = int(bool(signal.get('recommend_escalation')))
+
+        entry = self._match(signal_type, fingerprint)
+        if entry is None:
+            self.open.append(OpenSignal(
+                key=key,
+                signal_type=signal_type,
+                opened_at=now,
+                last_seen=now,
+                fingerprints=[fingerprint] if fingerprint else [],
+                drivers=list(signal.get('drivers') or []),
+                channels=list(signal.get('affected_channels') or []),
+                affected_posts_count=affected,
+                confidence=confidence,
+                recommend_escalation=escalation,
+                sent_confidence=confidence,
+                sent_posts_count=affected,
+                sent_escalation=escalation,
+                uncertainty_notes=signal.get('uncertainty_notes') or "",
+            ))
+            self.stats.sent += 1
+            return signal, key
+
+        entry.last_seen = now
+        entry.detections += 1
+        entry.affected_posts_count += affected
+        entry.confidence = confidence
+        entry.recommend_escalation = max(entry.recommend_escalation, escalation)
+        entry.uncertainty_notes = signal.get('uncertainty_notes') or entry.uncertainty_notes
+        if fingerprint and all(similarity(fingerprint, known) < 1.0 for known in entry.fingerprints):
+            entry.fingerprints = (entry.fingerprints + [fingerprint])[-MAX_FINGERPRINTS:]
+        for driver in signal.get('drivers') or []:
+            if driver not in entry.drivers:
+                entry.drivers.append(driver)
+        entry.drivers = entry.drivers[-MAX_DRIVERS:]
+        for channel in signal.get('affected_channels') or []:
+            if channel not in entry.channels:
+                entry.channels.append(channel)
+
+        material = (
+            abs(entry.confidence - entry.sent_confidence) >= self.confidence_delta
+            or entry.affected_posts_count >= entry.sent_posts_count * self.magnitude_ratio
+            or entry.recommend_escalation > entry.sent_escalation
+        )
+        if not material:
+            self.stats.suppressed += 1
+            return None
+
+        entry.updates += 1
+        entry.sent_confidence = entry.confidence
+        entry.sent_posts_count = entry.affected_posts_count
+        entry.sent_escalation = entry.recommend_escalation
+        self.stats.sent += 1
+        opened = time.strftime('%H:%M', time.localtime(entry.opened_at))
+        update = {
+            **signal,
+            'confidence': entry.confidence,
+            'drivers': entry.drivers + [
+                f"Update {entry.updates} to a signal open since {opened}: "
+                f"{entry.affected_posts_count} posts over {entry.detections} detections"
+            ],
+            'affected_posts_count': entry.affected_posts_count,
+            'affected_channels': list(entry.channels),
+            'recommend_escalation': entry.recommend_escalation,
+            'uncertainty_notes': entry.uncertainty_notes,
+        }
+        return update, signal_key(entry.key, "update", entry.updates)
+
+    def save(self):
+        """Persist the open signals (call once what offer() returned is queued)"""
+        if self._db is None:
+            return
+        with self._db:
+            self._db.execute("DELETE FROM open_signals")
+            self._db.executemany(
+                "INSERT INTO open_signals (key, entry, last_seen) VALUES (?, ?, ?)",
+                [(e.key, json.dumps(asdict(e)), e.last_seen) for e in self.open],
+            )
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -4,14 +4,29 @@ FDA Agent - Fraud Detection & Analysis Agent
 Monitors social media for potential security threats and sends signals to SLM Desk
 """
 
+import argparse
 import asyncio
 import httpx
 import json
 import logging
-from datetime import datetime, timedelta
+import sys
+from collections import OrderedDict
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+# The `shared` package lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from batch_planner import BatchPlanner, estimate_tokens, merge_verdicts
+from coalescer import SignalCoalescer
+from near_dupes import Cluster, cluster_posts, combine, minhash
+from outbox import Outbox, signal_key
+from prefilter import ThreatPrefilter
+from spike_detector import Spike, SpikeDetector
+from verdict_cache import VerdictCache, verdict_key
+from shared.llm_gateway import LLMGateway
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +34,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+POST_SEPARATOR = "\n\n---POST SEPARATOR---\n\n"
+
+# Post ids remembered in stream mode to skip posts the feed replays
+STREAM_SEEN_POST_IDS = 10000
+
+# Cached verdicts are keyed by this: bump it whenever the batch prompt changes
+BATCH_PROMPT_VERSION = "batch-v4"
+
+# What a batch verdict says about each post it names, kept in the verdict cache
+VERDICT_FIELDS = ('is_threat', 'signal_type', 'confidence', 'drivers', 'recommend_escalation', 'uncertainty_notes')
+
+# Default --embedding-cache
+EMBEDDINGS_DIR = Path(__file__).with_name("embeddings")
+
+
+def format_batch_post(post: Dict[str, Any]) -> str:
+    """
+    One post as it appears in a batch prompt, with the prefilter's hints and
+    the size of its near-duplicate cluster when it has any
+    """
+    header = f"[Post {post.get('post_id')} by {post.get('author')} on {post.get('channel')}]"
+    cluster = post.get('cluster')
+    if cluster and cluster['size'] > 1:
+        header += f" (near-duplicate cluster: {cluster['size']} posts across channels {', '.join(cluster['channels'])})"
+    if post.get('prefilter_hints'):
+        header += f" (prefilter matched: {post['prefilter_hints']})"
+    return f"{header}: {post.get('content', '')}"
+
 
 class FDAAgent:
     """Fraud Detection & Analysis Agent"""
@@ -30,7 +73,33 @@ class FDAAgent:
         ollama_url: str = "http://localhost:11434",
         ollama_model: str = "ministral-3:3b",
         poll_interval: int = 30,
-        state_file: str = "fda_state.json"
+        state_file: str = "fda_state.json",
+        sync_consumer: str = "fda",
+        feed_mode: str = "poll",
+        stream_batch_window: float = 0.5,
+        sync_batch_size: int = 200,
+        llm_concurrency: int = 2,
+        max_retries: int = 3,
+        retry_delay: float = 2.0,
+        context_tokens: int = 4096,
+        min_pattern_posts: int = 3,
+        prefilter: bool = True,
+        lexicon_path: Optional[str] = None,
+        prefilter_min_score: int = 1,
+        verdict_cache: bool = True,
+        verdict_cache_path: Optional[str] = None,
+        verdict_cache_ttl_s: float = 7 * 24 * 3600,
+        near_dup_threshold: Optional[float] = 0.6,
+        semantic_threshold: Optional[float] = None,
+        embedding_cache_dir: Optional[str] = None,
+        spike_detection: bool = True,
+        spike_z_threshold: float = 4.0,
+        spike_min_posts: int = 10,
+        outbox_path: Optional[str] = None,
+        outbox_batch_size: int = 50,
+        coalesce_window_s: float = 900,
+        coalesce_confidence_delta: float = 10,
+        coalesce_magnitude_ratio: float = 2.0
     ):
         self.social_media_url = social_media_url
         self.bank_backend_url = bank_backend_url
@@ -38,56 +107,153 @@ class FDAAgent:
         self.ollama_model = ollama_model
         self.poll_interval = poll_interval
         self.state_file = Path(state_file)
+        self.sync_consumer = sync_consumer
+        self.feed_mode = feed_mode
+        self.stream_batch_window = stream_batch_window
+        # Posts analyzed together while streaming /api/sync; bounds memory in poll mode
+        self.sync_batch_size = sync_batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        
+        # One pooled client for Ollama, the social media backend and the bank
+        self.http = LLMGateway(
+            ollama_url=ollama_url,
+            model=ollama_model,
+            max_concurrency=llm_concurrency,
+            max_retries=max_retries,
+            retry_delay=retry_delay
+        )
+        
+        # Batch prompts are packed to fit the model's context window
+        # (sent as num_ctx, so Ollama does not fall back to a smaller one)
+        self.context_tokens = context_tokens
+        self.batch_planner = BatchPlanner(
+            format_post=lambda post: POST_SEPARATOR + format_batch_post(post),
+            prompt_overhead_tokens=estimate_tokens(self._batch_prompt([])),
+            context_tokens=context_tokens
+        )
+        # Merged signals need this many affected posts (or every post, in smaller cycles)
+        self.min_pattern_posts = min_pattern_posts
+        
+        # Lexicon prefilter: posts without a match never reach the LLM
+        self.prefilter = ThreatPrefilter.from_file(lexicon_path, prefilter_min_score) if prefilter else None
+        self.prefilter_stats = {"posts_screened": 0, "posts_skipped": 0, "llm_calls_saved": 0}
         
-        # Load last processed timestamp
-        self.last_processed_time = self._load_state()
+        # Verdicts of already-analyzed content, so reposts cost no LLM call
+        self.verdict_cache = VerdictCache(verdict_cache_path, ttl_s=verdict_cache_ttl_s) if verdict_cache else None
+        self.cache_stats = {"posts_cached": 0, "llm_calls_saved": 0}
+        
+        # Near-duplicates are analyzed once, through a representative (None disables clustering)
+        self.near_dup_threshold = near_dup_threshold
+        self.cluster_stats = {"posts_clustered": 0, "llm_calls_saved": 0}
+        # Optionally, clusters whose representatives are paraphrases of each other
+        # (embedding cosine >= semantic_threshold) are merged as well
+        self.semantic_threshold = semantic_threshold
+        self.embeddings = None
+        if semantic_threshold is not None:
+            # numpy and sentence-transformers are only needed for this
+            from shared.embeddings import EmbeddingStore
+            self.embeddings = EmbeddingStore(embedding_cache_dir or EMBEDDINGS_DIR)
+        
+        # Volume spikes per channel and lexicon category are found by counting;
+        # the LLM only labels them
+        self.spike_detector = SpikeDetector(spike_z_threshold, spike_min_posts) if spike_detection else None
+        
+        # Signals are stored before their posts are acknowledged (sync ack or
+        # saved feed cursor) and delivered to the bank by run_outbox_sender
+        self.outbox = Outbox(outbox_path, retry_delay=retry_delay)
+        self.outbox_batch_size = outbox_batch_size
+        self._outbox_wakeup = asyncio.Event()
+        
+        # Repeats of a signal sent within the window are merged into it, and
+        # only material changes are sent again (0 disables); open signals are
+        # kept in the outbox database across restarts
+        self.coalescer = SignalCoalescer(
+            window_s=coalesce_window_s,
+            confidence_delta=coalesce_confidence_delta,
+            magnitude_ratio=coalesce_magnitude_ratio,
+            path=self.outbox.path
+        ) if coalesce_window_s else None
+        
+        # Last change feed event id (stream mode), restored by _load_state
+        self.feed_cursor: Optional[str] = None
+        
+        # Highest post id and newest post time analyzed (restored by _load_state):
+        # older posts come back from /api/sync only for their new comments
+        self.last_post_id = 0
+        self.last_post_time = datetime.min
+        self._load_state()
         
         logger.info(f"FDA Agent initialized")
-        logger.info(f"Monitoring: {self.social_media_url}")
+        logger.info(f"Monitoring: {self.social_media_url} ({self.feed_mode} mode)")
         logger.info(f"Reporting to: {self.bank_backend_url}")
         logger.info(f"Using model: {self.ollama_model}")
     
-    def _load_state(self) -> datetime:
-        """Load the last processed timestamp from state file"""
-        if self.state_file.exists():
-            try:
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
-                    timestamp_str = state.get('last_processed_time')
-                    if timestamp_str:
-                        return datetime.fromisoformat(timestamp_str)
-            except Exception as e:
-                logger.warning(f"Could not load state file: {e}")
-        
-        # Default to 1 hour ago
-        return datetime.utcnow() - timedelta(hours=1)
+    def _load_state(self):
+        """Load the last analyzed post and the feed cursor from state file"""
+        if not self.state_file.exists():
+            # Where to start is up to the server-side sync cursor
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            self.feed_cursor = state.get('feed_cursor')
+            self.last_post_id = int(state.get('last_post_id') or 0)
+            if state.get('last_post_time'):
+                self.last_post_time = datetime.fromisoformat(state['last_post_time'])
+        except Exception as e:
+            logger.warning(f"Could not load state file: {e}")
     
     def _save_state(self):
-        """Save the last processed timestamp to state file"""
+        """Save the last analyzed post and the feed cursor to state file"""
         try:
             with open(self.state_file, 'w') as f:
                 json.dump({
-                    'last_processed_time': self.last_processed_time.isoformat()
+                    'last_post_id': self.last_post_id,
+                    'last_post_time': self.last_post_time.isoformat(),
+                    'feed_cursor': self.feed_cursor
                 }, f)
         except Exception as e:
             logger.error(f"Could not save state file: {e}")
     
-    async def fetch_social_media_posts(self) -> List[Dict[str, Any]]:
-        """Fetch posts from social media simulator"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(f"{self.social_media_url}/api/sync")
-                response.raise_for_status()
-                data = response.json()
-                
-                # The sync endpoint returns posts in a specific format
-                posts = data if isinstance(data, list) else []
-                logger.info(f"Fetched {len(posts)} posts from social media")
-                return posts
-                
-            except Exception as e:
-                logger.error(f"Error fetching social media posts: {e}")
-                return []
+    async def iter_sync_pages(self):
+        """
+        Yield (posts, cursor) for each page of posts created since this
+        agent's last acknowledged sync.
+
+        Reads /api/sync as NDJSON, sync_batch_size posts per page: one post
+        per line plus a checkpoint line ({"cursor", "has_more"}) after every
+        page, so only the current page is held in memory however much is
+        pending. The server keeps our cursor under the sync_consumer name
+        and only moves it when a checkpoint is acknowledged (ack_sync).
+        """
+        # Connect/write timeouts only: a large backlog can take a while to stream
+        timeout = httpx.Timeout(30.0, read=None)
+        async with self.http.client.stream(
+            "GET",
+            f"{self.social_media_url}/api/sync",
+            params={"consumer": self.sync_consumer, "format": "ndjson", "limit": self.sync_batch_size},
+            timeout=timeout
+        ) as response:
+            response.raise_for_status()
+            page = []
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                item = json.loads(line)
+                if "post_id" in item:
+                    page.append(item)
+                elif "cursor" in item:
+                    yield page, item["cursor"]
+                    page = []
+    
+    async def ack_sync(self, cursor: str):
+        """Move our server-side sync cursor past a page that has been fully processed"""
+        await self.http.post(
+            f"{self.social_media_url}/api/sync/ack",
+            params={"consumer": self.sync_consumer, "cursor": cursor},
+            target="social_media"
+        )
     
     def _parse_post_timestamp(self, timestamp_str: str) -> Optional[datetime]:
         """Parse timestamp from various formats"""
@@ -102,129 +268,115 @@ class FDAAgent:
                 logger.warning(f"Could not parse timestamp: {timestamp_str}")
                 return None
     
-    def filter_new_posts(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Filter posts to only include new ones since last check"""
-        new_posts = []
-        
-        for post in posts:
-            timestamp_str = post.get('timestamp')
-            if not timestamp_str:
-                continue
-            
-            post_time = self._parse_post_timestamp(timestamp_str)
-            if post_time and post_time > self.last_processed_time:
-                new_posts.append(post)
-        
-        logger.info(f"Found {len(new_posts)} new posts since {self.last_processed_time}")
-        return new_posts
+    def _is_new_post(self, post: Dict[str, Any]) -> bool:
+        """
+        Whether a synced post has not been analyzed yet. /api/sync resends
+        older posts when they get new comments; those have an id and a
+        creation time no later than the last analyzed post. Either one being
+        later makes a post new, so posts sharing a second are not lost, and
+        neither are posts created after the social media database was reset.
+        """
+        if int(post.get('post_id') or 0) > self.last_post_id:
+            return True
+        post_time = self._parse_post_timestamp(post.get('timestamp', ''))
+        return post_time is not None and post_time > self.last_post_time
     
-    async def analyze_post_with_llm(self, post: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Analyze a post using Ollama to detect potential threats"""
-        content = post.get('content', '')
-        author = post.get('author', 'Unknown')
-        
-        # Skip very short posts or obvious spam
-        if len(content.strip()) < 10:
-            return None
-        
-        prompt = f"""You are a fraud detection AI analyzing social media posts for a bank's security team.
-
-Analyze this post for potential security threats:
-
-Author: {author}
-Content: {content}
-
-Detect if this post contains:
-1. Phishing attempts (fake links, credential harvesting)
-2. Fraud warnings (scam reports, fake websites)
-3. Brand impersonation (pretending to be the bank)
-4. Social engineering (urgency tactics, CVV requests)
-5. Customer complaints about security issues
-
-Response format (JSON only):
-{{
-  "is_threat": true/false,
-  "signal_type": "Phishing SMS Campaign" or "Fake Website" or "CVV Disclosure" or "Brand Impersonation" or "Customer Security Complaint" or "None",
-  "confidence": 0-100,
-  "drivers": ["specific reason 1", "specific reason 2"],
-  "recommend_escalation": 0 or 1,
-  "uncertainty_notes": "any concerns about classification"
-}}
-
-If not a threat, set is_threat to false and signal_type to "None".
-"""
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            try:
-                response = await client.post(
-                    f"{self.ollama_url}/api/generate",
-                    json={
-                        "model": self.ollama_model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "temperature": 0.3,
-                        "format": "json"
-                    }
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                # Parse the LLM response
-                llm_output = result.get('response', '{}')
-                analysis = json.loads(llm_output)
-                
-                # Only return if it's actually a threat
-                if analysis.get('is_threat', False):
-                    logger.info(f"Threat detected: {analysis.get('signal_type')} (confidence: {analysis.get('confidence')}%)")
-                    return analysis
-                
-                return None
-                
-            except Exception as e:
-                logger.error(f"Error analyzing post with LLM: {e}")
-                return None
+    def mark_analyzed(self, posts: List[Dict[str, Any]]):
+        """Raise last_post_id/last_post_time past posts whose signals are queued, and save state"""
+        times = [t for t in (self._parse_post_timestamp(p.get('timestamp', '')) for p in posts) if t]
+        self.last_post_id = max([self.last_post_id] + [int(p.get('post_id') or 0) for p in posts])
+        self.last_post_time = max([self.last_post_time] + times)
+        self._save_state()
     
-    async def send_signal_to_bank(self, signal_data: Dict[str, Any], post: Dict[str, Any]):
-        """Send detected signal to bank backend"""
-        payload = {
+    def signal_payload(self, signal_data: Dict[str, Any], key: str) -> Dict[str, Any]:
+        """A signal as the bank receives it"""
+        return {
             "signal_type": signal_data.get('signal_type', 'Unknown Threat'),
             "confidence": signal_data.get('confidence', 50) / 100.0,  # Convert to 0-1 range
             "drivers": signal_data.get('drivers', []),
             "uncertainty_notes": signal_data.get('uncertainty_notes', ''),
-            "recommend_escalation": bool(signal_data.get('recommend_escalation', 0))  # Convert to boolean
+            "recommend_escalation": bool(signal_data.get('recommend_escalation', 0)),  # Convert to boolean
+            "idempotency_key": key
         }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.post(
-                    f"{self.bank_backend_url}/api/send_social_sentiment",
-                    json=payload
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                logger.info(f"✅ Signal sent to bank: {signal_data.get('signal_type')} - Workflow: {result.get('workflow_id')}")
-                return result
-                
-            except Exception as e:
-                logger.error(f"❌ Error sending signal to bank: {e}")
+    
+    def outgoing_signal(self, signal: Dict[str, Any], key: str) -> Optional[Dict[str, Any]]:
+        """The payload to send for a detected signal, or None when the coalescer suppresses it"""
+        if self.coalescer:
+            offered = self.coalescer.offer(signal, key)
+            if offered is None:
+                logger.info(f"🔕 {signal.get('signal_type')} merged into the open signal, no material change")
                 return None
+            signal, key = offered
+        return self.signal_payload(signal, key)
     
-    async def analyze_posts_batch(self, posts: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        """Analyze multiple posts together to detect aggregate patterns"""
-        if len(posts) < 3:
-            logger.info(f"Only {len(posts)} posts - below threshold of 3 for aggregate analysis")
-            return None
+    def queue_signals(self, payloads: List[Dict[str, Any]]):
+        """Store signals in the outbox, wake the sender, then save the coalescer's open signals"""
+        if payloads:
+            queued = self.outbox.add(payloads)
+            logger.info(f"📮 {queued} signal(s) queued for the bank ({len(payloads) - queued} already queued)")
+            self._outbox_wakeup.set()
+        if self.coalescer:
+            self.coalescer.save()
+    
+    async def deliver_outbox(self) -> int:
+        """
+        Send due outbox signals to the bank in one batch request. Returns how
+        many were acknowledged (received, or recognized as duplicates).
+        """
+        payloads = self.outbox.due(self.outbox_batch_size)
+        if not payloads:
+            return 0
+        keys = [p['idempotency_key'] for p in payloads]
+        
+        try:
+            # The outbox backs off between attempts itself
+            response = await self.http.post(
+                f"{self.bank_backend_url}/api/send_social_sentiment/batch",
+                json={"signals": payloads},
+                target="bank",
+                timeout=30.0,
+                max_retries=0
+            )
+            results = response.json().get('results', [])
+        except Exception as e:
+            logger.error(f"❌ Error sending {len(payloads)} signal(s) to bank: {e}")
+            self.outbox.mark_failed(keys, str(e))
+            return 0
         
-        # Combine all post contents for batch analysis
-        combined_content = "\n\n---POST SEPARATOR---\n\n".join([
-            f"[Post {p.get('post_id')} by {p.get('author')} on {p.get('channel')}]: {p.get('content', '')}"
-            for p in posts
-        ])
+        acknowledged = []
+        for payload, result in zip(payloads, results):
+            if result.get('status') in ('received', 'duplicate'):
+                acknowledged.append(payload['idempotency_key'])
+                logger.info(f"✅ Signal sent to bank: {payload['signal_type']} - Workflow: {result.get('workflow_id')}"
+                            + (" (already received)" if result['status'] == 'duplicate' else ""))
+        self.outbox.mark_delivered(acknowledged)
+        unacknowledged = [k for k in keys if k not in set(acknowledged)]
+        if unacknowledged:
+            self.outbox.mark_failed(unacknowledged, "not acknowledged by the bank")
+        return len(acknowledged)
+    
+    async def run_outbox_sender(self):
+        """Deliver outbox signals as they are queued, and retry failed ones when their backoff ends"""
+        while True:
+            delivered = await self.deliver_outbox()
+            if delivered == self.outbox_batch_size:
+                continue  # more may be due right away
+            wait = self.outbox.next_due_in()
+            self._outbox_wakeup.clear()
+            try:
+                await asyncio.wait_for(self._outbox_wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _batch_prompt(self, posts: List[Dict[str, Any]]) -> str:
+        """The aggregate-analysis prompt for one batch"""
+        combined_content = POST_SEPARATOR.join(format_batch_post(p) for p in posts)
         
-        prompt = f"""You are a fraud detection AI analyzing {len(posts)} social media posts for aggregate threat patterns.
+        return f"""You are a fraud detection AI analyzing {len(posts)} social media posts for aggregate threat patterns.
 
-Analyze these posts to detect PATTERNS and TRENDS, not individual incidents:
+Analyze these posts to detect PATTERNS and TRENDS, not individual incidents.
+"prefilter matched" notes come from a keyword lexicon: use them as hints, not as verdicts.
+A post marked as a near-duplicate cluster stands for that many near-identical posts: count all of them.
 
 {combined_content}
 
@@ -244,104 +396,634 @@ Response format (JSON only):
   "recommend_escalation": 0 or 1,
   "uncertainty_notes": "any concerns about classification",
   "affected_posts_count": number of posts showing this pattern,
+  "affected_post_ids": [ids of the posts showing this pattern],
   "affected_channels": ["channel1", "channel2"]
 }}
 
-Only flag if pattern appears in 3+ posts. If not a threat pattern, set is_threat to false.
+These posts are one batch of a larger set; counts from every batch are combined before anything is escalated.
+Flag a pattern even if only one or two of these posts show it, and count affected_posts_count exactly.
+If not a threat pattern, set is_threat to false.
 """
+    
+    async def analyze_posts_batch(self, posts: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Analyze one planned batch of posts together; returns the verdict if it
+        is a threat. Raises when Ollama cannot be reached, so the posts are not
+        acknowledged as analyzed; an unparseable answer only loses the verdict.
+        """
+        if not posts:
+            return None
         
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            try:
-                response = await client.post(
-                    f"{self.ollama_url}/api/generate",
-                    json={
-                        "model": self.ollama_model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "temperature": 0.3,
-                        "format": "json"
-                    }
+        try:
+            llm_output = await self.http.generate(
+                self._batch_prompt(posts),
+                format="json",
+                options={"temperature": 0.3, "num_ctx": self.context_tokens},
+                timeout=90.0
+            )
+            analysis = json.loads(llm_output or '{}')
+            self._cache_batch_verdict(posts, analysis)
+            
+            if analysis.get('is_threat', False):
+                sizes = {str(p.get('post_id')): (p.get('cluster') or {}).get('size', 1) for p in posts}
+                total = sum(sizes.values())
+                affected_ids = [str(i) for i in analysis.get('affected_post_ids') or [] if str(i) in sizes]
+                if affected_ids:
+                    # Each listed representative counts for its whole cluster
+                    affected = sum(sizes[i] for i in set(affected_ids))
+                else:
+                    # Small models miscount; a batch cannot affect more posts than it stands for
+                    try:
+                        affected = int(analysis.get('affected_posts_count') or total)
+                    except (TypeError, ValueError):
+                        affected = total
+                analysis['affected_posts_count'] = min(max(affected, 1), total)
+                analysis['clusters'] = [
+                    p['cluster'] for p in posts
+                    if p.get('cluster', {}).get('size', 1) > 1 and (not affected_ids or str(p.get('post_id')) in affected_ids)
+                ]
+                logger.info(f"Batch threat detected: {analysis.get('signal_type')} (confidence: {analysis.get('confidence')}%) "
+                            f"in {analysis['affected_posts_count']} of {total} posts")
+                # What the coalescer matches repeats on: the posts the threat was found in
+                analysis['fingerprint'] = combine(
+                    minhash(p.get('content', '') or '') for p in posts
+                    if not affected_ids or str(p.get('post_id')) in affected_ids
                 )
-                response.raise_for_status()
-                result = response.json()
-                
-                llm_output = result.get('response', '{}')
-                analysis = json.loads(llm_output)
-                
-                if analysis.get('is_threat', False):
-                    logger.info(f"Aggregate threat detected: {analysis.get('signal_type')} (confidence: {analysis.get('confidence')}%)")
-                    logger.info(f"Pattern found in {analysis.get('affected_posts_count', len(posts))} posts")
-                    return analysis
-                
-                return None
-                
+                return analysis
+            
+            return None
+            
+        except httpx.HTTPError:
+            raise
+        except Exception as e:
+            logger.error(f"Error analyzing post batch with LLM: {e}")
+            return None
+    
+    def _post_cache_key(self, post: Dict[str, Any]) -> str:
+        # split_cached stores the key before the planner may clip the content
+        if 'verdict_key' in post:
+            return post['verdict_key']
+        return verdict_key(post.get('content', '') or '', self.ollama_model, BATCH_PROMPT_VERSION)
+    
+    def _cache_batch_verdict(self, posts: List[Dict[str, Any]], analysis: Dict[str, Any]):
+        """
+        Record the threat a batch verdict attributes to the posts it lists
+        under affected_post_ids; a cluster representative's verdict is stored
+        for every member. A threat verdict without ids cannot be attributed.
+
+        Nothing is cached as benign. "Benign" is what the batch prompt
+        concluded about the batch as a whole, and a post that looked harmless
+        once may be part of a campaign when it comes back in a wave of
+        repeats: repeats are analyzed again, with their cluster size.
+        """
+        if not self.verdict_cache or not analysis.get('is_threat', False):
+            return
+        affected_ids = {str(i) for i in analysis.get('affected_post_ids') or []}
+        threat = {field: analysis.get(field) for field in VERDICT_FIELDS}
+        for post in posts:
+            if str(post.get('post_id')) in affected_ids:
+                for key in post.get('cluster_keys') or [self._post_cache_key(post)]:
+                    self.verdict_cache.put(key, threat)
+    
+    def _cached_post_verdict(self, post: Dict[str, Any], verdict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """A cached per-post threat as a one-post verdict for merge_verdicts"""
+        if not verdict.get('is_threat', False):
+            return None
+        return {
+            **verdict,
+            'affected_posts_count': 1,
+            'affected_channels': [post.get('channel') or 'general'],
+            'fingerprint': minhash(post.get('content', '') or ''),
+            'cached': True,
+        }
+    
+    def split_cached(self, posts: List[Dict[str, Any]]):
+        """
+        Split posts into (fresh, cached, repeats): fresh posts need the LLM,
+        cached ones come with their (post, verdict), and repeats have the same
+        content as a fresh post earlier in this cycle.
+        """
+        if not self.verdict_cache:
+            return posts, [], []
+        fresh, cached, repeats, seen = [], [], [], set()
+        for post in posts:
+            key = self._post_cache_key(post)
+            if key in seen:
+                repeats.append(post)
+                continue
+            seen.add(key)
+            verdict = self.verdict_cache.get(key)
+            if verdict is None:
+                fresh.append({**post, 'verdict_key': key})
+            else:
+                cached.append((post, verdict))
+        return fresh, cached, repeats
+    
+    def screen_posts(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Posts worth an LLM call, with the prefilter's hints attached (all posts when it is off)"""
+        if not self.prefilter:
+            return posts
+        flagged = []
+        for post in posts:
+            if 'screening' not in post:
+                post['screening'] = self.prefilter.screen(post.get('content', '') or '')
+            screening = post['screening']
+            if self.prefilter.passes(screening):
+                flagged.append({**post, 'prefilter_hints': screening.hints()})
+        self.prefilter_stats["posts_screened"] += len(posts)
+        self.prefilter_stats["posts_skipped"] += len(posts) - len(flagged)
+        return flagged
+    
+    async def cluster_near_duplicates(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        One representative per near-duplicate cluster, annotated with the
+        cluster's summary and its members' cache keys (all posts when
+        clustering is off)
+        """
+        if self.near_dup_threshold is None and self.embeddings is None:
+            return posts
+        if self.near_dup_threshold is None:
+            clusters = [Cluster([post]) for post in posts]
+        else:
+            clusters = cluster_posts(posts, self.near_dup_threshold)
+        if self.embeddings and len(clusters) > 1:
+            try:
+                clusters = await asyncio.to_thread(self._merge_paraphrases, clusters)
             except Exception as e:
-                logger.error(f"Error analyzing post batch with LLM: {e}")
-                return None
+                # Paraphrase merging is an optimization: analyze the MinHash clusters as they are
+                logger.warning(f"Paraphrase merging skipped: {e}")
+        representatives = []
+        for cluster in clusters:
+            representatives.append({
+                **cluster.representative,
+                'cluster': cluster.summary(),
+                'cluster_keys': [self._post_cache_key(p) for p in cluster.posts],
+            })
+        return representatives
+    
+    def _merge_paraphrases(self, clusters: List[Cluster]) -> List[Cluster]:
+        """Merge clusters whose representatives embed within semantic_threshold (blocking)"""
+        rows = self.embeddings.encode([c.representative.get('content', '') or '' for c in clusters])
+        return [
+            Cluster([post for i in group for post in clusters[i].posts])
+            for group in self.embeddings.cluster(rows, self.semantic_threshold)
+        ]
+    
+    async def analyze_posts(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Plan context-sized batches, analyze them concurrently (the gateway
+        bounds how many reach Ollama at once) and merge their verdicts into
+        aggregate signals. Posts rejected by the prefilter and posts with a
+        cached verdict never reach the LLM, and near-duplicates reach it once,
+        through their cluster's representative.
+        """
+        time_key = lambda p: self._parse_post_timestamp(p.get('timestamp', '')) or datetime.min
+        flagged = self.screen_posts(posts)
+        fresh, cached, repeats = self.split_cached(flagged)
+        representatives = await self.cluster_near_duplicates(fresh)
+        batches = self.batch_planner.plan(representatives, time_key=time_key)
+        if self.prefilter:
+            # Calls the same posts would have cost unfiltered
+            saved = len(self.batch_planner.plan(posts, time_key=time_key)) - len(self.batch_planner.plan(flagged, time_key=time_key))
+            self.prefilter_stats["llm_calls_saved"] += saved
+            logger.info(f"Prefilter: {len(flagged)}/{len(posts)} posts passed, {saved} LLM call(s) saved")
+        if len(representatives) < len(fresh):
+            saved = len(self.batch_planner.plan(fresh, time_key=time_key)) - len(batches)
+            self.cluster_stats["posts_clustered"] += len(fresh) - len(representatives)
+            self.cluster_stats["llm_calls_saved"] += saved
+            logger.info(f"Near-duplicates: {len(fresh)} posts in {len(representatives)} clusters, {saved} LLM call(s) saved")
+        if self.verdict_cache and (cached or repeats):
+            saved = len(self.batch_planner.plan(flagged, time_key=time_key)) - len(self.batch_planner.plan(fresh, time_key=time_key))
+            self.cache_stats["posts_cached"] += len(cached) + len(repeats)
+            self.cache_stats["llm_calls_saved"] += saved
+            logger.info(f"Verdict cache: {len(cached) + len(repeats)}/{len(flagged)} posts already analyzed, "
+                        f"{saved} LLM call(s) saved")
+        
+        verdicts = []
+        if batches:
+            logger.info(
+                f"Planned {len(batches)} batch(es) for {len(representatives)} posts "
+                f"(~{max(b.tokens for b in batches)} post tokens max, budget {self.batch_planner.budget})"
+            )
+            results = await asyncio.gather(*(self.analyze_posts_batch(b.posts) for b in batches), return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise RuntimeError(f"{len(errors)}/{len(batches)} batch(es) could not be analyzed: {errors[0]!r}")
+            verdicts = list(results)
+        
+        # Repeats are looked up after their fresh twin has been analyzed
+        cached += [(post, verdict) for post in repeats
+                   for verdict in [self.verdict_cache.get(self._post_cache_key(post))] if verdict]
+        verdicts += [self._cached_post_verdict(post, verdict) for post, verdict in cached]
+        
+        # A pattern must show up in min_pattern_posts posts, or in all of them when fewer arrived
+        threshold = min(self.min_pattern_posts, len(posts))
+        signals = []
+        for signal in merge_verdicts([v for v in verdicts if v]):
+            if signal['affected_posts_count'] >= threshold:
+                logger.info(f"Aggregate threat: {signal['signal_type']} in {signal['affected_posts_count']} posts "
+                            f"across {signal['batches']} batch(es), {signal['cached_posts']} from cache "
+                            f"(confidence: {signal['confidence']}%)")
+                signals.append(signal)
+            else:
+                logger.info(f"Ignoring {signal['signal_type']}: only {signal['affected_posts_count']} affected posts")
+        return signals
     
     async def process_posts(self):
-        """Main processing loop - fetch, analyze aggregate patterns, and report"""
+        """Main processing loop - stream new posts, analyze aggregate patterns, and report"""
         logger.info("🔍 Starting post analysis cycle...")
         
-        # Fetch all posts
-        all_posts = await self.fetch_social_media_posts()
-        
-        # Filter to new posts only
-        new_posts = self.filter_new_posts(all_posts)
+        # Analyze page by page as posts stream in, rather than loading the
+        # whole backlog first. A page is acknowledged once its signals are
+        # queued; if anything fails before that, the next cycle gets it again.
+        fetched, analyzed = 0, 0
+        try:
+            async for posts, cursor in self.iter_sync_pages():
+                fetched += len(posts)
+                if posts:
+                    analyzed += await self._analyze_sync_batch(posts)
+                await self.ack_sync(cursor)
+        except Exception as e:
+            logger.error(f"Error syncing social media posts: {e}")
         
-        if not new_posts:
+        logger.info(f"Fetched {fetched} posts from social media")
+        if not analyzed:
             logger.info("No new posts to analyze")
-            return
+        self.log_gateway_metrics()
+    
+    def log_gateway_metrics(self):
+        """Log per-target request counts and latency from the shared client"""
+        if self.prefilter:
+            stats = self.prefilter_stats
+            logger.info(
+                f"📈 prefilter: {stats['posts_skipped']}/{stats['posts_screened']} posts skipped, "
+                f"{stats['llm_calls_saved']} LLM calls saved"
+            )
+        if self.verdict_cache:
+            stats = self.verdict_cache.stats()
+            logger.info(
+                f"📈 verdict cache: hit rate {stats['hit_rate']:.0%} ({stats['memory_hits']} memory, "
+                f"{stats['disk_hits']} disk, {stats['misses']} misses), "
+                f"{self.cache_stats['llm_calls_saved']} LLM calls saved"
+            )
+        if self.near_dup_threshold is not None or self.embeddings:
+            stats = self.cluster_stats
+            logger.info(
+                f"📈 near-duplicates: {stats['posts_clustered']} posts folded into clusters, "
+                f"{stats['llm_calls_saved']} LLM calls saved"
+            )
+        if self.coalescer:
+            stats = self.coalescer.stats.to_dict()
+            logger.info(
+                f"📈 coalescer: {stats['sent']}/{stats['received']} signals sent, "
+                f"{stats['suppressed']} merged into open signals ({len(self.coalescer.open)} open)"
+            )
+        stats = self.outbox.stats()
+        logger.info(f"📈 outbox: {stats['pending']} pending ({stats['retrying']} retrying), {stats['delivered']} delivered")
+        if self.spike_detector:
+            stats = self.spike_detector.stats()
+            logger.info(f"📈 spike detector: {stats['posts_observed']} posts counted in {stats['series']} series")
+        if self.embeddings:
+            stats = self.embeddings.stats()
+            logger.info(
+                f"📈 embeddings: {stats['vectors']} cached vectors, hit rate {stats['hit_rate']:.0%}, "
+                f"{stats['encoded']} encoded"
+            )
+        for target, metrics in self.http.snapshot()["targets"].items():
+            logger.info(
+                f"📈 {target}: {metrics['requests']} requests, {metrics['retries']} retries, "
+                f"{metrics['failures']} failures, p50 {metrics['latency_ms']['p50']}ms, "
+                f"p95 {metrics['latency_ms']['p95']}ms"
+            )
+    
+    async def _analyze_sync_batch(self, posts: List[Dict[str, Any]]) -> int:
+        """Analyze the posts of one sync page that are new (not resent for their comments). Returns how many were new."""
+        new_posts = [p for p in posts if self._is_new_post(p)]
+        logger.info(f"Found {len(new_posts)} new posts in a page of {len(posts)}")
+        if new_posts:
+            await self.analyze_new_posts(new_posts)
+        return len(new_posts)
+    
+    def detect_spikes(self, posts: List[Dict[str, Any]]) -> List[Spike]:
+        """
+        Feed posts to the spike detector in event-time order. When the
+        prefilter is on, a post's lexicon categories are its topic keys (the
+        screening stored by screen_posts is reused).
+        """
+        spikes = []
+        now = datetime.now().timestamp()
+        timed = []
+        for post in posts:
+            parsed = self._parse_post_timestamp(post.get('timestamp', ''))
+            timed.append((parsed.timestamp() if parsed else now, post))
+        for timestamp, post in sorted(timed, key=lambda t: t[0]):
+            topics = []
+            if self.prefilter:
+                if 'screening' not in post:
+                    post['screening'] = self.prefilter.screen(post.get('content', '') or '')
+                topics = [m['category'] for m in post['screening'].matches]
+            spikes += self.spike_detector.observe(post, timestamp, topics)
+        return spikes
+    
+    @staticmethod
+    def group_spikes(spikes: List[Spike]) -> List[List[Spike]]:
+        """
+        Spikes in the same window, strongest first: one burst usually lifts
+        its channel and a topic or two at once
+        """
+        groups: Dict[tuple, List[Spike]] = {}
+        for spike in spikes:
+            groups.setdefault((spike.resolution, spike.bucket_start), []).append(spike)
+        return [sorted(group, key=lambda s: s.z_score, reverse=True) for group in groups.values()]
+    
+    async def label_spike(self, spikes: List[Spike]) -> Dict[str, Any]:
+        """Ask the LLM what a group of spikes is about; the spike stands even if it cannot say"""
+        spike = spikes[0]
+        samples = POST_SEPARATOR.join(format_batch_post(p) for p in spike.samples)
+        prompt = f"""You are a fraud detection AI. Post volume on a bank's social media suddenly spiked:
+{"; ".join(s.describe() for s in spikes)}. Counts of the preceding {spike.resolution} windows: {spike.recent}.
+
+Sample posts from the spike:
+
+{samples}
+
+Label what the spike is about.
+
+Response format (JSON only):
+{{
+  "signal_type": short label, e.g. "Phishing SMS Campaign", "Service Outage Complaints", "Promotion Buzz",
+  "is_threat": true/false,
+  "confidence": 0-100,
+  "drivers": ["what the posts have in common"],
+  "recommend_escalation": 0 or 1,
+  "uncertainty_notes": "any concerns about the label"
+}}
+"""
+        label = {}
+        try:
+            llm_output = await self.http.generate(
+                prompt,
+                format="json",
+                options={"temperature": 0.3, "num_ctx": self.context_tokens},
+                timeout=60.0
+            )
+            label = json.loads(llm_output or '{}')
+        except Exception as e:
+            logger.error(f"Error labelling volume spike with LLM: {e}")
         
+        topic = label.get('signal_type') or f"{spike.kind} {spike.name}"
+        return {
+            'signal_type': f"Volume Spike: {topic}",
+            'confidence': label.get('confidence') or min(50 + 10 * spike.z_score, 95),
+            'drivers': [s.describe() for s in spikes] + [f"Preceding {spike.resolution} windows: {spike.recent}"] + list(label.get('drivers') or []),
+            'recommend_escalation': int(bool(label.get('recommend_escalation', label.get('is_threat', False)))),
+            'uncertainty_notes': label.get('uncertainty_notes') or ("" if label else "Spike could not be labelled by the LLM"),
+            'affected_posts_count': max(s.count for s in spikes),
+            'affected_channels': sorted({s.name for s in spikes if s.kind == "channel"}),
+            'fingerprint': combine(minhash(p.get('content', '') or '') for p in spike.samples),
+        }
+    
+    async def analyze_new_posts(self, new_posts: List[Dict[str, Any]]):
+        """Analyze a set of new posts for aggregate patterns, report, and advance state"""
         logger.info(f"Analyzing {len(new_posts)} new posts for aggregate patterns...")
+        payloads = []
         
-        # Analyze ALL new posts together for patterns (not individually)
-        analysis = await self.analyze_posts_batch(new_posts)
+        # Analyze the new posts together for patterns (not individually).
+        # This goes first: if the LLM is down it raises before the spike
+        # detector has counted the posts, so a replay does not count them twice
+        signals = await self.analyze_posts(new_posts)
         
-        if analysis:
-            # Send ONE signal for the aggregate pattern
-            await self.send_signal_to_bank(analysis, new_posts[0])  # Include first post as reference
-            logger.info(f"✨ Aggregate signal sent: {analysis.get('signal_type')}")
-        else:
+        # ONE signal per aggregate pattern; the same posts yield the same key if analyzed again
+        post_ids = sorted(str(p.get('post_id')) for p in new_posts)
+        for signal in signals:
+            key = signal_key("aggregate", signal['signal_type'].strip().lower(), post_ids)
+            payloads.append(self.outgoing_signal(signal, key))
+            logger.info(f"✨ Aggregate signal: {signal.get('signal_type')}")
+        if not signals:
             logger.info(f"No significant threat patterns detected in {len(new_posts)} posts")
         
-        # Update last processed time
-        if new_posts:
-            latest_time = max(
-                self._parse_post_timestamp(p.get('timestamp', ''))
-                for p in new_posts
-                if self._parse_post_timestamp(p.get('timestamp', ''))
-            )
-            if latest_time:
-                self.last_processed_time = latest_time
-                self._save_state()
+        if self.spike_detector:
+            for spikes in self.group_spikes(self.detect_spikes(new_posts)):
+                logger.info(f"📊 Volume spike: {'; '.join(s.describe() for s in spikes)}")
+                signal = await self.label_spike(spikes)
+                key = signal_key("spike", [(s.kind, s.name, s.resolution, s.bucket_start) for s in spikes])
+                payloads.append(self.outgoing_signal(signal, key))
+                logger.info(f"✨ Spike signal: {signal['signal_type']}")
+        
+        # Queued (committed to the outbox) before the caller acknowledges the posts
+        self.queue_signals([p for p in payloads if p])
+        
+        self.mark_analyzed(new_posts)
     
-    async def run(self):
-        """Run the FDA agent continuously"""
-        logger.info(f"🚀 FDA Agent started - polling every {self.poll_interval} seconds")
+    async def iter_change_feed(self):
+        """Yield (event_id, event, data) from the social media change feed (SSE)"""
+        headers = {"Accept": "text/event-stream"}
+        if self.feed_cursor:
+            # Resume: the server replays everything after this event first
+            headers["Last-Event-ID"] = self.feed_cursor
         
-        while True:
-            try:
-                await self.process_posts()
-            except Exception as e:
-                logger.error(f"Error in processing cycle: {e}")
+        timeout = httpx.Timeout(30.0, read=None)
+        async with self.http.client.stream(
+            "GET", f"{self.social_media_url}/api/events", headers=headers, timeout=timeout
+        ) as response:
+            response.raise_for_status()
+            event_id, event, data_lines = None, "message", []
+            async for line in response.aiter_lines():
+                if not line:
+                    # Blank line terminates an event
+                    if data_lines:
+                        yield event_id, event, json.loads("\n".join(data_lines))
+                    event_id, event, data_lines = None, "message", []
+                elif line.startswith(":"):
+                    continue  # keepalive comment
+                elif line.startswith("id:"):
+                    event_id = line[3:].strip()
+                elif line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[5:].strip())
+    
+    async def run_streaming(self):
+        """
+        Consume the push feed; analyze posts as they arrive in short
+        micro-batches. The feed cursor is saved only once a batch's signals
+        are queued; when a batch fails the feed is reopened from the saved
+        cursor, so the server replays it. Replayed posts already analyzed in
+        this run are skipped by id.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        seen_post_ids: OrderedDict = OrderedDict()
+        
+        async def consume(queue: asyncio.Queue):
+            backoff = 1
+            while True:
+                try:
+                    async for event_id, event, data in self.iter_change_feed():
+                        backoff = 1
+                        await queue.put((event_id, event, data))
+                    logger.warning("Change feed closed by server, reconnecting...")
+                except Exception as e:
+                    logger.error(f"Change feed error: {e} - reconnecting in {backoff}s")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+        
+        consumer = asyncio.create_task(consume(queue))
+        try:
+            while True:
+                # Wait for the first event, then gather whatever arrives within the window
+                events = [await queue.get()]
+                await asyncio.sleep(self.stream_batch_window)
+                while not queue.empty():
+                    events.append(queue.get_nowait())
+                
+                posts = [data for _, event, data in events if event == "post"
+                         and data.get('post_id') not in seen_post_ids]
+                last_event_id = events[-1][0]
+                
+                try:
+                    if posts:
+                        await self.analyze_new_posts(posts)
+                except Exception as e:
+                    logger.error(f"Error in processing cycle: {e} - replaying the feed from the last saved event")
+                    consumer.cancel()
+                    await asyncio.gather(consumer, return_exceptions=True)
+                    queue = asyncio.Queue()
+                    consumer = asyncio.create_task(consume(queue))
+                    continue
+                
+                for post in posts:
+                    seen_post_ids[post.get('post_id')] = None
+                while len(seen_post_ids) > STREAM_SEEN_POST_IDS:
+                    seen_post_ids.popitem(last=False)
+                if last_event_id:
+                    self.feed_cursor = last_event_id
+                    self._save_state()
+        finally:
+            consumer.cancel()
+    
+    async def run(self):
+        """Run the FDA agent continuously, delivering queued signals alongside"""
+        sender = asyncio.create_task(self.run_outbox_sender())
+        try:
+            if self.feed_mode == "stream":
+                logger.info(f"🚀 FDA Agent started - consuming change feed at {self.social_media_url}/api/events")
+                await self.run_streaming()
+                return
             
-            # Wait before next cycle
-            logger.info(f"💤 Waiting {self.poll_interval} seconds until next cycle...\n")
-            await asyncio.sleep(self.poll_interval)
+            logger.info(f"🚀 FDA Agent started - polling every {self.poll_interval} seconds")
+            
+            while True:
+                try:
+                    await self.process_posts()
+                except Exception as e:
+                    logger.error(f"Error in processing cycle: {e}")
+                
+                # Wait before next cycle
+                logger.info(f"💤 Waiting {self.poll_interval} seconds until next cycle...\n")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            sender.cancel()
 
 
 async def main():
     """Entry point"""
+    parser = argparse.ArgumentParser(description="FDA Agent")
+    parser.add_argument(
+        "--mode", choices=["poll", "stream"], default="poll",
+        help="poll /api/sync on an interval, or consume the /api/events push feed"
+    )
+    parser.add_argument(
+        "--llm-concurrency", type=int, default=2,
+        help="Ollama requests allowed in flight at once"
+    )
+    parser.add_argument("--max-retries", type=int, default=3, help="retries for failed requests")
+    parser.add_argument("--retry-delay", type=float, default=2.0, help="base backoff between retries (seconds)")
+    parser.add_argument(
+        "--context-tokens", type=int, default=4096,
+        help="model context window that batch prompts are packed to"
+    )
+    parser.add_argument("--lexicon", default=None, help="threat lexicon JSON (default: lexicon.json next to this script)")
+    parser.add_argument(
+        "--prefilter-min-score", type=int, default=1,
+        help="lexicon score a post needs before it is sent to the LLM"
+    )
+    parser.add_argument("--no-prefilter", action="store_true", help="send every post to the LLM")
+    parser.add_argument(
+        "--verdict-cache", default=None,
+        help="SQLite file for cached LLM verdicts (default: verdict_cache.db next to this script)"
+    )
+    parser.add_argument("--verdict-cache-ttl-hours", type=float, default=168, help="how long cached verdicts stay valid")
+    parser.add_argument("--no-verdict-cache", action="store_true", help="ask the LLM about every post, even repeats")
+    parser.add_argument(
+        "--near-dup-threshold", type=float, default=0.6,
+        help="estimated Jaccard similarity at which posts are clustered as near-duplicates"
+    )
+    parser.add_argument("--no-near-dup", action="store_true", help="analyze near-duplicate posts one by one")
+    parser.add_argument(
+        "--semantic-threshold", type=float, default=None,
+        help="also merge clusters whose posts are paraphrases (embedding cosine similarity); off by default"
+    )
+    parser.add_argument("--spike-z", type=float, default=4.0, help="z-score over the EWMA baseline that counts as a volume spike")
+    parser.add_argument("--spike-min-posts", type=int, default=10, help="posts a window needs before it can spike")
+    parser.add_argument("--no-spike-detector", action="store_true", help="do not count post volume per channel and topic")
+    parser.add_argument("--outbox", default=None, help="SQLite file for undelivered signals (default: outbox.db next to this script)")
+    parser.add_argument(
+        "--coalesce-window", type=float, default=900,
+        help="seconds a sent signal stays open to absorb repeats (0 sends every detection)"
+    )
+    parser.add_argument(
+        "--coalesce-confidence-delta", type=float, default=10,
+        help="confidence change (points) that sends an update of an open signal"
+    )
+    parser.add_argument(
+        "--coalesce-magnitude-ratio", type=float, default=2.0,
+        help="growth of affected posts since the last send that sends an update"
+    )
+    parser.add_argument(
+        "--embedding-cache", default=None,
+        help="directory for cached post embeddings (default: embeddings/ next to this script)"
+    )
+    args = parser.parse_args()
+    
     agent = FDAAgent(
         poll_interval=30,  # Check every 30 seconds
-        ollama_model="ministral-3:3b"
+        ollama_model="ministral-3:3b",
+        feed_mode=args.mode,
+        llm_concurrency=args.llm_concurrency,
+        max_retries=args.max_retries,
+        retry_delay=args.retry_delay,
+        context_tokens=args.context_tokens,
+        prefilter=not args.no_prefilter,
+        lexicon_path=args.lexicon,
+        prefilter_min_score=args.prefilter_min_score,
+        verdict_cache=not args.no_verdict_cache,
+        verdict_cache_path=args.verdict_cache,
+        verdict_cache_ttl_s=args.verdict_cache_ttl_hours * 3600,
+        near_dup_threshold=None if args.no_near_dup else args.near_dup_threshold,
+        semantic_threshold=args.semantic_threshold,
+        embedding_cache_dir=args.embedding_cache,
+        spike_detection=not args.no_spike_detector,
+        spike_z_threshold=args.spike_z,
+        spike_min_posts=args.spike_min_posts,
+        outbox_path=args.outbox,
+        coalesce_window_s=args.coalesce_window,
+        coalesce_confidence_delta=args.coalesce_confidence_delta,
+        coalesce_magnitude_ratio=args.coalesce_magnitude_ratio
     )
     
     try:
         await agent.run()
     except KeyboardInterrupt:
         logger.info("FDA Agent stopped by user")
+    finally:
+        await agent.http.aclose()
+        if agent.verdict_cache:
+            agent.verdict_cache.close()
+        if agent.embeddings:
+            agent.embeddings.close()
+        if agent.coalescer:
+            agent.coalescer.close()
+        agent.outbox.close()
 
 
 if __name__ == "__main__":
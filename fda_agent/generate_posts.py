@@ -108,6 +108,62 @@ class SocialMediaGenerator:
                 print(f"❌ Error adding comment: {e}")
                 return {}
     
+    async def _post_bulk(self, path: str, items: List[dict]) -> List[int]:
+        """POST a batch to one of the /bulk endpoints and return the assigned ids"""
+        if not items:
+            return []
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            try:
+                response = await client.post(f"{self.base_url}{path}", json=items)
+                response.raise_for_status()
+                return response.json().get("ids", [])
+            except Exception as e:
+                print(f"❌ Error in bulk request to {path}: {e}")
+                return []
+    
+    async def create_posts_bulk(self, posts: List[dict]) -> List[int]:
+        """Create many posts ({content, channel_id}) in one request"""
+        ids = await self._post_bulk("/posts/bulk", [
+            {"content": p["content"], "channel_id": p.get("channel_id", "general"),
+             "image_url": None, "scheduled_at": None}
+            for p in posts
+        ])
+        print(f"✅ Bulk-created {len(ids)} posts")
+        return ids
+    
+    async def add_comments_bulk(self, comments: List[dict]) -> List[int]:
+        """Create many comments/replies ({post_id, text, parent_id}) in one request"""
+        ids = await self._post_bulk("/comments/bulk", comments)
+        print(f"  💬 Bulk-created {len(ids)} comments/replies")
+        return ids
+    
+    async def _generate_bulk(self, posts: List[dict], comment_range, reply_max: int = 0) -> List[dict]:
+        """
+        Create posts, then their comments, then replies, in three bulk requests.
+        comment_range maps a post dict to a (min, max) comment count.
+        """
+        post_ids = await self.create_posts_bulk(posts)
+        created_posts = [dict(post, id=post_id) for post, post_id in zip(posts, post_ids)]
+        
+        comments = []
+        for post in created_posts:
+            low, high = comment_range(post)
+            for _ in range(random.randint(low, high)):
+                comments.append({"post_id": post["id"], "text": random.choice(COMMENTS), "parent_id": None})
+        comment_ids = await self.add_comments_bulk(comments)
+        
+        replies = []
+        if reply_max:
+            by_post = {}
+            for comment, comment_id in zip(comments, comment_ids):
+                by_post.setdefault(comment["post_id"], []).append(comment_id)
+            for post_id, ids in by_post.items():
+                for _ in range(random.randint(0, min(reply_max, len(ids)))):
+                    replies.append({"post_id": post_id, "text": random.choice(REPLIES),
+                                    "parent_id": random.choice(ids)})
+        await self.add_comments_bulk(replies)
+        return created_posts
+    
     async def get_posts(self, channel: str = None) -> List[dict]:
         """Get posts from social media"""
         async with httpx.AsyncClient(timeout=30.0) as client:
@@ -123,10 +179,17 @@ class SocialMediaGenerator:
                 print(f"❌ Error fetching posts: {e}")
                 return []
     
-    async def generate_threat_scenario(self, num_posts: int = 5):
+    async def generate_threat_scenario(self, num_posts: int = 5, bulk: bool = False):
         """Generate a scenario with threat posts, comments, and replies"""
         print(f"\n🚨 Generating {num_posts} THREAT posts for FDA detection...\n")
         
+        if bulk:
+            posts = [{"content": random.choice(THREAT_POSTS), "channel_id": random.choice(CHANNELS)}
+                     for _ in range(num_posts)]
+            created_posts = await self._generate_bulk(posts, lambda post: (1, 3), reply_max=2)
+            print(f"\n✨ Generated {len(created_posts)} threat posts with comments and replies!")
+            return created_posts
+        
         created_posts = []
         
         for i in range(num_posts):
@@ -166,10 +229,19 @@ class SocialMediaGenerator:
         print(f"\n✨ Generated {len(created_posts)} threat posts with comments and replies!")
         return created_posts
     
-    async def generate_legitimate_scenario(self, num_posts: int = 10):
+    async def generate_legitimate_scenario(self, num_posts: int = 10, bulk: bool = False):
         """Generate legitimate posts for normal activity"""
         print(f"\n📝 Generating {num_posts} LEGITIMATE posts...\n")
         
+        if bulk:
+            posts = [{"content": random.choice(LEGITIMATE_POSTS), "channel_id": random.choice(CHANNELS)}
+                     for _ in range(num_posts)]
+            created_posts = await self._generate_bulk(
+                posts, lambda post: (1, 2) if random.random() > 0.5 else (0, 0)
+            )
+            print(f"\n✨ Generated {len(created_posts)} legitimate posts!")
+            return created_posts
+        
         created_posts = []
         
         for i in range(num_posts):
@@ -203,7 +275,7 @@ class SocialMediaGenerator:
         print(f"\n✨ Generated {len(created_posts)} legitimate posts!")
         return created_posts
     
-    async def generate_mixed_scenario(self, threat_count: int = 5, legit_count: int = 10):
+    async def generate_mixed_scenario(self, threat_count: int = 5, legit_count: int = 10, bulk: bool = False):
         """Generate a mixed scenario of threats and legitimate posts"""
         print(f"\n🎭 Generating MIXED scenario: {threat_count} threats + {legit_count} legitimate posts\n")
         
@@ -220,6 +292,15 @@ class SocialMediaGenerator:
         
         random.shuffle(all_posts)
         
+        if bulk:
+            threats = {content for content, _, is_threat in all_posts if is_threat}
+            await self._generate_bulk(
+                [{"content": content, "channel_id": channel} for content, channel, _ in all_posts],
+                lambda post: (2, 4) if post["content"] in threats else (0, 2)
+            )
+            print(f"\n✨ Mixed scenario complete!")
+            return
+        
         for content, channel, is_threat in all_posts:
             post = await self.create_post(content, channel)
             
@@ -255,24 +336,25 @@ async def main():
     print("4. Custom amounts")
     
     choice = input("\nEnter choice (1-4): ").strip()
+    bulk = (input("Use bulk mode (one request per batch, no delays)? [y/N]: ").strip().lower() == "y")
     
     if choice == "1":
         num = int(input("How many threat posts? (default 5): ") or "5")
-        await generator.generate_threat_scenario(num)
+        await generator.generate_threat_scenario(num, bulk=bulk)
     elif choice == "2":
         num = int(input("How many legitimate posts? (default 10): ") or "10")
-        await generator.generate_legitimate_scenario(num)
+        await generator.generate_legitimate_scenario(num, bulk=bulk)
     elif choice == "3":
         threats = int(input("How many threat posts? (default 5): ") or "5")
         legit = int(input("How many legitimate posts? (default 10): ") or "10")
-        await generator.generate_mixed_scenario(threats, legit)
+        await generator.generate_mixed_scenario(threats, legit, bulk=bulk)
     elif choice == "4":
         threats = int(input("How many threat posts? ") or "0")
         legit = int(input("How many legitimate posts? ") or "0")
         if threats > 0:
-            await generator.generate_threat_scenario(threats)
+            await generator.generate_threat_scenario(threats, bulk=bulk)
         if legit > 0:
-            await generator.generate_legitimate_scenario(legit)
+            await generator.generate_legitimate_scenario(legit, bulk=bulk)
     else:
         print("Invalid choice. Exiting.")
     
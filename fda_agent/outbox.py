@@ -0,0 +1,126 @@
+"""
+Durable outbox for signals sent from the FDA agent to the bank.
+
+Signals are written here before the agent acknowledges the posts they came
+from (POST /api/sync/ack, or saving its feed cursor), and a sender delivers
+them afterwards, so a slow or restarting bank backend delays signals instead
+of losing them. Posts are only acknowledged once analyzed: if the agent or
+the LLM fails first, the social media backend sends them again. Each signal
+has an idempotency key derived from what it is about (see signal_key): the
+bank records a key once and answers redeliveries with the original workflow,
+which makes at-least-once delivery safe. That covers retries after a lost
+response, and a signal re-detected because the agent stopped between
+enqueueing it and acknowledging its posts.
+
+A failed delivery is retried with exponential backoff from `retry_delay`,
+capped at `max_retry_delay`. Delivered rows are deleted after
+`keep_delivered_s`.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_PATH = Path(__file__).with_name("outbox.db")
+
+
+def signal_key(*parts: Any) -> str:
+    """Idempotency key of a signal, from the facts that identify it"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Outbox:
+    """SQLite queue of bank payloads keyed by idempotency key"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        retry_delay: float = 2.0,
+        max_retry_delay: float = 300.0,
+        keep_delivered_s: float = 24 * 3600,
+    ):
+        self.path = Path(path or DEFAULT_PATH)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.keep_delivered_s = keep_delivered_s
+
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Signals must survive a crash right after they are enqueued
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " idempotency_key TEXT NOT NULL UNIQUE,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " last_error TEXT,"
+            " delivered_at REAL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_outbox_pending ON outbox (next_attempt_at) WHERE delivered_at IS NULL"
+        )
+        self._db.commit()
+
+    def add(self, payloads: Iterable[Dict[str, Any]]) -> int:
+        """Enqueue payloads (each with its idempotency_key) in one transaction; known keys are skipped"""
+        now = time.time()
+        with self._db:
+            cursor = self._db.executemany(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, payload, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                [(p["idempotency_key"], json.dumps(p), now, now) for p in payloads],
+            )
+        return cursor.rowcount
+
+    def due(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Undelivered payloads whose next attempt is due, oldest first"""
+        rows = self._db.execute(
+            "SELECT payload FROM outbox WHERE delivered_at IS NULL AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next undelivered payload is due (0 if one is), None when nothing is pending"""
+        row = self._db.execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE delivered_at IS NULL"
+        ).fetchone()
+        return None if row[0] is None else max(row[0] - time.time(), 0.0)
+
+    def mark_delivered(self, keys: List[str]):
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "UPDATE outbox SET delivered_at = ?, last_error = NULL WHERE idempotency_key = ?",
+                [(now, key) for key in keys],
+            )
+            self._db.execute(
+                "DELETE FROM outbox WHERE delivered_at IS NOT NULL AND delivered_at <= ?",
+                (now - self.keep_delivered_s,),
+            )
+
+    def mark_failed(self, keys: List[str], error: str):
+        """Count a failed attempt and push the next one back (2x per attempt)"""
+        now = time.time()
+        with self._db:
+            for key in keys:
+                self._db.execute(
+                    "UPDATE outbox SET attempts = attempts + 1, last_error = ?,"
+                    " next_attempt_at = ? + MIN(? * (1 << MIN(attempts, 20)), ?) WHERE idempotency_key = ?",
+                    (error[:500], now, self.retry_delay, self.max_retry_delay, key),
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        pending, delivered, failing = self._db.execute(
+            "SELECT COALESCE(SUM(delivered_at IS NULL), 0), COALESCE(SUM(delivered_at IS NOT NULL), 0),"
+            " COALESCE(SUM(delivered_at IS NULL AND attempts > 0), 0) FROM outbox"
+        ).fetchone()
+        return {"pending": pending, "delivered": delivered, "retrying": failing}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,165 @@
+"""
+Deterministic first-tier threat detector for the FDA agent.
+
+Runs before any Ollama call. A lexicon (lexicon.json: credential terms such
+as CVV/OTP/PIN/KYC, verification requests, urgency phrases, fraud words,
+lures) is compiled once into an Aho-Corasick automaton, so every post is
+scanned in a single pass however many terms there are. URLs are extracted
+and classified against the bank's official domains: a host that contains the
+brand name (also through digit look-alikes such as "gb4nk") but is not an
+official domain is a look-alike.
+
+Each post gets a score from the weights of what matched. Posts below the
+threshold never reach the LLM; the matched spans of the others are passed to
+it as hints.
+"""
+
+import json
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_LEXICON = Path(__file__).with_name("lexicon.json")
+
+URL_RE = re.compile(
+    r"(?:https?://|www\.)[^\s<>\"')\]]+"
+    r"|\b(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+"
+    r"(?:com|net|org|info|biz|io|co|me|ly|app|xyz|online|site|top|gd|gl)\b(?:/[^\s<>\"')\]]*)?",
+    re.IGNORECASE,
+)
+
+# Digits used in place of letters in look-alike domains
+LOOKALIKE_DIGITS = str.maketrans({"0": "o", "1": "l", "3": "e", "4": "a", "5": "s", "7": "t"})
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over lowercase text; matches must sit on word boundaries"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._out[node].append(index)
+
+        # Breadth-first: a node's failure link is the longest proper suffix in the trie
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, pattern index) for every whole-word occurrence"""
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for index in self._out[node]:
+                end = position + 1
+                start = end - len(self.patterns[index])
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    yield start, end, index
+
+
+@dataclass
+class Screening:
+    """What the prefilter found in one post"""
+    score: int = 0
+    matches: List[Dict[str, Any]] = field(default_factory=list)  # {"term", "category", "span"}
+    urls: List[Dict[str, str]] = field(default_factory=list)     # {"url", "host", "kind"}
+
+    def hints(self) -> str:
+        """Matched spans as a compact hint for the LLM prompt"""
+        parts = [f"{m['category']}: \"{m['term']}\"" for m in self.matches]
+        parts += [f"{u['kind'].replace('_', ' ')}: {u['host']}" for u in self.urls]
+        return "; ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"score": self.score, "matches": self.matches, "urls": self.urls}
+
+
+class ThreatPrefilter:
+    """Scores posts against the lexicon; posts under `min_score` skip the LLM"""
+
+    def __init__(self, lexicon: Dict[str, Any], min_score: int = 1):
+        self.min_score = min_score
+        brand = lexicon.get("brand", {})
+        self.brand_names = [n.lower() for n in brand.get("names", [])]
+        self.official_domains = [d.lower() for d in brand.get("official_domains", [])]
+        self.shorteners = {d.lower() for d in lexicon.get("url_shorteners", [])}
+        self.url_weights = {"lookalike_domain": 4, "shortener": 2, "other": 1, **lexicon.get("url_weights", {})}
+
+        terms, self._term_info = [], []
+        for category, spec in lexicon.get("categories", {}).items():
+            for term in spec.get("terms", []):
+                terms.append(term.lower())
+                self._term_info.append((category, spec.get("weight", 1)))
+        self._matcher = AhoCorasick(terms)
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None, min_score: int = 1) -> "ThreatPrefilter":
+        with open(path or DEFAULT_LEXICON, "r") as f:
+            return cls(json.load(f), min_score=min_score)
+
+    def classify_host(self, host: str) -> str:
+        host = host.lower().removeprefix("www.")
+        if any(host == d or host.endswith("." + d) for d in self.official_domains):
+            return "official"
+        if host in self.shorteners:
+            return "shortener"
+        normalized = host.translate(LOOKALIKE_DIGITS)
+        if any(name in normalized for name in self.brand_names):
+            return "lookalike_domain"
+        return "other"
+
+    def extract_urls(self, text: str) -> List[Dict[str, str]]:
+        urls = []
+        for match in URL_RE.finditer(text):
+            url = match.group(0).rstrip(".,!?;:")
+            # Domain of an e-mail address, not a link
+            if match.start() and text[match.start() - 1] == "@":
+                continue
+            host = urlsplit(url if "://" in url else f"http://{url}").hostname or ""
+            kind = self.classify_host(host)
+            if kind != "official":
+                urls.append({"url": url, "host": host, "kind": kind})
+        return urls
+
+    def screen(self, text: str) -> Screening:
+        result = Screening()
+        lowered = text.lower()
+        seen = set()
+        for start, end, index in self._matcher.finditer(lowered):
+            term = self._matcher.patterns[index]
+            category, weight = self._term_info[index]
+            if term in seen:
+                continue  # repeats do not add to the score
+            seen.add(term)
+            result.score += weight
+            result.matches.append({"term": term, "category": category, "span": [start, end]})
+        for url in self.extract_urls(text):
+            result.score += self.url_weights.get(url["kind"], 1)
+            result.urls.append(url)
+        return result
+
+    def passes(self, screening: Screening) -> bool:
+        return screening.score >= self.min_score
@@ -0,0 +1,150 @@
+"""
+Streaming volume-spike detection for the FDA agent.
+
+Every post is counted once per key: its channel and each lexicon category it
+matches (credentials, fraud, lure, ...). Each key keeps a series per
+resolution (1 minute, 15 minutes, 1 hour): the count of the open bucket, a
+ring buffer of recent closed buckets and an EWMA baseline (mean and
+variance) of closed bucket counts. Buckets are closed as event time moves
+past them, empty ones included, so a post costs a constant amount of work:
+a few counter updates and one z-score per series.
+
+A series spikes when its open bucket's count is at least `min_posts` and
+`z_threshold` standard deviations above the baseline, once the series has
+seen `warmup` closed buckets. Each series fires at most once per bucket. The
+standard deviation is floored at sqrt(mean) and at 1, so quiet keys with
+near-zero variance do not fire on a couple of posts.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+# (name, bucket width in seconds)
+RESOLUTIONS = (("1m", 60), ("15m", 900), ("1h", 3600))
+
+# Closed buckets kept per series
+RING_SLOTS = 60
+
+# Sample posts kept from the open bucket, shown to the LLM when labelling a spike
+SAMPLE_POSTS = 5
+
+# Empty buckets replayed when event time jumps; past this the baseline has decayed anyway
+MAX_CATCHUP = 256
+
+
+@dataclass
+class Spike:
+    kind: str           # "channel" or "topic"
+    name: str
+    resolution: str
+    bucket_start: float
+    count: int
+    baseline: float
+    z_score: float
+    recent: List[int]   # closed bucket counts, oldest first
+    samples: List[Dict[str, Any]]
+
+    def describe(self) -> str:
+        return (
+            f"{self.count} {self.kind} '{self.name}' posts in {self.resolution} "
+            f"vs baseline {self.baseline:.1f} (z={self.z_score:.1f})"
+        )
+
+
+@dataclass
+class Series:
+    """Counts for one key at one resolution"""
+    bucket: int
+    count: int = 0
+    mean: float = 0.0
+    var: float = 0.0
+    closed: int = 0
+    fired: bool = False
+    ring: List[int] = field(default_factory=lambda: [0] * RING_SLOTS)
+    samples: List[Dict[str, Any]] = field(default_factory=list)
+
+    def close(self, alpha: float):
+        """Fold the open bucket into the baseline and open the next one"""
+        self.ring[self.closed % RING_SLOTS] = self.count
+        diff = self.count - self.mean
+        self.mean += alpha * diff
+        self.var = (1 - alpha) * (self.var + alpha * diff * diff)
+        self.closed += 1
+        self.bucket += 1
+        self.count = 0
+        self.fired = False
+        self.samples = []
+
+    def recent(self, n: int = 5) -> List[int]:
+        n = min(n, self.closed, RING_SLOTS)
+        return [self.ring[(self.closed - n + i) % RING_SLOTS] for i in range(n)]
+
+    def z_score(self) -> float:
+        std = max(math.sqrt(self.var), math.sqrt(self.mean), 1.0)
+        return (self.count - self.mean) / std
+
+
+class SpikeDetector:
+    """Per-channel and per-topic windowed counts with EWMA baselines"""
+
+    def __init__(self, z_threshold: float = 4.0, min_posts: int = 10, span: int = 30, warmup: int = 10):
+        self.z_threshold = z_threshold
+        self.min_posts = min_posts
+        self.warmup = warmup
+        # EWMA over roughly the last `span` buckets
+        self.alpha = 2 / (span + 1)
+        self.series: Dict[Tuple[str, str, str], Series] = {}
+        # First bucket seen per resolution: a key that appears later has been at zero since then
+        self.origin: Dict[str, int] = {}
+        self.posts_observed = 0
+
+    def _series(self, kind: str, name: str, resolution: str, bucket: int) -> Series:
+        key = (kind, name, resolution)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = Series(bucket=self.origin.setdefault(resolution, bucket))
+        if bucket > series.bucket:
+            gap = bucket - series.bucket
+            for _ in range(min(gap, MAX_CATCHUP)):
+                series.close(self.alpha)
+            series.bucket = bucket
+        return series
+
+    def observe(self, post: Dict[str, Any], timestamp: float, topics: Iterable[str] = ()) -> List[Spike]:
+        """Count one post; returns the spikes it set off (at most one per key, the strongest)"""
+        self.posts_observed += 1
+        keys = [("channel", post.get('channel') or 'general')] + [("topic", t) for t in set(topics)]
+        spikes = []
+        for kind, name in keys:
+            strongest = None
+            for resolution, width in RESOLUTIONS:
+                bucket = int(timestamp // width)
+                series = self._series(kind, name, resolution, bucket)
+                # Late posts (older than the open bucket) still count towards it
+                series.count += 1
+                if len(series.samples) < SAMPLE_POSTS:
+                    series.samples.append(post)
+                if series.fired or series.closed < self.warmup or series.count < self.min_posts:
+                    continue
+                z = series.z_score()
+                if z >= self.z_threshold:
+                    series.fired = True
+                    if strongest is None or z > strongest.z_score:
+                        strongest = Spike(
+                            kind=kind,
+                            name=name,
+                            resolution=resolution,
+                            bucket_start=float(series.bucket * width),
+                            count=series.count,
+                            baseline=round(series.mean, 2),
+                            z_score=round(z, 2),
+                            recent=series.recent(),
+                            samples=list(series.samples),
+                        )
+            if strongest:
+                spikes.append(strongest)
+        return spikes
+
+    def stats(self) -> Dict[str, Any]:
+        return {"posts_observed": self.posts_observed, "series": len(self.series)}
@@ -0,0 +1,129 @@
+"""
+Verdict cache for the FDA agent's LLM analysis.
+
+Generated posts and real campaigns repost near-verbatim text. Verdicts are
+cached per post under a hash of the normalized content (author prefix,
+case, whitespace and trailing punctuation removed) plus the model name and
+the prompt version, so changing either invalidates old answers.
+
+Two tiers:
+- an in-memory LRU of `max_entries` verdicts;
+- a SQLite file that survives restarts. Entries expire `ttl_s` seconds after
+  they were stored; expired rows are deleted on open and every
+  `PURGE_EVERY` writes.
+
+Only threat verdicts are stored by the agent: a repost of known campaign
+text counts towards the campaign without another LLM call, while text judged
+benign is judged again, so a wave of repeats is still seen as one.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_PATH = Path(__file__).with_name("verdict_cache.db")
+
+# Writes between deletions of expired rows
+PURGE_EVERY = 500
+
+AUTHOR_PREFIX_RE = re.compile(r"^@\w+\s+says:\s*", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_content(text: str) -> str:
+    """Reposts of one message normalize to the same string"""
+    text = AUTHOR_PREFIX_RE.sub("", (text or "").strip())
+    return WHITESPACE_RE.sub(" ", text).lower().strip().rstrip(".!?")
+
+
+def verdict_key(text: str, model: str, prompt_version: str) -> str:
+    raw = f"{model}\x00{prompt_version}\x00{normalize_content(text)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class VerdictCache:
+    """LRU in front of a SQLite table of key -> verdict JSON"""
+
+    def __init__(self, path: Optional[str] = None, ttl_s: float = 7 * 24 * 3600, max_entries: int = 10000):
+        self.path = Path(path or DEFAULT_PATH)
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, verdict)
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, verdict TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_verdicts_expires_at ON verdicts (expires_at)")
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached verdict, or None on a miss"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            del self._memory[key]
+
+        row = self._db.execute(
+            "SELECT verdict, expires_at FROM verdicts WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        verdict = json.loads(row[0])
+        self._remember(key, row[1], verdict)
+        self.disk_hits += 1
+        return verdict
+
+    def put(self, key: str, verdict: Dict[str, Any]):
+        now = time.time()
+        expires_at = now + self.ttl_s
+        self._remember(key, expires_at, verdict)
+        self._db.execute(
+            "INSERT OR REPLACE INTO verdicts (key, verdict, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(verdict), now, expires_at),
+        )
+        self._db.commit()
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def _remember(self, key: str, expires_at: float, verdict: Dict[str, Any]):
+        self._memory[key] = (expires_at, verdict)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        deleted = self._db.execute("DELETE FROM verdicts WHERE expires_at <= ?", (time.time(),)).rowcount
+        self._db.commit()
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        self._db.close()
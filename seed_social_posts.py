@@ -66,7 +66,19 @@ def seed_posts():
         
         print("✅ Social media API is running\n")
         
-        # Add sample posts
+        # Add sample posts in one request; fall back to one-by-one on older servers
+        response = requests.post(f"{API_URL}/posts/bulk", json=SAMPLE_POSTS)
+        if response.status_code == 200:
+            created_count = len(response.json().get("ids", []))
+            for post in SAMPLE_POSTS:
+                print(f"✅ Created: [{post['channel_id']}] {post['content'][:60]}...")
+            print(f"\n🎉 Successfully created {created_count}/{len(SAMPLE_POSTS)} posts!")
+            print(f"\n📊 Check posts at: {API_URL}/api/sync")
+            return True
+        if response.status_code not in [404, 405]:
+            print(f"⚠️  Bulk create failed: {response.status_code}")
+            return False
+        
         created_count = 0
         for post in SAMPLE_POSTS:
             try:
@@ -0,0 +1,7 @@
+"""
+Code used by more than one app in this repo.
+
+The apps are started from their own directories, so each one puts the repo
+root on sys.path before importing from here: the backends in their
+app/__init__.py, the FDA agent at the top of fda_agent.py.
+"""
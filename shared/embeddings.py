@@ -0,0 +1,235 @@
+"""
+Sentence embeddings cached on disk, used by the bank backend's agents
+(app/embeddings.py holds their store) and by the FDA agent.
+
+Post text is encoded on CPU with sentence-transformers, in batches of
+`batch_size`. Every vector is stored once, L2-normalized, as a row
+of a memory-mapped float16 matrix (`vectors.f16`); a SQLite index maps the
+sha256 of the text to its row. Asking for the same text again returns the
+stored row, so a post is never encoded twice, across restarts too.
+
+Because rows are normalized, cosine similarity is a dot product: a search
+multiplies the stored matrix by the query vector, one matmul per block of
+`SEARCH_CHUNK_ROWS` rows (converted to float32 a block at a time, which keeps
+the copy in cache), rather than looping over posts in Python. Threshold
+clustering works the same way over a chosen set of rows.
+
+Encoding and search are CPU-bound and blocking; async callers run them with
+asyncio.to_thread. One process writes to a cache directory at a time.
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Seconds before loading the model is tried again after it failed
+MODEL_RETRY_S = 600
+
+# Rows the matrix file is created with; it doubles when full
+INITIAL_CAPACITY = 1024
+
+# Rows converted to float32 and multiplied at once during a search
+SEARCH_CHUNK_ROWS = 16384
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def content_key(text: str) -> str:
+    return hashlib.sha256(WHITESPACE_RE.sub(" ", text or "").strip().encode()).hexdigest()
+
+
+class EmbeddingStore:
+    """Content-hash keyed cache of normalized sentence embeddings"""
+
+    def __init__(self, cache_dir: str, model_name: str = "all-MiniLM-L6-v2", device: str = "cpu", batch_size: int = 64):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        # One directory per model: vectors from different models do not compare
+        self.path = Path(cache_dir) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._model = None
+        self._model_error: Optional[Tuple[float, str]] = None  # (when, error) of the last failed load
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self.encoded = 0
+        self.hits = 0
+
+        self._db = sqlite3.connect(self.path / "index.db", check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        meta = dict(self._db.execute("SELECT name, value FROM meta").fetchall())
+        self.dim: Optional[int] = meta.get("dim")
+        self.capacity: int = meta.get("capacity", 0)
+        if self.dim and self.capacity:
+            self._vectors = np.memmap(self.path / "vectors.f16", dtype=np.float16, mode="r+", shape=(self.capacity, self.dim))
+
+    @property
+    def model(self):
+        """
+        The sentence-transformers model, loaded on first use. After a failed
+        load (package or model missing) callers get the same error straight
+        away for MODEL_RETRY_S seconds instead of another attempt.
+        """
+        if self._model is None:
+            if self._model_error and time.monotonic() - self._model_error[0] < MODEL_RETRY_S:
+                raise RuntimeError(f"Embedding model unavailable: {self._model_error[1]}")
+            try:
+                from sentence_transformers import SentenceTransformer
+                logger.info(f"Loading embedding model {self.model_name} on {self.device}")
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+            except Exception as e:
+                self._model_error = (time.monotonic(), repr(e))
+                logger.warning(f"Could not load embedding model {self.model_name}: {e}")
+                raise
+            self._model_error = None
+        return self._model
+
+    def _reserve(self, rows: int):
+        """Grow the matrix file so it holds `rows` rows"""
+        if self.dim is None:
+            self.dim = self.model.get_sentence_embedding_dimension()
+        if rows <= self.capacity:
+            return
+        capacity = max(self.capacity, INITIAL_CAPACITY)
+        while capacity < rows:
+            capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self.path / "vectors.f16", "ab") as f:
+            f.truncate(capacity * self.dim * np.dtype(np.float16).itemsize)
+        self._vectors = np.memmap(self.path / "vectors.f16", dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+        self.capacity = capacity
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            [("dim", self.dim), ("capacity", capacity)],
+        )
+        self._db.commit()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Matrix rows of `texts`, encoding only those not stored yet"""
+        keys = [content_key(t) for t in texts]
+        with self._lock:
+            known = {}
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                known.update(self._db.execute(
+                    f"SELECT key, row FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+
+            missing = [k for k in unique if k not in known]
+            if missing:
+                text_of = dict(zip(keys, texts))
+                vectors = self.model.encode(
+                    [text_of[k] for k in missing],
+                    batch_size=self.batch_size,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False,
+                )
+                self._reserve(self.count + len(missing))
+                rows = range(self.count, self.count + len(missing))
+                self._vectors[rows.start:rows.stop] = vectors.astype(np.float16)
+                self._vectors.flush()
+                # Rows become visible only once their vectors are on disk
+                self._db.executemany("INSERT INTO embeddings (key, row) VALUES (?, ?)", zip(missing, rows))
+                self._db.commit()
+                known.update(zip(missing, rows))
+                self.count += len(missing)
+                self.encoded += len(missing)
+            self.hits += len(keys) - len(missing)
+            return np.fromiter((known[k] for k in keys), dtype=np.int64, count=len(keys))
+
+    def embed(self, text: str) -> np.ndarray:
+        """The vector of one text, e.g. a search query: the stored one if any, otherwise encoded but not stored"""
+        with self._lock:
+            row = self._db.execute("SELECT row FROM embeddings WHERE key = ?", (content_key(text),)).fetchone()
+        if row is not None:
+            return self._vectors[row[0]]
+        return self.model.encode([text], convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)[0]
+
+    def vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Stored vectors (float16, read from the memory map): every row, or `rows`"""
+        if self._vectors is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float16)
+        return self._vectors[:self.count] if rows is None else self._vectors[rows]
+
+    def similarities(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of `query` with every stored row, or with `rows`"""
+        query = np.asarray(query, dtype=np.float32)
+        matrix = self.vectors(rows)
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), SEARCH_CHUNK_ROWS):
+            chunk = matrix[start:start + SEARCH_CHUNK_ROWS]
+            np.dot(chunk.astype(np.float32), query, out=scores[start:start + len(chunk)])
+        return scores
+
+    def top_k(
+        self,
+        query: str,
+        k: int = 10,
+        rows: Optional[np.ndarray] = None,
+        threshold: Optional[float] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        The `k` most similar entries to `query` as (position, score), best
+        first. Positions index `rows` when given, otherwise they are matrix
+        rows. Entries scoring under `threshold` are left out.
+        """
+        scores = self.similarities(self.embed(query), rows)
+        if not len(scores) or k <= 0:
+            return []
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        if threshold is not None:
+            best = best[scores[best] >= threshold]
+        return [(int(i), float(scores[i])) for i in best]
+
+    def cluster(self, rows: np.ndarray, threshold: float) -> List[List[int]]:
+        """
+        Group `rows` by cosine similarity; returns lists of positions into
+        `rows`. Greedy leader clustering: the first unassigned entry takes
+        every unassigned entry within `threshold` of it, one matrix-vector
+        product per cluster.
+        """
+        matrix = self.vectors(rows).astype(np.float32)
+        unassigned = np.ones(len(matrix), dtype=bool)
+        clusters = []
+        for leader in range(len(matrix)):
+            if not unassigned[leader]:
+                continue
+            members = np.flatnonzero(unassigned & (matrix @ matrix[leader] >= threshold))
+            unassigned[members] = False
+            clusters.append(members.tolist())
+        return clusters
+
+    def stats(self):
+        lookups = self.encoded + self.hits
+        return {
+            "model": self.model_name,
+            "vectors": self.count,
+            "capacity": self.capacity,
+            "encoded": self.encoded,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "model_error": self._model_error[1] if self._model_error else None,
+        }
+
+    def close(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._db.close()
+
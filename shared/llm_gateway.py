@@ -0,0 +1,325 @@
+"""
+Shared HTTP client and Ollama gateway, used by the bank backend's agents
+(app/llm_gateway.py holds their instance) and by the FDA agent.
+
+One pooled `httpx.AsyncClient` (keep-alive connections are reused across
+calls) carries every outbound request of its process: Ollama generations,
+calls to the social media backend and, for the FDA agent, signals sent to
+the bank. On top of it:
+
+- Ollama calls wait for one of `max_concurrency` slots, so a burst of
+  workflows queues here instead of piling onto the model server. A slot is
+  held for one attempt only (for a stream, until the stream is closed),
+  never during the backoff sleep between retries.
+- Connect errors, timeouts, 429s and 5xx responses are retried up to
+  `max_retries` times with exponential backoff from `retry_delay` seconds,
+  jittered so callers that failed together do not retry together.
+- Each call may set its own timeout; `timeout` is the pool default.
+- Latency, retry and failure counts per target are kept in `metrics`.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Worth another attempt: the server may recover or the request never reached it
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Latency samples kept per target for the percentiles
+METRICS_SAMPLES = 1024
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+class TargetMetrics:
+    """Counters and latencies for one target ("ollama", "social_media", ...)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.latency_ms = deque(maxlen=METRICS_SAMPLES)  # whole call, retries included
+        self.wait_ms = deque(maxlen=METRICS_SAMPLES)     # queued for a concurrency slot
+
+    def snapshot(self) -> Dict[str, Any]:
+        latency_ms, wait_ms = list(self.latency_ms), list(self.wait_ms)
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "latency_ms": {"p50": percentile(latency_ms, 0.5), "p95": percentile(latency_ms, 0.95),
+                           "p99": percentile(latency_ms, 0.99)},
+            "wait_ms": {"p50": percentile(wait_ms, 0.5), "p95": percentile(wait_ms, 0.95)},
+        }
+
+
+class LLMGateway:
+    """Pooled HTTP client with retries, plus a concurrency-limited Ollama client"""
+
+    def __init__(
+        self,
+        ollama_url: str,
+        model: str,
+        max_concurrency: int = 2,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        max_retries: int = 3,
+        retry_delay: float = 2.0,
+        max_retry_delay: float = 30.0,
+    ):
+        self.ollama_url = ollama_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.metrics: Dict[str, TargetMetrics] = {}
+        # Created on first use, and again if used from another event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared pooled client (for streaming reads the gateway does not wrap)"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pooled connections belong to the loop that opened them
+            self._loop, self._client, self._slots = loop, None, None
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout(self.timeout), limits=self.limits
+            )
+        return self._client
+
+    def _timeout(self, seconds: Optional[float]) -> httpx.Timeout:
+        """`seconds` bounds each read/write; connecting gets connect_timeout. None = no read limit."""
+        return httpx.Timeout(seconds, connect=self.connect_timeout)
+
+    def _target(self, name: str) -> TargetMetrics:
+        if name not in self.metrics:
+            self.metrics[name] = TargetMetrics()
+        return self.metrics[name]
+
+    def backoff(self, attempt: int, retry_delay: float) -> float:
+        """Delay before retry `attempt` (0-based): exponential, capped, half of it jittered"""
+        delay = min(retry_delay * (2 ** attempt), self.max_retry_delay)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        target: str = "http",
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        limited: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Send a request through the pool, retrying transient failures.
+
+        With `limited`, each attempt waits for a concurrency slot and gives
+        it back before any backoff sleep. Returns the response (any status
+        below 400, e.g. a 304); raises httpx.HTTPStatusError or the last
+        transport error once retries run out.
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        delay = self.retry_delay if retry_delay is None else retry_delay
+        if timeout is not None:
+            kwargs["timeout"] = self._timeout(timeout)
+        metrics = self._target(target)
+        metrics.requests += 1
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    async with self._slot(metrics) if limited else nullcontext():
+                        response = await self.client.request(method, url, **kwargs)
+                    if response.status_code not in RETRY_STATUS or attempt == retries:
+                        if response.is_error:
+                            response.raise_for_status()
+                        return response
+                    reason = f"HTTP {response.status_code}"
+                except httpx.TransportError as e:
+                    if attempt == retries:
+                        raise
+                    reason = repr(e)
+                wait = self.backoff(attempt, delay)
+                metrics.retries += 1
+                logger.warning(f"{method} {url} failed ({reason}), retry {attempt + 1}/{retries} in {wait:.1f}s")
+                await asyncio.sleep(wait)
+        except Exception:
+            metrics.failures += 1
+            raise
+        finally:
+            metrics.in_flight -= 1
+            metrics.latency_ms.append((time.perf_counter() - started) * 1000)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def _acquire_slot(self, metrics: TargetMetrics) -> asyncio.Semaphore:
+        """Wait for an Ollama slot; returns the semaphore to release"""
+        self.client  # resets the slots when called from a new event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        slots = self._slots
+        metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            await slots.acquire()
+        finally:
+            metrics.waiting -= 1
+            metrics.wait_ms.append((time.perf_counter() - started) * 1000)
+        return slots
+
+    @asynccontextmanager
+    async def _slot(self, metrics: TargetMetrics):
+        """Hold an Ollama slot for the duration of the block"""
+        slots = await self._acquire_slot(metrics)
+        try:
+            yield
+        finally:
+            slots.release()
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        model: Optional[str] = None,
+        format: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+    ) -> str:
+        """Non-streaming /api/generate; returns the model's `response` text"""
+        payload = {"model": model or self.model, "prompt": prompt, "stream": False}
+        if format:
+            payload["format"] = format
+        if options:
+            payload["options"] = options
+        response = await self.post(
+            f"{self.ollama_url}/api/generate", json=payload, target="ollama", limited=True,
+            timeout=timeout, max_retries=max_retries, retry_delay=retry_delay,
+        )
+        return response.json().get("response", "")
+
+    async def stream_generate(
+        self,
+        prompt: str,
+        *,
+        model: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streaming /api/generate; yields text chunks as the model produces them.
+
+        Failures are retried only until the first chunk arrives: after that
+        the caller has already consumed part of the answer. The slot is held
+        while the response is open; close the generator (e.g. with
+        contextlib.aclosing) when abandoning it early so the slot is freed.
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        delay = self.retry_delay if retry_delay is None else retry_delay
+        payload = {"model": model or self.model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        request_timeout = self._timeout(self.timeout if timeout is None else timeout)
+
+        metrics = self._target("ollama")
+        metrics.requests += 1
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            for attempt in range(retries + 1):
+                streamed = False
+                try:
+                    # Released on return, on error and when the generator is closed
+                    async with self._slot(metrics), self.client.stream(
+                        "POST", f"{self.ollama_url}/api/generate", json=payload, timeout=request_timeout
+                    ) as response:
+                        if response.status_code in RETRY_STATUS and attempt < retries:
+                            reason = f"HTTP {response.status_code}"
+                        else:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line:
+                                    continue
+                                try:
+                                    chunk = json.loads(line)
+                                except json.JSONDecodeError:
+                                    continue
+                                if "response" in chunk:
+                                    streamed = True
+                                    yield chunk["response"]
+                            return
+                except httpx.TransportError as e:
+                    if streamed or attempt == retries:
+                        raise
+                    reason = repr(e)
+                wait = self.backoff(attempt, delay)
+                metrics.retries += 1
+                logger.warning(f"Ollama stream failed ({reason}), retry {attempt + 1}/{retries} in {wait:.1f}s")
+                await asyncio.sleep(wait)
+        except Exception:
+            metrics.failures += 1
+            raise
+        finally:
+            metrics.in_flight -= 1
+            metrics.latency_ms.append((time.perf_counter() - started) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "timeout_s": self.timeout,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "targets": {name: m.snapshot() for name, m in self.metrics.items()},
+        }
+
+    async def aclose(self):
+        """Close pooled connections (on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._slots = None
+
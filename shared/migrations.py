@@ -0,0 +1,149 @@
+"""
+Versioned schema migration runner for both backends.
+
+Each backend keeps its migrations in its app.migrations package: every module
+there named NNNN_description.py is one migration. They are applied in version
+order at startup (after create_all) and recorded in the schema_migrations
+table, so each runs once per database. A migration module defines:
+
+- upgrade(conn): the schema change, run on a SQLAlchemy sync Connection.
+  SQLite does not roll DDL back reliably here, so it must be idempotent
+  (IF NOT EXISTS, add_missing_columns, ...).
+- PLAN_CHECKS (optional): (sql, expected) pairs. After upgrade() the
+  EXPLAIN QUERY PLAN of each sql must mention `expected` (usually an index
+  name), otherwise the migration is not recorded and startup fails.
+
+From the backend directory, `python -m app.migrations` applies pending
+migrations and `python -m app.migrations status` lists them (see main()).
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import pkgutil
+import re
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_NAME_RE = re.compile(r"^(\d{4})_(\w+)$")
+
+
+class MigrationError(Exception):
+    """A migration failed or its query-plan checks did not hold"""
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def plan_checks(self) -> List[Tuple[str, str]]:
+        return getattr(self.module, "PLAN_CHECKS", [])
+
+
+def discover_migrations(package: ModuleType) -> List[Migration]:
+    """All migration modules in `package`, ordered by version"""
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        match = MIGRATION_NAME_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{package.__name__}.{info.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Duplicate migration versions in {versions}")
+    return migrations
+
+
+def ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+        "applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(conn: Connection) -> Set[int]:
+    ensure_version_table(conn)
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def explain(conn: Connection, sql: str) -> str:
+    """EXPLAIN QUERY PLAN output for `sql`, one plan step per line"""
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def check_query_plans(conn: Connection, migration: Migration):
+    for sql, expected in migration.plan_checks:
+        plan = explain(conn, sql)
+        if expected not in plan:
+            raise MigrationError(
+                f"Migration {migration.version:04d}_{migration.name}: expected "
+                f"'{expected}' in the plan for:\n  {sql}\ngot:\n  {plan}"
+            )
+
+
+def add_missing_columns(conn: Connection, table: str, columns: Dict[str, str]) -> List[str]:
+    """ALTER TABLE ADD COLUMN for each name -> definition not yet on `table`"""
+    existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+    added = []
+    for name, definition in columns.items():
+        if name not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            added.append(name)
+    return added
+
+
+def run_migrations(conn: Connection, package: ModuleType) -> List[int]:
+    """Apply every pending migration of `package` in order. Returns the versions applied."""
+    done = applied_versions(conn)
+    applied = []
+    for migration in discover_migrations(package):
+        if migration.version in done:
+            continue
+        logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+        migration.module.upgrade(conn)
+        check_query_plans(conn, migration)
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": migration.version, "name": migration.name}
+        )
+        applied.append(migration.version)
+    return applied
+
+
+def migration_status(conn: Connection, package: ModuleType) -> List[Tuple[int, str, bool]]:
+    """(version, name, applied) for every migration in `package`"""
+    done = applied_versions(conn)
+    return [(m.version, m.name, m.version in done) for m in discover_migrations(package)]
+
+
+async def apply_or_list(command: str, package: ModuleType, engine: AsyncEngine, init_db: Callable[[], Awaitable[None]]):
+    if command == "status":
+        async with engine.connect() as conn:
+            for version, name, applied in await conn.run_sync(migration_status, package):
+                print(f"{'✅' if applied else '⏳'} {version:04d}_{name}")
+    else:
+        await init_db()
+        print("✅ Database is up to date")
+    await engine.dispose()
+
+
+def main(package: ModuleType, engine: AsyncEngine, init_db: Callable[[], Awaitable[None]], argv: Optional[Sequence[str]] = None):
+    """Command line of a backend's app.migrations: create tables and apply pending migrations, or list them"""
+    parser = argparse.ArgumentParser(description="Schema migrations")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    asyncio.run(apply_or_list(parser.parse_args(argv).command, package, engine, init_db))
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The `shared` package lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parents[3]))
@@ -0,0 +1,399 @@
+"""
+Time-based retention: cold posts move out of the hot database into archive
+segments.
+
+archive_old_posts() moves posts older than `retention.max_age_days`, with all
+of their comments and reactions, into gzip-compressed NDJSON segment files
+under `retention.archive_dir`: one post per line with its comments and
+reactions embedded, at most `retention.segment_max_posts` posts per file.
+Segments are written once (fsynced, then renamed into place) and never
+modified. The archive_segments table indexes their post id, comment id and
+time ranges, and is updated in the same transaction that deletes the rows
+from the hot tables (the search index follows through its triggers).
+
+Posts are archived in id order: everything above archive_high_water() is
+hot, and so are the few posts at or below it that were held back. The rows
+holding the current max post/comment/reaction id are never archived, because
+SQLite assigns max(rowid) + 1 and would otherwise hand archived ids out again,
+so the posts owning them are skipped and stay in the hot database; archiving
+carries on past them. Readers of the archived range merge them back in by id.
+Comments added to a post after it was archived stay in the hot database, and
+/api/sync sends them with the post loaded from its segment
+(load_archived_posts).
+
+Readers opt in: /api/sync?include_archive=true pages through archived posts
+before the hot ones, and /search/?include_archive=true also searches the
+segments (each one loaded into an in-memory FTS5 table, a few kept cached).
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import config
+from .counters import reaction_buffer
+from .database import AsyncSessionLocal
+from .etags import data_generation
+from .models import ArchiveSegment, Comment, Post, Reaction
+from .parsing import comment_body, parse_author, post_body
+from .responses import dumps, orjson
+from .search import SEARCH_DDL, SEARCH_TABLE
+
+logger = logging.getLogger(__name__)
+
+loads = orjson.loads if orjson is not None else json.loads
+
+# Shaped like the Post / Comment attributes format_post and format_comments read
+ArchivedPost = namedtuple("ArchivedPost", [
+    "id", "channel_id", "content", "author", "body", "image_url", "created_at", "scheduled_at",
+    "reaction_count", "comment_count", "reaction_counts",
+])
+ArchivedComment = namedtuple("ArchivedComment", ["id", "parent_id", "author", "body", "created_at"])
+
+# search_index stores created_at in SQLite's CURRENT_TIMESTAMP format
+FTS_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def archive_dir() -> Path:
+    return Path(config.retention_archive_dir)
+
+
+def segment_filename(first_post_id: int, last_post_id: int) -> str:
+    return f"posts-{first_post_id:010d}-{last_post_id:010d}.ndjson.gz"
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def load_post(record: Dict[str, Any]) -> Tuple[ArchivedPost, List[ArchivedComment]]:
+    """One segment line -> (post, comments ordered by creation time)"""
+    # Segments written before author/body were stored are parsed here instead
+    content = record["content"]
+    post = ArchivedPost(
+        record["id"], record["channel_id"], content,
+        record["author"] if "author" in record else parse_author(content),
+        record["body"] if "body" in record else post_body(content),
+        record["image_url"], _parse_time(record["created_at"]), _parse_time(record["scheduled_at"]),
+        record["reaction_count"], record["comment_count"], record["reaction_counts"],
+    )
+    comments = [
+        ArchivedComment(
+            c["id"], c["parent_id"],
+            c["author"] if "author" in c else parse_author(c["text"]),
+            c["body"] if "body" in c else comment_body(c["text"]),
+            _parse_time(c["created_at"]),
+        )
+        for c in record["comments"]
+    ]
+    return post, comments
+
+
+# --- writing ---
+
+def write_segment_file(filename: str, records: List[Dict[str, Any]], gzip_level: int) -> Tuple[int, str]:
+    """Write and fsync a segment, then rename it into place. Returns (size, sha256)."""
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    final = directory / filename
+    partial = directory / f"{filename}.partial"
+    digest = hashlib.sha256()
+
+    class HashingWriter:
+        def __init__(self, raw):
+            self.raw = raw
+
+        def write(self, data):
+            digest.update(data)
+            return self.raw.write(data)
+
+        def flush(self):
+            self.raw.flush()
+
+    with open(partial, "wb") as raw:
+        # mtime=0 keeps the bytes (and the checksum) reproducible
+        with gzip.GzipFile(fileobj=HashingWriter(raw), mode="wb", compresslevel=gzip_level, mtime=0) as out:
+            for record in records:
+                out.write(dumps(record) + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, final)
+    return final.stat().st_size, digest.hexdigest()
+
+
+async def archive_high_water(db: AsyncSession) -> int:
+    """Highest archived post id (0 when nothing is archived)"""
+    return await db.scalar(select(func.max(ArchiveSegment.max_post_id))) or 0
+
+
+async def archive_segment(db: AsyncSession, cutoff: datetime, max_posts: int) -> Optional[ArchiveSegment]:
+    """Move the next run of posts created before `cutoff` into one segment. None when there is nothing to move."""
+    start = await archive_high_water(db)
+    newest = (await db.execute(select(
+        select(func.max(Post.id)).scalar_subquery(),
+        select(Comment.post_id).order_by(Comment.id.desc()).limit(1).scalar_subquery(),
+        select(Reaction.post_id).order_by(Reaction.id.desc()).limit(1).scalar_subquery(),
+    ))).one()
+    # Posts owning a table's max id stay hot; the posts around them are archived
+    held = {post_id for post_id in newest if post_id is not None}
+    if not held:
+        return None
+
+    candidates = list(await db.scalars(
+        select(Post).where(Post.id > start).order_by(Post.id.asc()).limit(max_posts + len(held))
+    ))
+    posts = []
+    for post in candidates:
+        if post.created_at is None or post.created_at >= cutoff or len(posts) == max_posts:
+            break
+        if post.id not in held:
+            posts.append(post)
+    if not posts:
+        return None
+    first_id, last_id = posts[0].id, posts[-1].id
+    held = sorted(held)
+    in_range = lambda column: and_(column.between(first_id, last_id), column.notin_(held))
+
+    comments = list(await db.scalars(
+        select(Comment).where(in_range(Comment.post_id))
+        .order_by(Comment.post_id.asc(), Comment.created_at.asc(), Comment.id.asc())
+    ))
+    reactions = (await db.execute(
+        select(Reaction.id, Reaction.post_id, Reaction.emoji)
+        .where(in_range(Reaction.post_id)).order_by(Reaction.id.asc())
+    )).all()
+    comments_by_post, reactions_by_post = {}, {}
+    for c in comments:
+        comments_by_post.setdefault(c.post_id, []).append(
+            {"id": c.id, "parent_id": c.parent_id, "text": c.text, "author": c.author, "body": c.body,
+             "created_at": c.created_at}
+        )
+    for r in reactions:
+        reactions_by_post.setdefault(r.post_id, []).append({"id": r.id, "emoji": r.emoji})
+
+    records = [
+        {
+            "id": p.id, "channel_id": p.channel_id, "content": p.content,
+            "author": p.author, "body": p.body, "image_url": p.image_url,
+            "created_at": p.created_at, "scheduled_at": p.scheduled_at,
+            "reaction_count": p.reaction_count, "comment_count": p.comment_count,
+            "reaction_counts": p.reaction_counts or {},
+            "comments": comments_by_post.get(p.id, []),
+            "reactions": reactions_by_post.get(p.id, []),
+        }
+        for p in posts
+    ]
+    filename = segment_filename(first_id, last_id)
+    size, sha256 = await asyncio.to_thread(write_segment_file, filename, records, config.retention_gzip_level)
+
+    comment_ids = [c.id for c in comments]
+    comment_times = [c.created_at for c in comments if c.created_at]
+    post_times = [p.created_at for p in posts]
+    segment = ArchiveSegment(
+        filename=filename,
+        min_post_id=first_id,
+        max_post_id=last_id,
+        min_comment_id=min(comment_ids, default=None),
+        max_comment_id=max(comment_ids, default=None),
+        min_created_at=min(post_times + comment_times),
+        max_created_at=max(post_times + comment_times),
+        post_count=len(posts),
+        comment_count=len(comments),
+        reaction_count=len(reactions),
+        size_bytes=size,
+        sha256=sha256,
+    )
+    try:
+        db.add(segment)
+        # Only the rows written to the segment: anything inserted since has a higher id
+        await db.execute(
+            delete(Reaction).where(in_range(Reaction.post_id),
+                                   Reaction.id <= max((r.id for r in reactions), default=0))
+        )
+        await db.execute(
+            delete(Comment).where(in_range(Comment.post_id),
+                                  Comment.id <= max(comment_ids, default=0))
+        )
+        await db.execute(delete(Post).where(in_range(Post.id)))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        (archive_dir() / filename).unlink(missing_ok=True)
+        raise
+    logger.info(
+        f"Archived posts {first_id}-{last_id} ({len(posts)} posts, {len(comments)} comments, "
+        f"{len(reactions)} reactions) to {filename} ({size:,} bytes)"
+    )
+    return segment
+
+
+async def archive_old_posts(max_age_days: Optional[float] = None) -> List[ArchiveSegment]:
+    """Archive every post older than the retention age. Returns the segments written."""
+    age = config.retention_max_age_days if max_age_days is None else max_age_days
+    cutoff = datetime.utcnow() - timedelta(days=age)
+    written = []
+    # Reactions for the posts being moved must not be flushed in between
+    await reaction_buffer.flush()
+    async with reaction_buffer.flush_lock:
+        while True:
+            async with AsyncSessionLocal() as db:
+                segment = await archive_segment(db, cutoff, config.retention_segment_max_posts)
+            if segment is None:
+                break
+            written.append(segment)
+    if written:
+        data_generation.bump()  # rows left the hot tables without any new id
+    return written
+
+
+async def archive_periodically(interval_s: int):
+    """Background job: apply retention at startup and then every `interval_s` seconds"""
+    while True:
+        try:
+            await archive_old_posts()
+        except Exception as e:
+            logger.error(f"Archiving failed: {e}")
+        await asyncio.sleep(interval_s)
+
+
+async def clear_archive(db: AsyncSession) -> int:
+    """Delete every segment file and its index row (part of the database resets). Returns the count."""
+    segments = list(await db.scalars(select(ArchiveSegment)))
+    for segment in segments:
+        (archive_dir() / segment.filename).unlink(missing_ok=True)
+    await db.execute(delete(ArchiveSegment))
+    _fts_cache.clear()
+    return len(segments)
+
+
+# --- reading ---
+
+def read_segment_file(filename: str) -> List[Dict[str, Any]]:
+    with gzip.open(archive_dir() / filename, "rb") as f:
+        return [loads(line) for line in f if line.strip()]
+
+
+async def iter_archived_posts(
+    db: AsyncSession, after_post_id: int
+) -> AsyncIterator[Tuple[ArchivedPost, List[ArchivedComment]]]:
+    """Archived posts with id > after_post_id in id order, one segment in memory at a time"""
+    segments = list(await db.scalars(
+        select(ArchiveSegment).where(ArchiveSegment.max_post_id > after_post_id)
+        .order_by(ArchiveSegment.min_post_id.asc())
+    ))
+    for segment in segments:
+        for record in await asyncio.to_thread(read_segment_file, segment.filename):
+            if record["id"] > after_post_id:
+                yield load_post(record)
+
+
+async def load_archived_posts(db: AsyncSession, post_ids: List[int]) -> Dict[int, ArchivedPost]:
+    """The archived posts among `post_ids`, by id, reading only the segments that hold them"""
+    wanted = set(post_ids)
+    found: Dict[int, ArchivedPost] = {}
+    if not wanted:
+        return found
+    segments = list(await db.scalars(
+        select(ArchiveSegment).where(ArchiveSegment.min_post_id <= max(wanted),
+                                     ArchiveSegment.max_post_id >= min(wanted))
+    ))
+    for segment in segments:
+        if not any(segment.min_post_id <= post_id <= segment.max_post_id for post_id in wanted):
+            continue
+        for record in await asyncio.to_thread(read_segment_file, segment.filename):
+            if record["id"] in wanted:
+                found[record["id"]] = load_post(record)[0]
+    return found
+
+
+class SegmentSearchCache:
+    """In-memory FTS5 copies of recently searched segments (segments never change)"""
+
+    def __init__(self, max_segments: int):
+        self.max_segments = max_segments
+        self._connections: "OrderedDict[str, sqlite3.Connection]" = OrderedDict()
+        # One search at a time: connections are shared between worker threads
+        self._lock = threading.Lock()
+
+    def query(self, filename: str, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connections.get(filename)
+            if conn is None:
+                conn = self._connections[filename] = build_segment_fts(filename)
+                while len(self._connections) > self.max_segments:
+                    self._connections.popitem(last=False)[1].close()
+            self._connections.move_to_end(filename)
+            cursor = conn.execute(sql, params)
+            columns = [d[0] for d in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def clear(self):
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+
+
+def _fts_time(value: Optional[str]) -> Optional[str]:
+    return datetime.fromisoformat(value).strftime(FTS_TIME_FORMAT) if value else None
+
+
+def build_segment_fts(filename: str) -> sqlite3.Connection:
+    """Load one segment into an in-memory search_index with the hot table's schema"""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute(SEARCH_DDL[0])
+    rows = []
+    for record in read_segment_file(filename):
+        rows.append((record["id"] * 2, record["content"], "post", record["id"], None,
+                     record["channel_id"], _fts_time(record["created_at"])))
+        for c in record["comments"]:
+            rows.append((c["id"] * 2 + 1, c["text"], "comment", record["id"], c["id"],
+                         record["channel_id"], _fts_time(c["created_at"])))
+    conn.executemany(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id, comment_id, channel_id, created_at) "
+        f"VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    return conn
+
+
+_fts_cache = SegmentSearchCache(config.retention_search_cache_segments)
+
+
+def _search_segments(filenames: List[str], sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for filename in filenames:
+        rows.extend(_fts_cache.query(filename, sql, params))
+    return rows
+
+
+async def search_archive(
+    db: AsyncSession, sql: str, params: Dict[str, Any],
+    since: Optional[datetime] = None, until: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run a search_index query against every segment that overlaps [since, until).
+    `sql` must be the same statement the hot search runs (SQLite named params).
+    """
+    query = select(ArchiveSegment.filename).order_by(ArchiveSegment.max_post_id.desc())
+    if since is not None:
+        query = query.where(ArchiveSegment.max_created_at >= since)
+    if until is not None:
+        query = query.where(ArchiveSegment.min_created_at < until)
+    filenames = list(await db.scalars(query))
+    if not filenames:
+        return []
+    return await asyncio.to_thread(_search_segments, filenames, sql, params)
@@ -0,0 +1,108 @@
+"""
+Request body parsing for the bulk ingest endpoints.
+
+Bodies are either a JSON array of objects or an NDJSON stream (one object per
+line, Content-Type application/x-ndjson or application/ndjson). NDJSON is
+parsed as it is received. Before inserting, the endpoints check that the
+posts and parent comments the items refer to exist (check_references), so a
+batch is rejected with 422 instead of leaving orphan rows.
+"""
+
+import json
+from typing import List, Optional, Type, TypeVar
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import config
+from .models import Comment, Post
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _validate(model: Type[ModelT], raw, index: int) -> ModelT:
+    try:
+        return model.model_validate(raw)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail={"item": index, "errors": e.errors()})
+
+
+def _check_size(count: int):
+    if count > config.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Bulk requests are limited to {config.bulk_max_items} items"
+        )
+
+
+async def read_bulk_items(request: Request, model: Type[ModelT]) -> List[ModelT]:
+    """Parse and validate a JSON array or NDJSON request body into `model` items"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_TYPES:
+        items: List[ModelT] = []
+        buffer = b""
+        line_no = 0
+
+        def parse_line(line: bytes):
+            nonlocal line_no
+            line_no += 1
+            if not line.strip():
+                return
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON on line {line_no}")
+            items.append(_validate(model, raw, len(items)))
+            _check_size(len(items))
+
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                parse_line(line)
+        parse_line(buffer)
+        return items
+
+    try:
+        body = json.loads(await request.body())
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    _check_size(len(body))
+    return [_validate(model, raw, i) for i, raw in enumerate(body)]
+
+
+def _unknown(index: int, field: str, value: int, msg: str) -> HTTPException:
+    return HTTPException(status_code=422, detail={
+        "item": index,
+        "errors": [{"loc": [field], "msg": msg, "input": value}],
+    })
+
+
+async def check_references(db: AsyncSession, items: List[BaseModel]):
+    """
+    Reject the batch (422, naming the first bad item) if an item's post_id
+    does not exist, or its parent_id (if it has one) is not a comment on
+    that same post. Each kind of id is looked up once for the whole batch.
+    """
+    post_ids = {item.post_id for item in items}
+    known_posts = set(await db.scalars(select(Post.id).where(Post.id.in_(post_ids))))
+    parent_ids = {getattr(item, "parent_id", None) for item in items} - {None}
+    parent_posts = {}
+    if parent_ids:
+        parent_posts = dict((await db.execute(
+            select(Comment.id, Comment.post_id).where(Comment.id.in_(parent_ids))
+        )).all())
+
+    for index, item in enumerate(items):
+        if item.post_id not in known_posts:
+            raise _unknown(index, "post_id", item.post_id, "Post not found")
+        parent_id: Optional[int] = getattr(item, "parent_id", None)
+        if parent_id is not None and parent_posts.get(parent_id) != item.post_id:
+            raise _unknown(index, "parent_id", parent_id, "Parent comment not found on this post")
@@ -0,0 +1,145 @@
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+
+class Config:
+    """Configuration manager for the social media backend"""
+
+    def __init__(self, config_path: str = "config.json"):
+        self.config_path = Path(config_path)
+        self._config: Dict[str, Any] = {}
+        self.load_config()
+
+    def load_config(self):
+        """Load configuration from JSON file (defaults apply if it is missing)"""
+        if self.config_path.exists():
+            with open(self.config_path, 'r') as f:
+                self._config = json.load(f)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get configuration value by dot-notation key"""
+        keys = key.split('.')
+        value = self._config
+
+        for k in keys:
+            if isinstance(value, dict):
+                value = value.get(k)
+                if value is None:
+                    return default
+            else:
+                return default
+
+        return value
+
+    @property
+    def database_url(self) -> str:
+        return self.get('database.url', 'sqlite+aiosqlite:///./chatroom.db')
+
+    @property
+    def sqlite_journal_mode(self) -> str:
+        return self.get('database.sqlite.journal_mode', 'WAL')
+
+    @property
+    def sqlite_synchronous(self) -> str:
+        return self.get('database.sqlite.synchronous', 'NORMAL')
+
+    @property
+    def sqlite_busy_timeout_ms(self) -> int:
+        return self.get('database.sqlite.busy_timeout_ms', 5000)
+
+    @property
+    def sqlite_mmap_size(self) -> int:
+        return self.get('database.sqlite.mmap_size', 268435456)
+
+    @property
+    def sqlite_cache_size(self) -> int:
+        return self.get('database.sqlite.cache_size', -65536)
+
+    @property
+    def compression_minimum_size(self) -> int:
+        return self.get('compression.minimum_size', 1024)
+
+    @property
+    def compression_gzip_level(self) -> int:
+        return self.get('compression.gzip_level', 6)
+
+    @property
+    def compression_brotli_quality(self) -> int:
+        return self.get('compression.brotli_quality', 4)
+
+    @property
+    def counter_flush_interval_ms(self) -> int:
+        return self.get('counters.flush_interval_ms', 250)
+
+    @property
+    def counter_max_pending(self) -> int:
+        return self.get('counters.max_pending', 5000)
+
+    @property
+    def counter_max_flush_attempts(self) -> int:
+        return self.get('counters.max_flush_attempts', 5)
+
+    @property
+    def counter_reconcile_interval_s(self) -> int:
+        return self.get('counters.reconcile_interval_s', 3600)
+
+    @property
+    def event_queue_size(self) -> int:
+        return self.get('events.queue_size', 1000)
+
+    @property
+    def event_keepalive_s(self) -> int:
+        return self.get('events.keepalive_s', 15)
+
+    @property
+    def bulk_max_items(self) -> int:
+        return self.get('bulk.max_items', 10000)
+
+    @property
+    def group_commit_enabled(self) -> bool:
+        return self.get('writes.group_commit', False)
+
+    @property
+    def group_commit_flush_interval_ms(self) -> int:
+        return self.get('writes.flush_interval_ms', 5)
+
+    @property
+    def group_commit_max_batch(self) -> int:
+        return self.get('writes.max_batch', 500)
+
+    @property
+    def group_commit_durability(self) -> str:
+        return self.get('writes.durability', 'normal')
+
+    @property
+    def retention_enabled(self) -> bool:
+        return self.get('retention.enabled', False)
+
+    @property
+    def retention_max_age_days(self) -> float:
+        return self.get('retention.max_age_days', 30)
+
+    @property
+    def retention_interval_s(self) -> int:
+        return self.get('retention.interval_s', 3600)
+
+    @property
+    def retention_archive_dir(self) -> str:
+        return self.get('retention.archive_dir', 'archive')
+
+    @property
+    def retention_segment_max_posts(self) -> int:
+        return self.get('retention.segment_max_posts', 5000)
+
+    @property
+    def retention_gzip_level(self) -> int:
+        return self.get('retention.gzip_level', 9)
+
+    @property
+    def retention_search_cache_segments(self) -> int:
+        return self.get('retention.search_cache_segments', 4)
+
+
+# Global config instance
+config = Config()
@@ -0,0 +1,242 @@
+"""
+Denormalized post counters.
+
+Reaction clicks are coalesced in memory by ReactionBuffer and written in one
+transaction every `counters.flush_interval_ms` (or sooner once
+`counters.max_pending` clicks are waiting): the raw Reaction rows are inserted
+and Post.reaction_count / Post.reaction_counts are bumped together, so reads
+never aggregate the reactions table. reconcile_counters() recomputes every
+counter from the raw rows and repairs any drift.
+
+A failed flush is retried post by post, so one bad post cannot hold back the
+others. A post whose reactions keep failing for any reason other than the
+database being unavailable is dropped (and logged) after
+`counters.max_flush_attempts` flushes.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import config
+from .database import AsyncSessionLocal
+from .etags import data_generation
+from .models import Post, Reaction, Comment
+
+logger = logging.getLogger(__name__)
+
+
+class ReactionBuffer:
+    """Coalesces reaction increments in memory and flushes them in batches"""
+
+    def __init__(self, flush_interval_ms: int, max_pending: int, max_attempts: int = 5):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending: Dict[int, Counter] = defaultdict(Counter)
+        # Failed flushes per post, counted when the post failed on its own
+        self._attempts: Dict[int, int] = {}
+        self.dropped = 0
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        # Held while writing, so reconciliation never interleaves with a flush
+        self.flush_lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, post_id: int, emoji: str, count: int = 1):
+        """Queue `count` reactions; safe to call from any thread"""
+        with self._lock:
+            self._pending[post_id][emoji] += count
+            self._pending_total += count
+            full = self._pending_total >= self.max_pending
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _drain(self) -> Dict[int, Counter]:
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(Counter)
+            self._pending_total = 0
+        return pending
+
+    def _requeue(self, pending: Dict[int, Counter]):
+        with self._lock:
+            for post_id, emojis in pending.items():
+                self._pending[post_id].update(emojis)
+                self._pending_total += sum(emojis.values())
+
+    async def _write(self, pending: Dict[int, Counter]):
+        async with AsyncSessionLocal() as db:
+            await apply_reactions(db, pending)
+            await db.commit()
+
+    async def flush(self) -> int:
+        """Write all pending reactions in one transaction (post by post if it fails). Returns the number written."""
+        async with self.flush_lock:
+            pending = self._drain()
+            if not pending:
+                return 0
+            try:
+                await self._write(pending)
+                self._attempts.clear()
+                return sum(sum(emojis.values()) for emojis in pending.values())
+            except Exception as e:
+                logger.error(f"Reaction flush failed, retrying post by post: {e}")
+
+            written = 0
+            for post_id, emojis in pending.items():
+                try:
+                    await self._write({post_id: emojis})
+                except OperationalError as e:
+                    # Locked or unavailable database: not this post's fault, keep it
+                    logger.error(f"Reactions for post {post_id} not written, will retry: {e}")
+                    self._requeue({post_id: emojis})
+                    continue
+                except Exception as e:
+                    attempts = self._attempts.get(post_id, 0) + 1
+                    if attempts < self.max_attempts:
+                        self._attempts[post_id] = attempts
+                        self._requeue({post_id: emojis})
+                    else:
+                        self._attempts.pop(post_id, None)
+                        self.dropped += sum(emojis.values())
+                        logger.error(f"Dropped reactions {dict(emojis)} for post {post_id} after {attempts} failed flushes: {e}")
+                    continue
+                self._attempts.pop(post_id, None)
+                written += sum(emojis.values())
+            return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the periodic flusher on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        await self.flush()
+
+
+async def insert_reactions(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert raw reaction rows with one executemany; returns their ids in order"""
+    if not rows:
+        return []
+    return list(await db.scalars(
+        insert(Reaction).returning(Reaction.id, sort_by_parameter_order=True),
+        rows
+    ))
+
+
+async def bump_reaction_counters(db: AsyncSession, pending: Dict[int, Counter]):
+    """Add per-post, per-emoji increments to the denormalized counters (caller commits)"""
+    for post in await db.scalars(select(Post).where(Post.id.in_(list(pending)))):
+        emojis = pending[post.id]
+        merged = dict(post.reaction_counts or {})
+        for emoji, count in emojis.items():
+            merged[emoji] = merged.get(emoji, 0) + count
+        post.reaction_counts = merged
+        post.reaction_count = (post.reaction_count or 0) + sum(emojis.values())
+
+
+async def apply_reactions(db: AsyncSession, pending: Dict[int, Counter]):
+    """Insert raw reaction rows and bump the matching post counters (caller commits)"""
+    await insert_reactions(db, [
+        {"post_id": post_id, "emoji": emoji}
+        for post_id, emojis in pending.items()
+        for emoji, count in emojis.items()
+        for _ in range(count)
+    ])
+    await bump_reaction_counters(db, pending)
+
+
+async def reconcile_counters(db: AsyncSession) -> int:
+    """
+    Recompute every post's counters from the raw reaction and comment rows
+    and fix the ones that drifted. Returns the number of posts repaired.
+    """
+    emoji_counts: Dict[int, Dict[str, int]] = defaultdict(dict)
+    for post_id, emoji, count in await db.execute(
+        select(Reaction.post_id, Reaction.emoji, func.count(Reaction.id))
+        .group_by(Reaction.post_id, Reaction.emoji)
+    ):
+        emoji_counts[post_id][emoji] = count
+    comment_counts = dict((await db.execute(
+        select(Comment.post_id, func.count(Comment.id)).group_by(Comment.post_id)
+    )).all())
+
+    fixes = []
+    for post_id, reaction_count, comment_count, reaction_counts in await db.execute(
+        select(Post.id, Post.reaction_count, Post.comment_count, Post.reaction_counts)
+    ):
+        expected_emojis = emoji_counts.get(post_id, {})
+        expected_reactions = sum(expected_emojis.values())
+        expected_comments = comment_counts.get(post_id, 0)
+        if (
+            reaction_count != expected_reactions
+            or comment_count != expected_comments
+            or (reaction_counts or {}) != expected_emojis
+        ):
+            fixes.append({
+                "id": post_id,
+                "reaction_count": expected_reactions,
+                "comment_count": expected_comments,
+                "reaction_counts": expected_emojis,
+            })
+    if fixes:
+        await db.execute(update(Post), fixes)
+    await db.commit()
+    return len(fixes)
+
+
+async def run_reconciliation() -> int:
+    """Flush pending reactions, then reconcile with the flusher held off"""
+    await reaction_buffer.flush()
+    async with reaction_buffer.flush_lock:
+        async with AsyncSessionLocal() as db:
+            repaired = await reconcile_counters(db)
+    if repaired:
+        data_generation.bump()  # counters changed without any new row
+        logger.warning(f"Counter reconciliation repaired {repaired} post(s)")
+    return repaired
+
+
+async def reconcile_periodically(interval_s: int):
+    """Background job: reconcile at startup and then every `interval_s` seconds"""
+    while True:
+        try:
+            await run_reconciliation()
+        except Exception as e:
+            logger.error(f"Counter reconciliation failed: {e}")
+        await asyncio.sleep(interval_s)
+
+
+# Global reaction buffer
+reaction_buffer = ReactionBuffer(
+    flush_interval_ms=config.counter_flush_interval_ms,
+    max_pending=config.counter_max_pending,
+    max_attempts=config.counter_max_flush_attempts
+)
@@ -1,9 +1,51 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import declarative_base
+from .config import config
+from . import migrations
+from shared.migrations import run_migrations
 
-DATABASE_URL = "sqlite:///./chatroom.db"
+# Create async engine
+engine = create_async_engine(config.database_url, future=True)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
+
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection. WAL lets the FDA/IAA readers run while the
+    generators write; synchronous=NORMAL is durable across app crashes in WAL
+    mode and only risks the last commits on power loss.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={config.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size={int(config.sqlite_cache_size)}")
+    cursor.close()
+
+
+# Create async session factory
+AsyncSessionLocal = async_sessionmaker(
+    engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False
+)
 
 Base = declarative_base()
+
+
+async def get_db():
+    """Dependency for getting database sessions"""
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def init_db():
+    """Initialize database tables"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # Columns, indexes and triggers create_all cannot add (see app/migrations)
+        await conn.run_sync(run_migrations, migrations)
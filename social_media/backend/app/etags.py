@@ -0,0 +1,92 @@
+"""
+Conditional GET for the read endpoints.
+
+ETags are derived from table high-water marks (max ids, read from the rowid
+b-trees and indexes, never from row data) plus an in-process generation. The
+generation changes on restart and whenever rows change without a new id:
+clears/resets (SQLite may reuse ids afterwards) and counter repairs.
+Insert-only writes, which is everything else, all move a max id.
+
+Marks are read before the payload, so a write landing in between can only
+make the next request miss the cache, never serve stale data.
+"""
+
+import hashlib
+import uuid
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Comment, Post, Reaction
+
+# Clients must revalidate every time; with an ETag that costs one cheap query
+CACHE_CONTROL = "no-cache"
+
+
+class DataGeneration:
+    """Bumped on writes that do not move any high-water mark"""
+
+    def __init__(self):
+        self._boot = uuid.uuid4().hex[:8]
+        self._counter = 0
+
+    def bump(self):
+        self._counter += 1
+
+    def __str__(self) -> str:
+        return f"{self._boot}.{self._counter}"
+
+
+data_generation = DataGeneration()
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the given parts (weak: the body may be re-encoded by compression)"""
+    raw = ":".join(str(p) for p in (data_generation, *parts))
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+async def posts_etag(db: AsyncSession) -> str:
+    """Post list: new posts, and counters moved by new comments or reactions"""
+    marks = (await db.execute(select(
+        select(func.max(Post.id)).scalar_subquery(),
+        select(func.max(Comment.id)).scalar_subquery(),
+        select(func.max(Reaction.id)).scalar_subquery(),
+    ))).one()
+    return make_etag("posts", *marks)
+
+
+async def comments_etag(db: AsyncSession, post_id: int) -> str:
+    """One post's comments (answered from the comments(post_id, ...) index)"""
+    mark = await db.scalar(select(func.max(Comment.id)).where(Comment.post_id == post_id))
+    return make_etag("comments", post_id, mark)
+
+
+async def sync_etag(db: AsyncSession, last_post_id: int, last_comment_id: int, limit: int,
+                    include_archive: bool = False) -> str:
+    """A sync response: fixed by the starting cursor and what exists beyond it"""
+    marks = (await db.execute(select(
+        select(func.max(Post.id)).scalar_subquery(),
+        select(func.max(Comment.id)).scalar_subquery(),
+    ))).one()
+    return make_etag("sync", last_post_id, last_comment_id, limit, include_archive, *marks)
@@ -0,0 +1,122 @@
+"""
+In-process change feed.
+
+Route handlers publish post/comment creation to the global EventBroker after
+their transaction commits; each /api/events subscriber gets its own queue.
+Every event id is a sync cursor (see routes.api_index.encode_cursor), so a
+client that reconnects with Last-Event-ID replays what it missed from the
+database and then continues with live events.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from .config import config
+from .database import AsyncSessionLocal
+from .models import Post, Comment
+from .routes.api_index import encode_cursor, format_comments, format_post
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChangeEvent:
+    id: str
+    event: str
+    data: Dict[str, Any]
+    post_id: Optional[int] = None
+    comment_id: Optional[int] = None
+
+
+@dataclass
+class Subscription:
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    overflowed: bool = False
+
+
+def format_sse(event_id: str, event: str, data: Dict[str, Any]) -> str:
+    """Serialize one Server-Sent Event"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventBroker:
+    """Fans out creation events to connected feed subscribers"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_post_id = 0
+        self._last_comment_id = 0
+
+    async def start(self):
+        """Bind to the running loop and seed the high-water marks from the database"""
+        self._loop = asyncio.get_running_loop()
+        async with AsyncSessionLocal() as db:
+            self._last_post_id = await db.scalar(select(func.max(Post.id))) or 0
+            self._last_comment_id = await db.scalar(select(func.max(Comment.id))) or 0
+
+    def stop(self):
+        """Close every open subscription"""
+        for subscription in list(self._subscribers):
+            subscription.queue.put_nowait(None)
+        self._loop = None
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription()
+        self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self._subscribers:
+            self._subscribers.remove(subscription)
+
+    def publish_post(self, post: Post):
+        """Announce a committed post; safe to call from any thread"""
+        self._publish("post", format_post(post, []), post_id=post.id)
+
+    def publish_comment(self, comment: Comment):
+        """Announce a committed comment or reply; safe to call from any thread"""
+        data = {
+            "post_id": comment.post_id,
+            "comment": format_comments([comment], include_orphans=True)[0],
+        }
+        self._publish("comment", data, comment_id=comment.id)
+
+    def _publish(self, event: str, data: Dict[str, Any], post_id: int = None, comment_id: int = None):
+        with self._lock:
+            if post_id:
+                self._last_post_id = max(self._last_post_id, post_id)
+            if comment_id:
+                self._last_comment_id = max(self._last_comment_id, comment_id)
+            change = ChangeEvent(
+                id=encode_cursor(self._last_post_id, self._last_comment_id),
+                event=event, data=data, post_id=post_id, comment_id=comment_id
+            )
+            # Scheduled under the lock, so subscribers get events in id order
+            loop = self._loop
+            if loop is not None:
+                loop.call_soon_threadsafe(self._fan_out, change)
+
+    def _fan_out(self, change: ChangeEvent):
+        for subscription in self._subscribers:
+            if subscription.overflowed:
+                continue
+            if subscription.queue.qsize() >= self.queue_size:
+                # Too slow: end its stream, it can resume from its last event id
+                subscription.overflowed = True
+                subscription.queue.put_nowait(None)
+                logger.warning("Change feed subscriber fell behind and was disconnected")
+                continue
+            subscription.queue.put_nowait(change)
+
+
+# Global event broker
+event_broker = EventBroker(queue_size=config.event_queue_size)
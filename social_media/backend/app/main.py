@@ -1,18 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routes import posts, comments, reactions, api_index
+from .archive import archive_periodically
+from .config import config
+from .counters import reaction_buffer, reconcile_periodically
+from .events import event_broker
+from .database import engine, init_db
+from .writes import write_buffer
+from .routes import posts, comments, reactions, api_index, feed, search
+from shared.compression import CompressionMiddleware
 
-# ✅ Create DB Tables on startup
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables, start the change feed, write buffers, counter reconciliation and retention; flush on shutdown"""
+    # ✅ Create DB Tables on startup
+    await init_db()
+    await event_broker.start()
+    reaction_buffer.start()
+    write_buffer.start()
+    reconciler = asyncio.create_task(reconcile_periodically(config.counter_reconcile_interval_s))
+    archiver = None
+    if config.retention_enabled:
+        archiver = asyncio.create_task(archive_periodically(config.retention_interval_s))
+    yield
+    if archiver:
+        archiver.cancel()
+    reconciler.cancel()
+    await write_buffer.stop()
+    await reaction_buffer.stop()
+    event_broker.stop()
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.options("/{path:path}")
 async def options_handler(path: str, request: Request):
     return Response(status_code=200)
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=config.compression_minimum_size,
+    gzip_level=config.compression_gzip_level,
+    brotli_quality=config.compression_brotli_quality,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], # Allow all for dev
@@ -22,6 +57,8 @@ app.add_middleware(
 )
 
 app.include_router(api_index.router)
+app.include_router(feed.router)
 app.include_router(posts.router)
 app.include_router(comments.router)
-app.include_router(reactions.router)
\ No newline at end of file
+app.include_router(reactions.router)
+app.include_router(search.router)
@@ -0,0 +1,18 @@
+"""
+Denormalized reaction/comment counters on posts (was migrate_add_counters.py).
+
+The new columns start at zero; the reconciliation job that runs at startup
+backfills them from the reaction and comment rows.
+"""
+
+from sqlalchemy.engine import Connection
+
+from shared.migrations import add_missing_columns
+
+
+def upgrade(conn: Connection):
+    add_missing_columns(conn, "posts", {
+        "reaction_count": "INTEGER NOT NULL DEFAULT 0",
+        "comment_count": "INTEGER NOT NULL DEFAULT 0",
+        "reaction_counts": "JSON NOT NULL DEFAULT '{}'",
+    })
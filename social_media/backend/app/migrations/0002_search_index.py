@@ -0,0 +1,14 @@
+"""FTS5 index over post content and comment text, with its sync triggers."""
+
+from sqlalchemy.engine import Connection
+
+from ..search import create_search_index
+
+PLAN_CHECKS = [
+    ("SELECT rowid FROM search_index WHERE search_index MATCH 'cvv' ORDER BY rank",
+     "VIRTUAL TABLE INDEX"),
+]
+
+
+def upgrade(conn: Connection):
+    create_search_index(conn)
@@ -0,0 +1,53 @@
+"""
+Composite and partial indexes for the hot read paths.
+
+- posts(channel_id, id): GET /posts/?channel_id=... newest first / keyset pages
+- posts(created_at, id): export order, created_at range filters
+- comments(post_id, created_at, id): per-post comment lists (export join,
+  /api/sync, GET /comments/{post_id})
+- comments(post_id, id) WHERE parent_id IS NULL: thread roots
+- comments(parent_id, id) WHERE parent_id IS NOT NULL: thread children and
+  reply counts
+- reactions(post_id, emoji): counter reconciliation, covering
+"""
+
+from sqlalchemy.engine import Connection
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_posts_channel ON posts (channel_id, id)",
+    "CREATE INDEX IF NOT EXISTS ix_posts_created_at ON posts (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_comments_post_created ON comments (post_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_comments_roots ON comments (post_id, id) WHERE parent_id IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_comments_replies ON comments (parent_id, id) WHERE parent_id IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS ix_reactions_post_emoji ON reactions (post_id, emoji)",
+]
+
+# Superseded by the partial indexes above
+DROPPED = ["ix_comments_post_parent", "ix_comments_parent"]
+
+PLAN_CHECKS = [
+    ("SELECT * FROM posts WHERE channel_id = 'chirper' ORDER BY id DESC LIMIT 100",
+     "INDEX ix_posts_channel"),
+    ("SELECT id FROM posts ORDER BY created_at, id",
+     "INDEX ix_posts_created_at"),
+    ("SELECT * FROM posts WHERE created_at >= '2026-01-01 00:00:00'",
+     "INDEX ix_posts_created_at"),
+    ("SELECT * FROM comments WHERE post_id = 1 ORDER BY created_at, id",
+     "INDEX ix_comments_post_created"),
+    ("SELECT p.id, c.id FROM posts p LEFT JOIN comments c ON c.post_id = p.id "
+     "ORDER BY p.created_at, p.id, c.created_at, c.id",
+     "INDEX ix_comments_post_created"),
+    ("SELECT id FROM comments WHERE post_id = 1 AND parent_id IS NULL AND id > 10 ORDER BY id LIMIT 21",
+     "INDEX ix_comments_roots"),
+    ("SELECT count(*) FROM comments WHERE parent_id = 1",
+     "INDEX ix_comments_replies"),
+    ("SELECT post_id, emoji, count(id) FROM reactions GROUP BY post_id, emoji",
+     "INDEX ix_reactions_post_emoji"),
+]
+
+
+def upgrade(conn: Connection):
+    for name in DROPPED:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    for statement in INDEXES:
+        conn.exec_driver_sql(statement)
@@ -0,0 +1,46 @@
+"""
+Parsed author/body columns on posts and comments, backfilled from the raw
+content/text, plus indexes for per-author lookups.
+
+New rows get these from the model's insert defaults (see app/parsing.py). The
+backfill registers the same parsers as SQLite functions so it runs as one
+UPDATE per table.
+"""
+
+from sqlalchemy.engine import Connection
+
+from shared.migrations import add_missing_columns
+from ..parsing import comment_body, parse_author, post_body
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_posts_author ON posts (author, id)",
+    "CREATE INDEX IF NOT EXISTS ix_comments_author ON comments (author, id)",
+]
+
+PLAN_CHECKS = [
+    ("SELECT * FROM posts WHERE author = '@SignalStarter' ORDER BY id DESC LIMIT 100",
+     "INDEX ix_posts_author"),
+    ("SELECT * FROM comments WHERE author = '@SignalStarter' ORDER BY id DESC LIMIT 100",
+     "INDEX ix_comments_author"),
+]
+
+
+def upgrade(conn: Connection):
+    add_missing_columns(conn, "posts", {"author": "VARCHAR", "body": "TEXT"})
+    add_missing_columns(conn, "comments", {"author": "VARCHAR", "body": "TEXT"})
+
+    dbapi_connection = conn.connection.dbapi_connection
+    dbapi_connection.create_function("parse_author", 1, parse_author, deterministic=True)
+    dbapi_connection.create_function("post_body", 1, post_body, deterministic=True)
+    dbapi_connection.create_function("comment_body", 1, comment_body, deterministic=True)
+    conn.exec_driver_sql(
+        "UPDATE posts SET author = parse_author(content), body = post_body(content) "
+        "WHERE author IS NULL OR body IS NULL"
+    )
+    conn.exec_driver_sql(
+        "UPDATE comments SET author = parse_author(text), body = comment_body(text) "
+        "WHERE author IS NULL OR body IS NULL"
+    )
+
+    for statement in INDEXES:
+        conn.exec_driver_sql(statement)
@@ -0,0 +1,14 @@
+"""
+Apply or list schema migrations for the configured database.
+
+Usage (from social_media/backend):
+    python -m app.migrations            # create tables, apply pending migrations
+    python -m app.migrations status     # list migrations and whether they ran
+"""
+
+from app import migrations, models  # noqa: F401  (models registers the tables on Base.metadata)
+from app.database import engine, init_db
+from shared.migrations import main
+
+if __name__ == "__main__":
+    main(migrations, engine, init_db)
@@ -1,7 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
+from .parsing import comment_body, parse_author, post_body
+
+
+def _from_param(name, parse):
+    """Column default computed from another value of the same INSERT row"""
+    return lambda context: parse(context.get_current_parameters().get(name))
 
 
 class Post(Base):
@@ -13,6 +19,13 @@ class Post(Base):
     scheduled_at = Column(DateTime, nullable=True)
     image_url = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
+    # Parsed from content once at insert time (backfilled by migration 0004)
+    author = Column(String, default=_from_param("content", parse_author))
+    body = Column(Text, default=_from_param("content", post_body))
+    # Denormalized counters, kept current by the reaction buffer and add_comment
+    reaction_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reaction_counts = Column(JSON, nullable=False, default=dict, server_default="{}")  # emoji -> count
 
     reactions = relationship("Reaction", back_populates="post")
     comments = relationship("Comment", back_populates="post")
@@ -33,6 +46,40 @@ class Comment(Base):
     parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
     text = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
+    # Parsed from text once at insert time (backfilled by migration 0004)
+    author = Column(String, default=_from_param("text", parse_author))
+    body = Column(Text, default=_from_param("text", comment_body))
 
     post = relationship("Post", back_populates="comments")
-    replies = relationship("Comment")
\ No newline at end of file
+    replies = relationship("Comment")
+
+
+class SyncCursor(Base):
+    """Per-consumer high-water mark for /api/sync (replaces history.json)."""
+    __tablename__ = "sync_cursors"
+    consumer = Column(String, primary_key=True)
+    last_post_id = Column(Integer, nullable=False, default=0)
+    last_comment_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class ArchiveSegment(Base):
+    """
+    Index entry for one archive segment file (see app/archive.py): the post id,
+    comment id and creation time ranges it holds.
+    """
+    __tablename__ = "archive_segments"
+    id = Column(Integer, primary_key=True)
+    filename = Column(String, nullable=False, unique=True)
+    min_post_id = Column(Integer, nullable=False)
+    max_post_id = Column(Integer, nullable=False)
+    min_comment_id = Column(Integer, nullable=True)
+    max_comment_id = Column(Integer, nullable=True)
+    min_created_at = Column(DateTime, nullable=True)
+    max_created_at = Column(DateTime, nullable=True)
+    post_count = Column(Integer, nullable=False, default=0)
+    comment_count = Column(Integer, nullable=False, default=0)
+    reaction_count = Column(Integer, nullable=False, default=0)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    sha256 = Column(String, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
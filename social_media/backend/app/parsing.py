@@ -0,0 +1,29 @@
+"""
+Author / body parsing for post content and comment text.
+
+Generated posts look like "@Handle says: ...", with the body after the first
+blank line; comments like "@Handle says: body". These run once per row at
+insert time (as column defaults, see models.py) and in the 0004 backfill, so
+read paths select the stored author and body columns instead.
+"""
+
+import re
+from typing import Optional
+
+AUTHOR_RE = re.compile(r"^(@\w+)\s+says:")
+
+
+def parse_author(content: Optional[str]) -> str:
+    """Extracts author like '@SignalStarter' from the start of a string."""
+    match = AUTHOR_RE.match(content or "")
+    return match.group(1) if match else "Anonymous"
+
+
+def post_body(content: Optional[str]) -> str:
+    """Post content after the header paragraph."""
+    return (content or "").split("\n\n", 1)[-1]
+
+
+def comment_body(text: Optional[str]) -> str:
+    """Comment text after the "@Handle says:" prefix."""
+    return (text or "").split(": ", 1)[-1]
@@ -0,0 +1,74 @@
+"""
+Fast JSON responses for the hot endpoints.
+
+Handlers that return FastJSONResponse directly skip FastAPI's
+jsonable_encoder pass and are rendered by orjson when it is installed (the
+standard library otherwise). Datetimes come out in the same ISO format
+either way.
+
+NDJSONResponse streams one JSON document per line from an async iterator, so
+neither side has to hold the whole result in memory.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterable, AsyncIterator
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the json module
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Lines are sent in chunks of about this many bytes rather than one write per
+# line, so a compressed stream is not flushed after every small document
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+def wants_ndjson(format: str, accept: str) -> bool:
+    """?format=ndjson, or an Accept header asking for application/x-ndjson"""
+    return format == "ndjson" or NDJSON_MEDIA_TYPE in accept
+
+
+async def ndjson_chunks(items: AsyncIterable[Any], chunk_bytes: int = NDJSON_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Encode each item as one line, yielding roughly chunk_bytes at a time"""
+    buffer = bytearray()
+    async for item in items:
+        buffer += dumps(item)
+        buffer += b"\n"
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class NDJSONResponse(StreamingResponse):
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(self, items: AsyncIterable[Any], **kwargs):
+        super().__init__(ndjson_chunks(items), **kwargs)
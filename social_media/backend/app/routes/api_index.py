@@ -1,116 +1,420 @@
-import json
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from pathlib import Path
-import re
+import base64
+import binascii
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import namedtuple
 
-from ..database import SessionLocal
-from ..models import Post, Comment, Reaction  # Reaction model is needed for a full DB clear
+from ..archive import (
+    archive_high_water, archive_old_posts, clear_archive, iter_archived_posts, load_archived_posts,
+)
+from ..database import AsyncSessionLocal, get_db
+from ..counters import run_reconciliation
+from ..etags import data_generation, etag_headers, etag_matches, not_modified, sync_etag
+from ..responses import FastJSONResponse, NDJSONResponse, wants_ndjson
+from ..writes import write_buffer
+from ..models import ArchiveSegment, Post, Comment, Reaction, SyncCursor  # Reaction model is needed for a full DB clear
 
-# --- CONFIGURATION ---
-HISTORY_FILE = Path("history.json")
+# Rows fetched per round-trip when exporting the whole database
+EXPORT_CHUNK_SIZE = 1000
+
+# Lightweight stand-in for a Comment when rows come from a join
+CommentRow = namedtuple("CommentRow", ["id", "parent_id", "author", "body", "created_at"])
 
 router = APIRouter(prefix="/api", tags=["API & Sync"])
 
 
-# --- DEPENDENCY ---
-def get_db():
-    db = SessionLocal()
+# --- HELPER FUNCTIONS ---
+def encode_cursor(last_post_id: int, last_comment_id: int) -> str:
+    """Packs the post/comment high-water marks into an opaque cursor string."""
+    raw = f"{last_post_id}:{last_comment_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor. Raises 400 on anything it did not produce."""
     try:
-        yield db
-    finally:
-        db.close()
+        padded = cursor + "=" * (-len(cursor) % 4)
+        post_part, comment_part = base64.urlsafe_b64decode(padded).decode().split(":")
+        last_post_id, last_comment_id = int(post_part), int(comment_part)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+    if last_post_id < 0 or last_comment_id < 0:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+    return last_post_id, last_comment_id
 
 
-# --- HELPER FUNCTIONS ---
-def parse_author(content: str):
-    """Extracts author like '@SignalStarter' from the start of a string."""
-    match = re.match(r"^(@\w+)\s+says:", content)
-    return match.group(1) if match else "Anonymous"
+def format_comments(comments, include_orphans: bool = False):
+    """
+    Flattens a post's comments (ordered by created_at) into threaded order:
+    each comment is followed by its replies, depth first.
+
+    Replies whose parent is not in `comments` are dropped unless
+    include_orphans is set, in which case they are emitted as roots.
+    Built iteratively so deep reply chains cannot hit the recursion limit.
+    """
+    known_ids = {c.id for c in comments}
+    roots = []
+    children = {}
+    for c in comments:
+        if c.parent_id and c.parent_id in known_ids:
+            children.setdefault(c.parent_id, []).append(c)
+        elif not c.parent_id or include_orphans:
+            roots.append(c)
+
+    flat_list = []
+    stack = roots[::-1]
+    while stack:
+        c = stack.pop()
+        flat_list.append({
+            "comment_id": c.id, "parent_comment_id": c.parent_id,
+            "handler_id": c.author, "type": "reply" if c.parent_id else "comment",
+            "comment": c.body,
+            "timestamp": c.created_at.strftime("%d-%m-%Y %H:%M:%S"),
+        })
+        replies = children.get(c.id)
+        if replies:
+            stack.extend(reversed(replies))
+    return flat_list
 
 
-def format_db_state(db: Session):
+def format_post(post: Post, comments, include_orphans: bool = False):
+    """Formats one post and its comments into the sync/export JSON structure."""
+    return {
+        "post_id": post.id,
+        "channel": post.channel_id,
+        "author": post.author,
+        "content": post.body,
+        "timestamp": post.created_at.strftime("%d-%m-%Y %H:%M:%S"),
+        "comments": format_comments(comments, include_orphans),
+    }
+
+
+async def iter_db_state(db: AsyncSession, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yields every post in the target JSON structure, oldest first.
+
+    Posts and their comments come from a single LEFT JOIN ordered by post then
+    comment time, read `chunk_size` rows at a time, so each post's thread is
+    a consecutive run of rows and can be built without further queries.
+    """
+    rows = await db.stream(
+        select(
+            Post.id, Post.channel_id, Post.author, Post.body, Post.created_at,
+            Comment.id.label("comment_id"), Comment.parent_id,
+            Comment.author.label("comment_author"), Comment.body.label("comment_body"),
+            Comment.created_at.label("comment_created_at"),
+        )
+        .outerjoin(Comment, Comment.post_id == Post.id)
+        .order_by(Post.created_at.asc(), Post.id.asc(), Comment.created_at.asc(), Comment.id.asc())
+        .execution_options(yield_per=chunk_size)
+    )
+    post_row, comments = None, []
+    async for r in rows:
+        if post_row is None or r.id != post_row.id:
+            if post_row is not None:
+                yield format_post(post_row, comments)
+            post_row, comments = r, []
+        if r.comment_id is not None:
+            comments.append(CommentRow(r.comment_id, r.parent_id, r.comment_author, r.comment_body, r.comment_created_at))
+    if post_row is not None:
+        yield format_post(post_row, comments)
+
+
+async def format_db_state(db: AsyncSession):
     """Queries the entire DB and formats it into the target JSON structure."""
-    all_posts = db.query(Post).order_by(Post.created_at.asc()).all()
+    return [post async for post in iter_db_state(db)]
+
+
+async def collect_changes(db: AsyncSession, last_post_id: int, last_comment_id: int, limit: int):
+    """
+    Returns (posts, next_post_id, next_comment_id, has_more) for everything
+    created after the given high-water marks.
+
+    New posts are paged by id and carry all of their comments. Posts at or
+    below last_post_id are only included when they received comments after
+    last_comment_id, and then only with those new comments.
+    """
+    new_posts = (await db.scalars(
+        select(Post)
+        .where(Post.id > last_post_id)
+        .order_by(Post.id.asc())
+        .limit(limit + 1)
+    )).all()
+    has_more = len(new_posts) > limit
+    new_posts = new_posts[:limit]
+    next_post_id = new_posts[-1].id if new_posts else last_post_id
+
+    new_comments = (await db.scalars(
+        select(Comment)
+        .where(or_(
+            and_(Comment.post_id <= last_post_id, Comment.id > last_comment_id),
+            and_(Comment.post_id > last_post_id, Comment.post_id <= next_post_id),
+        ))
+        .order_by(Comment.post_id.asc(), Comment.created_at.asc(), Comment.id.asc())
+    )).all()
+    comments_by_post = {}
+    for c in new_comments:
+        comments_by_post.setdefault(c.post_id, []).append(c)
+    next_comment_id = max([last_comment_id] + [c.id for c in new_comments])
+
+    posts_by_id = {p.id: p for p in new_posts}
+    seen_ids = [pid for pid in comments_by_post if pid not in posts_by_id]
+    if seen_ids:
+        posts_by_id.update({p.id: p for p in await db.scalars(select(Post).where(Post.id.in_(seen_ids)))})
+        # Late comments on archived posts are sent with the post from its segment
+        archived_ids = [pid for pid in seen_ids if pid not in posts_by_id]
+        if archived_ids:
+            posts_by_id.update(await load_archived_posts(db, archived_ids))
+
     output_data = []
-    for post in all_posts:
-        post_data = {
-            "post_id": post.id,
-            "channel": post.channel_id,
-            "author": parse_author(post.content),
-            "content": post.content.split("\n\n", 1)[-1],
-            "timestamp": post.created_at.strftime("%d-%m-%Y %H:%M:%S"),
-            "comments": []
-        }
-        comments_query = db.query(Comment).filter(Comment.post_id == post.id).order_by(Comment.created_at.asc()).all()
-        comment_map = {
-            c.id: {
-                "db_id": c.id, "json_comment_id": c.id, "parent_db_id": c.parent_id,
-                "handler_id": parse_author(c.text), "type": "reply" if c.parent_id else "comment",
-                "comment": c.text.split(": ", 1)[-1],
-                "timestamp": c.created_at.strftime("%d-%m-%Y %H:%M:%S"),
-                "replies": []
-            } for c in comments_query
-        }
-        root_comments = []
-        for c_data in comment_map.values():
-            if c_data["parent_db_id"]:
-                parent = comment_map.get(c_data["parent_db_id"])
-                if parent: parent["replies"].append(c_data)
-            else:
-                root_comments.append(c_data)
-
-        def flatten_comments(comments_list):
-            flat_list = []
-            for c in comments_list:
-                parent_id = comment_map[c['parent_db_id']]['json_comment_id'] if c['parent_db_id'] else None
-                flat_list.append({
-                    "comment_id": c['json_comment_id'], "parent_comment_id": parent_id,
-                    "handler_id": c['handler_id'], "type": c['type'], "comment": c['comment'],
-                    "timestamp": c['timestamp'],
-                })
-                flat_list.extend(flatten_comments(c['replies']))
-            return flat_list
-
-        post_data["comments"] = flatten_comments(root_comments)
-        output_data.append(post_data)
-    return output_data
+    for post_id in sorted(posts_by_id):
+        post = posts_by_id[post_id]
+        is_new = post_id > last_post_id
+        output_data.append(format_post(post, comments_by_post.get(post_id, []), include_orphans=not is_new))
+    return output_data, next_post_id, next_comment_id, has_more
+
+
+async def collect_archived_changes(db: AsyncSession, last_post_id: int, last_comment_id: int, limit: int):
+    """
+    collect_changes for the archived id range: the next `limit` archived posts
+    after last_post_id with all their comments, merged by id with the posts in
+    that range that were held back in the hot tables. The comment cursor is
+    left alone, since archived comments only ever reach a consumer with their
+    post; held-back posts carry their comments up to the cursor, and later
+    ones follow through it.
+    """
+    archived, next_post_id, has_more = [], last_post_id, False
+    async for post, comments in iter_archived_posts(db, last_post_id):
+        if len(archived) == limit:
+            has_more = True
+            break
+        archived.append((post.id, format_post(post, comments)))
+        next_post_id = post.id
+
+    held_back = (await db.scalars(
+        select(Post).where(Post.id > last_post_id, Post.id <= next_post_id).order_by(Post.id.asc())
+    )).all()
+    if held_back:
+        comments = (await db.scalars(
+            select(Comment)
+            .where(Comment.post_id.in_([p.id for p in held_back]), Comment.id <= last_comment_id)
+            .order_by(Comment.post_id.asc(), Comment.created_at.asc(), Comment.id.asc())
+        )).all()
+        comments_by_post = {}
+        for c in comments:
+            comments_by_post.setdefault(c.post_id, []).append(c)
+        archived += [(p.id, format_post(p, comments_by_post.get(p.id, []))) for p in held_back]
+        archived.sort(key=lambda item: item[0])
+
+    if not has_more:
+        has_more = await db.scalar(select(Post.id).where(Post.id > next_post_id).limit(1)) is not None
+    return [post for _, post in archived], next_post_id, last_comment_id, has_more
+
+
+async def collect_page(db: AsyncSession, last_post_id: int, last_comment_id: int, limit: int,
+                       include_archive: bool = False):
+    """One sync page: archived posts first (when asked for), then the hot tables."""
+    if include_archive and last_post_id < await archive_high_water(db):
+        return await collect_archived_changes(db, last_post_id, last_comment_id, limit)
+    return await collect_changes(db, last_post_id, last_comment_id, limit)
+
+
+async def save_cursor(db: AsyncSession, consumer: str, last_post_id: int, last_comment_id: int):
+    stored = await db.get(SyncCursor, consumer)
+    if stored is None:
+        stored = SyncCursor(consumer=consumer)
+        db.add(stored)
+    stored.last_post_id = last_post_id
+    stored.last_comment_id = last_comment_id
+    await db.commit()
+
+
+async def stream_changes(consumer: Optional[str], last_post_id: int, last_comment_id: int, limit: int,
+                         include_archive: bool = False):
+    """
+    NDJSON body for /api/sync: every pending change, `limit` posts per page.
+
+    Each page's posts are followed by a checkpoint line
+    {"consumer", "cursor", "has_more"}. The consumer's stored cursor is not
+    moved: it acknowledges a checkpoint (POST /api/sync/ack) once it has
+    processed the page. Runs on its own session since the request's session
+    is closed before a streamed body is sent.
+    """
+    async with AsyncSessionLocal() as db:
+        has_more = True
+        while has_more:
+            posts, last_post_id, last_comment_id, has_more = await collect_page(
+                db, last_post_id, last_comment_id, limit, include_archive
+            )
+            for post in posts:
+                yield post
+            yield {
+                "consumer": consumer,
+                "cursor": encode_cursor(last_post_id, last_comment_id),
+                "has_more": has_more,
+            }
+            # Drop this page's ORM objects before loading the next one
+            db.expunge_all()
+
+
+async def stream_db_state():
+    """NDJSON body for /api/export, one post per line from a server-side cursor"""
+    async with AsyncSessionLocal() as db:
+        async for post in iter_db_state(db):
+            yield post
 
 
 # --- API ENDPOINTS ---
 
 @router.get("/")
-def api_index_status():
+async def api_index_status():
     """Returns the basic status of the API."""
     return {"service": "Social Signal Chatroom API", "status": "running"}
 
 
-@router.get("/sync", response_model=list)
-def sync_data(db: Session = Depends(get_db)):
+@router.get("/sync", response_class=FastJSONResponse)
+async def sync_data(
+    consumer: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    include_archive: bool = False,
+    accept: str = Header(""),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Synchronizes chat data. Returns only new posts/comments since the last sync.
+    Incremental sync. Returns posts/comments created after the cursor plus the
+    cursor to send next time.
+
+    - `cursor`: opaque value returned by a previous call. Omit to start from the beginning.
+    - `consumer`: named reader (e.g. "fda", "iaa"). Its cursor is kept in the
+      database and used whenever no explicit `cursor` is passed. Reading does
+      not move it: POST /api/sync/ack does, once the consumer has processed
+      what it read, so a consumer that stops midway gets the rest again.
+    - `has_more`: more new posts are waiting beyond `limit`; call again.
+    - `format=ndjson` (or `Accept: application/x-ndjson`): stream every pending
+      change instead of one page, one post per line, with a
+      {"consumer", "cursor", "has_more"} checkpoint line after each `limit` posts.
+    - Responses carry an ETag; If-None-Match answers 304 while nothing new
+      exists beyond the cursor.
+    - `include_archive=true`: posts moved to the archive by retention are paged
+      through first when the cursor is below them; otherwise they are skipped.
     """
-    current_db_state = format_db_state(db)
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'r') as f:
-            try:
-                history_state = json.load(f)
-            except json.JSONDecodeError:
-                history_state = []
+    stored = await db.get(SyncCursor, consumer) if consumer else None
+    if cursor is not None:
+        last_post_id, last_comment_id = decode_cursor(cursor)
+    elif stored:
+        last_post_id, last_comment_id = stored.last_post_id, stored.last_comment_id
     else:
-        history_state = []
+        last_post_id, last_comment_id = 0, 0
+
+    etag = await sync_etag(db, last_post_id, last_comment_id, limit, include_archive)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    if wants_ndjson(format, accept):
+        return NDJSONResponse(
+            stream_changes(consumer, last_post_id, last_comment_id, limit, include_archive),
+            headers=etag_headers(etag)
+        )
+
+    posts, next_post_id, next_comment_id, has_more = await collect_page(
+        db, last_post_id, last_comment_id, limit, include_archive
+    )
+
+    return FastJSONResponse({
+        "consumer": consumer,
+        "cursor": encode_cursor(next_post_id, next_comment_id),
+        "has_more": has_more,
+        "posts": posts,
+    }, headers=etag_headers(etag))
+
+
+@router.post("/sync/ack")
+async def ack_sync(consumer: str, cursor: str, db: AsyncSession = Depends(get_db)):
+    """
+    Moves a consumer's stored cursor to `cursor` (from a sync response or
+    checkpoint line). Consumers call this after processing what they read,
+    which makes delivery at-least-once: whatever was read but not yet
+    acknowledged is sent again by the next sync.
+    """
+    last_post_id, last_comment_id = decode_cursor(cursor)
+    await save_cursor(db, consumer, last_post_id, last_comment_id)
+    return {"consumer": consumer, "cursor": cursor}
+
 
-    history_posts = {p['post_id']: p for p in history_state}
-    new_data_to_send = []
-    for current_post in current_db_state:
-        history_post = history_posts.get(current_post['post_id'])
-        if not history_post or len(current_post['comments']) > len(history_post['comments']):
-            new_data_to_send.append(current_post)
+@router.get("/export", response_model=list, response_class=FastJSONResponse)
+async def export_data(
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    accept: str = Header(""),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Returns the full database in sync format. Does not touch any sync cursor.
+
+    With `format=ndjson` (or `Accept: application/x-ndjson`) posts are streamed
+    one per line as they are read, so memory use does not grow with the database.
+    """
+    if wants_ndjson(format, accept):
+        return NDJSONResponse(stream_db_state())
+    return FastJSONResponse(await format_db_state(db))
+
+
+@router.post("/counters/reconcile")
+async def reconcile_counters_now():
+    """
+    Flushes buffered reactions, then recomputes every post's reaction/comment
+    counters from the raw rows and repairs any drift.
+    """
+    repaired = await run_reconciliation()
+    return {"status": "reconciled", "repaired_posts": repaired}
 
-    if new_data_to_send:
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(current_db_state, f, indent=2)
-    return new_data_to_send
+
+@router.get("/archive")
+async def list_archive(db: AsyncSession = Depends(get_db)):
+    """Archive segments written by retention, oldest first, with their id and time ranges."""
+    segments = list(await db.scalars(select(ArchiveSegment).order_by(ArchiveSegment.min_post_id.asc())))
+    return {
+        "high_water_post_id": await archive_high_water(db),
+        "segments": [
+            {
+                "filename": s.filename, "min_post_id": s.min_post_id, "max_post_id": s.max_post_id,
+                "min_comment_id": s.min_comment_id, "max_comment_id": s.max_comment_id,
+                "min_created_at": s.min_created_at, "max_created_at": s.max_created_at,
+                "post_count": s.post_count, "comment_count": s.comment_count,
+                "reaction_count": s.reaction_count, "size_bytes": s.size_bytes, "sha256": s.sha256,
+            }
+            for s in segments
+        ],
+    }
+
+
+@router.post("/archive/run")
+async def run_archive(max_age_days: Optional[float] = Query(None, ge=0)):
+    """Applies retention now: archives posts older than `max_age_days` (default: retention.max_age_days)."""
+    segments = await archive_old_posts(max_age_days)
+    return {
+        "status": "archived",
+        "segments": [s.filename for s in segments],
+        "posts": sum(s.post_count for s in segments),
+        "comments": sum(s.comment_count for s in segments),
+        "reactions": sum(s.reaction_count for s in segments),
+    }
+
+
+@router.get("/writes/metrics")
+async def write_metrics():
+    """Group-commit writer settings, batch sizes, throughput and latency percentiles (ms)."""
+    return {
+        "group_commit": write_buffer.running,
+        "durability": write_buffer.durability,
+        "flush_interval_ms": write_buffer.flush_interval * 1000,
+        "max_batch": write_buffer.max_batch,
+        **write_buffer.metrics.snapshot(),
+    }
 
 
 # ==============================================================================
@@ -118,52 +422,58 @@ def sync_data(db: Session = Depends(get_db)):
 # ==============================================================================
 
 @router.delete("/database/clear")
-def clear_database_only(db: Session = Depends(get_db)):
+async def clear_database_only(db: AsyncSession = Depends(get_db)):
     """
-    Clears the entire database (posts, comments, reactions) but leaves history.json untouched.
+    Clears the entire database (posts, comments, reactions and their archive)
+    but leaves sync cursors untouched.
     """
     # Delete in order of dependencies: children first
-    db.query(Reaction).delete()
-    db.query(Comment).delete()
-    db.query(Post).delete()
-    db.commit()
+    await db.execute(delete(Reaction))
+    await db.execute(delete(Comment))
+    await db.execute(delete(Post))
+    await clear_archive(db)  # ids restart, so archived ranges would collide
+    await db.commit()
+    data_generation.bump()  # ids may be reused from here on
     return {"status": "database_cleared", "detail": "All posts, comments, and reactions have been deleted."}
 
 
 @router.delete("/history/clear")
-def clear_history_only():
+async def clear_history_only(consumer: Optional[str] = None, db: AsyncSession = Depends(get_db)):
     """
-    Clears the history.json file but leaves the database untouched.
-    This will cause the next /sync call to resend all data.
+    Resets sync cursors (one consumer, or all of them) but leaves the data untouched.
+    The affected consumers will receive everything again on their next /sync call.
     """
-    if HISTORY_FILE.exists():
-        HISTORY_FILE.unlink()
-        return {"status": "history_cleared", "detail": "history.json has been deleted."}
+    query = delete(SyncCursor)
+    if consumer:
+        query = query.where(SyncCursor.consumer == consumer)
+    cleared = (await db.execute(query)).rowcount
+    await db.commit()
+    if cleared:
+        return {"status": "history_cleared", "detail": f"{cleared} sync cursor(s) have been reset."}
     else:
-        return {"status": "not_found", "detail": "history.json does not exist."}
+        return {"status": "not_found", "detail": "No matching sync cursors exist."}
 
 
 @router.delete("/reset/all")
-def reset_everything(db: Session = Depends(get_db)):
+async def reset_everything(db: AsyncSession = Depends(get_db)):
     """
-    MASTER RESET: Clears the entire database AND the history.json file for a complete fresh start.
+    MASTER RESET: Clears the entire database AND all sync cursors for a complete fresh start.
     """
     # Clear Database
-    db.query(Reaction).delete()
-    db.query(Comment).delete()
-    db.query(Post).delete()
-    db.commit()
+    await db.execute(delete(Reaction))
+    await db.execute(delete(Comment))
+    await db.execute(delete(Post))
+    await clear_archive(db)
 
-    # Clear History
-    history_cleared_message = "history.json does not exist."
-    if HISTORY_FILE.exists():
-        HISTORY_FILE.unlink()
-        history_cleared_message = "history.json has been deleted."
+    # Clear sync cursors
+    cleared = (await db.execute(delete(SyncCursor))).rowcount
+    await db.commit()
+    data_generation.bump()  # ids may be reused from here on
 
     return {
         "status": "complete_reset_finished",
         "detail": {
             "database": "All posts, comments, and reactions have been deleted.",
-            "history": history_cleared_message
+            "history": f"{cleared} sync cursor(s) have been reset."
         }
-    }
\ No newline at end of file
+    }
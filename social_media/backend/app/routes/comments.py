@@ -1,47 +1,169 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from ..models import Comment
-from ..schemas import CommentCreate
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query, Request
+from sqlalchemy import bindparam, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..bulk import check_references, read_bulk_items
+from ..database import get_db
+from ..etags import comments_etag, etag_headers, etag_matches, not_modified
+from ..events import event_broker
+from ..models import Comment, Post
+from ..responses import FastJSONResponse
+from ..schemas import CommentCreate, CommentBulkCreate
+from ..writes import insert_comments, write_buffer
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
+# Depth-first walk below a page of thread roots. The recursive step is ordered
+# by the zero-padded id path, so rows come out in pre-order and the LIMIT
+# stops the walk after max_nodes comments.
+THREAD_SQL = text("""
+    WITH RECURSIVE thread(id, parent_id, author, text, created_at, depth, path) AS (
+        SELECT id, parent_id, author, text, created_at, 0, printf('%010d', id)
+        FROM comments WHERE id IN :root_ids
+        UNION ALL
+        SELECT c.id, c.parent_id, c.author, c.text, c.created_at, t.depth + 1,
+               t.path || '/' || printf('%010d', c.id)
+        FROM comments c JOIN thread t ON c.parent_id = t.id
+        WHERE t.depth < :max_depth
+        ORDER BY 7
+        LIMIT :max_nodes
+    )
+    SELECT id, parent_id, author, text, created_at, depth,
+           (SELECT count(*) FROM comments r WHERE r.parent_id = thread.id) AS reply_count
+    FROM thread ORDER BY path
+""").bindparams(bindparam("root_ids", expanding=True))
+
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# ✅ Create many comments/replies at once (declared before /{post_id})
+@router.post("/bulk")
+async def add_comments_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Creates many comments and replies in a single transaction. The body is a
+    JSON array or NDJSON stream of {post_id, text, parent_id}; the response
+    lists the assigned ids in input order. An unknown post_id, or a parent_id
+    that is not a comment on the same post, rejects the whole batch with 422.
+    """
+    items = await read_bulk_items(request, CommentBulkCreate)
+    comments = []
+    if items:
+        await check_references(db, items)
+        comments = await insert_comments(db, [item.model_dump() for item in items])
+        await db.commit()
+    for comment in comments:
+        event_broker.publish_comment(comment)
+    return {"status": "ok", "count": len(comments), "ids": [comment.id for comment in comments]}
 
 
 # ✅ Create comment OR reply
 @router.post("/{post_id}")
-def add_comment(
+async def add_comment(
     post_id: int,
     data: CommentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    if write_buffer.running:
+        # Group commit: returns once the batch holding this comment has committed
+        comment = await write_buffer.submit_comment({"post_id": post_id, **data.model_dump()})
+        event_broker.publish_comment(comment)
+        return {"status": "ok", "id": comment.id}
+
     comment = Comment(
         post_id=post_id,
         text=data.text,
         parent_id=data.parent_id  # <-- THIS enables replies
     )
     db.add(comment)
-    db.commit()
-    db.refresh(comment)
+    await db.execute(
+        update(Post).where(Post.id == post_id)
+        .values(comment_count=Post.comment_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(comment)
+    event_broker.publish_comment(comment)
     return {"status": "ok", "id": comment.id}
 
 
+# ✅ Fetch one page of a thread (top-level comments or the replies under parent_id)
+@router.get("/{post_id}/thread")
+async def get_thread(
+    post_id: int,
+    parent_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=200),
+    depth: int = Query(2, ge=0, le=10),
+    max_nodes: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Returns a page of thread roots with their replies down to `depth` levels,
+    flattened in pre-order (each comment followed by its replies).
+
+    Roots are the post's top-level comments, or the direct replies to
+    `parent_id` when expanding a subtree. Page through roots with `after_id`
+    (the returned `next_after_id`). Every comment carries its total
+    `reply_count`; `has_more_replies` marks ones whose replies were cut off by
+    `depth` or `max_nodes` and can be fetched with `parent_id`.
+    """
+    query = select(Comment.id).where(Comment.post_id == post_id)
+    if parent_id is None:
+        query = query.where(Comment.parent_id.is_(None))
+    else:
+        query = query.where(Comment.parent_id == parent_id)
+    if after_id is not None:
+        query = query.where(Comment.id > after_id)
+    root_ids = list(await db.scalars(query.order_by(Comment.id.asc()).limit(limit + 1)))
+    has_more = len(root_ids) > limit
+    root_ids = root_ids[:limit]
+
+    rows = []
+    if root_ids:
+        rows = (await db.execute(
+            THREAD_SQL, {"root_ids": root_ids, "max_depth": depth, "max_nodes": max_nodes}
+        )).all()
+
+    loaded_replies = Counter(row.parent_id for row in rows if row.depth > 0)
+    comments = []
+    for row in rows:
+        comments.append({
+            "id": row.id,
+            "parent_id": row.parent_id,
+            "author": row.author,
+            "text": row.text,
+            "created_at": datetime.fromisoformat(row.created_at) if row.created_at else None,
+            "depth": row.depth,
+            "reply_count": row.reply_count,
+            "has_more_replies": row.reply_count > loaded_replies[row.id],
+        })
+
+    return {
+        "post_id": post_id,
+        "parent_id": parent_id,
+        "comments": comments,
+        "truncated": len(rows) >= max_nodes,
+        "has_more": has_more,
+        "next_after_id": root_ids[-1] if has_more else None,
+    }
+
+
 # ✅ Fetch comments in threaded form
 @router.get("/{post_id}")
-def get_comments(post_id: int, db: Session = Depends(get_db)):
-    comments = (
-        db.query(Comment)
-        .filter(Comment.post_id == post_id)
+async def get_comments(
+    post_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    etag = await comments_etag(db, post_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    comments = (await db.scalars(
+        select(Comment)
+        .where(Comment.post_id == post_id)
         .order_by(Comment.created_at.asc())
-        .all()
-    )
+    )).all()
 
     # Build comment map
     comment_map = {}
@@ -63,4 +185,4 @@ def get_comments(post_id: int, db: Session = Depends(get_db)):
         else:
             roots.append(c)
 
-    return roots
+    return FastJSONResponse(roots, headers=etag_headers(etag))
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from ..config import config
+from ..database import AsyncSessionLocal
+from ..events import Subscription, event_broker, format_sse
+from .api_index import collect_changes, decode_cursor, encode_cursor
+
+# Posts per database page when replaying a resumed stream
+REPLAY_PAGE_SIZE = 500
+
+router = APIRouter(prefix="/api", tags=["Change Feed"])
+
+
+async def _collect_page(last_post_id: int, last_comment_id: int):
+    async with AsyncSessionLocal() as db:
+        return await collect_changes(db, last_post_id, last_comment_id, REPLAY_PAGE_SIZE)
+
+
+def changes_as_events(posts, last_post_id: int):
+    """Turns a collect_changes page into (event, data) pairs"""
+    for post in posts:
+        if post["post_id"] > last_post_id:
+            yield "post", post
+        else:
+            for comment in post["comments"]:
+                yield "comment", {"post_id": post["post_id"], "comment": comment}
+
+
+async def stream_events(request: Request, subscription: Subscription, start):
+    try:
+        replayed_post_id = replayed_comment_id = 0
+        if start is not None:
+            last_post_id, last_comment_id = start
+            has_more = True
+            while has_more:
+                posts, next_post_id, next_comment_id, has_more = await _collect_page(
+                    last_post_id, last_comment_id
+                )
+                page = list(changes_as_events(posts, last_post_id))
+                # Only the last event of a page advances the cursor; resuming
+                # mid-page replays the page again (at-least-once)
+                for i, (event, data) in enumerate(page):
+                    if i == len(page) - 1:
+                        event_id = encode_cursor(next_post_id, next_comment_id)
+                    else:
+                        event_id = encode_cursor(last_post_id, last_comment_id)
+                    yield format_sse(event_id, event, data)
+                last_post_id, last_comment_id = next_post_id, next_comment_id
+            replayed_post_id, replayed_comment_id = last_post_id, last_comment_id
+
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), timeout=config.event_keepalive_s)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if change is None:
+                break
+            # Already delivered by the replay above
+            if change.post_id and change.post_id <= replayed_post_id:
+                continue
+            if change.comment_id and change.comment_id <= replayed_comment_id:
+                continue
+            yield format_sse(change.id, change.event, change.data)
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+@router.get("/events")
+async def change_feed(request: Request, cursor: Optional[str] = None):
+    """
+    Server-Sent Events stream of post and comment creation.
+
+    Each event id is a sync cursor. Reconnect with the `Last-Event-ID` header
+    (or `?cursor=`) to replay everything created after it before live events
+    resume. Without either, the stream starts with the next change.
+    """
+    resume_from = request.headers.get("last-event-id") or cursor
+    start = decode_cursor(resume_from) if resume_from else None
+    # Subscribe before replaying so nothing committed meanwhile is missed
+    subscription = event_broker.subscribe()
+    return StreamingResponse(
+        stream_events(request, subscription, start),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
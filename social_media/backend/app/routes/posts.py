@@ -1,25 +1,32 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Header, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import Optional
+from datetime import datetime
 
-from ..database import SessionLocal
-from ..models import Post, Reaction, Comment
+from ..bulk import read_bulk_items
+from ..database import get_db
+from ..etags import etag_headers, etag_matches, not_modified, posts_etag
+from ..events import event_broker
+from ..models import Post
+from ..responses import FastJSONResponse
 from ..schemas import PostCreate
+from ..writes import insert_posts, write_buffer
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Page size when paging with before_id/after_id and no explicit limit
+PAGE_SIZE = 100
 
 
 @router.post("/")
-def create_post(data: PostCreate, db: Session = Depends(get_db)):
+async def create_post(data: PostCreate, db: AsyncSession = Depends(get_db)):
+    if write_buffer.running:
+        # Group commit: returns once the batch holding this post has committed
+        post = await write_buffer.submit_post(data.model_dump())
+        event_broker.publish_post(post)
+        return post
+
     post = Post(
         content=data.content,
         image_url=data.image_url,
@@ -27,36 +34,85 @@ def create_post(data: PostCreate, db: Session = Depends(get_db)):
         scheduled_at=data.scheduled_at
     )
     db.add(post)
-    db.commit()
-    db.refresh(post)
+    await db.commit()
+    await db.refresh(post)
+    event_broker.publish_post(post)
     return post
 
 
-@router.get("/")
-def get_posts(channel_id: Optional[str] = None, db: Session = Depends(get_db)):
-    # Start query
-    query = db.query(Post)
+@router.post("/bulk")
+async def create_posts_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Creates many posts in a single transaction. The body is a JSON array of
+    posts or an NDJSON stream; the response lists the assigned ids in input order.
+    """
+    items = await read_bulk_items(request, PostCreate)
+    posts = []
+    if items:
+        posts = await insert_posts(db, [item.model_dump() for item in items])
+        await db.commit()
+    for post in posts:
+        event_broker.publish_post(post)
+    return {"status": "ok", "count": len(posts), "ids": [post.id for post in posts]}
+
+
+@router.get("/", response_class=FastJSONResponse)
+async def get_posts(
+    channel_id: Optional[str] = None,
+    author: Optional[str] = None,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lists posts newest first with their reaction/comment counts.
+
+    Without `limit` and a page cursor every matching post is returned, as the
+    feed expects. Keyset pagination: pass `before_id` (smallest id of the
+    previous page) to walk back in time, or `after_id` (largest id already
+    seen) to fetch only newer posts; pages then hold `limit` posts (default
+    PAGE_SIZE). `since` drops posts created before the given time. `author`
+    keeps one handler's posts (e.g. "@ABCBank_Support").
+
+    Responses carry an ETag; send it back as If-None-Match to get a 304 when
+    nothing has changed.
+    """
+    etag = await posts_etag(db)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    query = select(Post)
 
     # Filter by channel if provided
     if channel_id:
-        query = query.filter(Post.channel_id == channel_id)
+        query = query.where(Post.channel_id == channel_id)
+    if author:
+        query = query.where(Post.author == author)
+    if before_id is not None:
+        query = query.where(Post.id < before_id)
+    if after_id is not None:
+        query = query.where(Post.id > after_id)
+    if since is not None:
+        query = query.where(Post.created_at >= since)
 
-    posts = query.order_by(Post.created_at.desc()).all()
+    # Catching up from after_id takes the posts closest to it, not the newest
+    if after_id is not None and before_id is None:
+        query = query.order_by(Post.id.asc())
+    else:
+        query = query.order_by(Post.id.desc())
+    if limit is None and (before_id is not None or after_id is not None):
+        limit = PAGE_SIZE
+    if limit is not None:
+        query = query.limit(limit)
+    posts = list(await db.scalars(query))
+    posts.sort(key=lambda p: p.id, reverse=True)
 
     result = []
     for post in posts:
-        reaction_count = (
-            db.query(func.count(Reaction.id))
-            .filter(Reaction.post_id == post.id)
-            .scalar()
-        )
-
-        comment_count = (
-            db.query(func.count(Comment.id))
-            .filter(Comment.post_id == post.id)
-            .scalar()
-        )
-
+        # Counters are maintained on write; no aggregation over reactions/comments here
         result.append({
             "id": post.id,
             "content": post.content,
@@ -64,8 +120,9 @@ def get_posts(channel_id: Optional[str] = None, db: Session = Depends(get_db)):
             "created_at": post.created_at,
             "scheduled_at": post.scheduled_at,
             "channel_id": post.channel_id,
-            "reaction_count": reaction_count,
-            "comment_count": comment_count,
+            "reaction_count": post.reaction_count,
+            "comment_count": post.comment_count,
+            "reaction_counts": post.reaction_counts or {},
         })
 
-    return result
\ No newline at end of file
+    return FastJSONResponse(result, headers=etag_headers(etag))
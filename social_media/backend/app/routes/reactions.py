@@ -1,28 +1,51 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from ..models import Reaction
-from ..schemas import ReactionCreate
+from collections import Counter, defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..bulk import check_references, read_bulk_items
+from ..counters import bump_reaction_counters, insert_reactions, reaction_buffer
+from ..database import get_db
+from ..models import Post
+from ..schemas import ReactionCreate, ReactionBulkCreate
 
 router = APIRouter(prefix="/reactions")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def insert_reactions_bulk(db: AsyncSession, items):
+    """Insert reaction rows and update post counters in one transaction"""
+    pending = defaultdict(Counter)
+    for item in items:
+        pending[item.post_id][item.emoji] += 1
+    # Keep the periodic flusher out while we rewrite the same counters
+    async with reaction_buffer.flush_lock:
+        ids = await insert_reactions(db, [item.model_dump() for item in items])
+        await bump_reaction_counters(db, pending)
+        await db.commit()
+    return ids
+
+
+@router.post("/bulk")
+async def react_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Records many reactions in a single transaction, bypassing the coalescing
+    buffer. The body is a JSON array or NDJSON stream of {post_id, emoji};
+    an unknown post_id rejects the whole batch with 422.
+    """
+    items = await read_bulk_items(request, ReactionBulkCreate)
+    ids = []
+    if items:
+        await check_references(db, items)
+        ids = await insert_reactions_bulk(db, items)
+    return {"status": "ok", "count": len(ids), "ids": ids}
+
 
 @router.post("/{post_id}")
-def react_to_post(
+async def react_to_post(
     post_id: int,
     data: ReactionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    reaction = Reaction(
-        post_id=post_id,
-        emoji=data.emoji
-    )
-    db.add(reaction)
-    db.commit()
+    # Checked now: the flush happens after this request has returned
+    if await db.get(Post, post_id) is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    # Coalesced in memory; the row and the post counters are written on the next flush
+    reaction_buffer.add(post_id, data.emoji)
     return {"status": "reacted"}
@@ -0,0 +1,122 @@
+import re
+import sqlite3
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..archive import search_archive
+from ..database import get_db
+from ..search import SEARCH_TABLE
+from ..parsing import parse_author
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+# A quoted phrase (optionally followed by *) or any other run of non-space characters
+TOKEN_RE = re.compile(r'"[^"]*"\*?|\S+')
+OPERATORS = {"AND", "OR", "NOT"}
+
+# created_at is stored by CURRENT_TIMESTAMP in this format
+DB_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def build_match_query(q: str) -> str:
+    """
+    Turns a user query into an FTS5 MATCH expression.
+
+    "quoted words" are phrases, a trailing * makes a prefix query and AND/OR/NOT
+    pass through. Every other word is quoted, so a domain such as
+    mashreq-rewards-portal-update.com is matched as the phrase of its parts.
+    """
+    parts = []
+    for token in TOKEN_RE.findall(q):
+        if token in OPERATORS:
+            parts.append(token)
+            continue
+        prefix = token.endswith("*")
+        term = token.rstrip("*").strip('"').replace('"', '""').strip()
+        if term:
+            parts.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1),
+    type: Optional[str] = Query(None, pattern="^(post|comment)$"),
+    channel_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    include_archive: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search over post content and comment text, best matches first (BM25).
+
+    - `q`: words (all must match), "exact phrases", prefix* terms and AND/OR/NOT.
+    - `type`: only posts or only comments.
+    - `channel_id`, `since`, `until`: restrict by channel and creation time.
+    - `include_archive=true`: after the hot results, also search the archive
+      segments written by retention (ranked within the archive; flagged with
+      `"archived": true`).
+    """
+    match = build_match_query(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="Search query has no terms")
+
+    filters = [f"{SEARCH_TABLE} MATCH :match"]
+    params = {"match": match, "limit": limit, "offset": offset}
+    if type:
+        filters.append("kind = :kind")
+        params["kind"] = type
+    if channel_id:
+        filters.append("channel_id = :channel_id")
+        params["channel_id"] = channel_id
+    if since is not None:
+        filters.append("created_at >= :since")
+        params["since"] = since.strftime(DB_TIME_FORMAT)
+    if until is not None:
+        filters.append("created_at < :until")
+        params["until"] = until.strftime(DB_TIME_FORMAT)
+
+    where = " AND ".join(filters)
+    select_sql = (
+        f"SELECT kind, post_id, comment_id, channel_id, created_at, body, "
+        f"snippet({SEARCH_TABLE}, 0, '[', ']', '…', 16) AS snippet, rank "
+        f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY rank LIMIT :limit OFFSET :offset"
+    )
+    try:
+        rows = [dict(row._mapping) for row in await db.execute(text(select_sql), params)]
+        archived = []
+        if include_archive and len(rows) < limit:
+            # The archive continues the hot ranking: skip what earlier pages showed
+            hot_total = await db.scalar(text(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {where}"), params)
+            skip = max(0, offset - hot_total)
+            take = limit - len(rows)
+            archived = await search_archive(db, select_sql, {**params, "limit": skip + take, "offset": 0},
+                                            since=since, until=until)
+            archived = sorted(archived, key=lambda row: row["rank"])[skip:skip + take]
+    except (OperationalError, sqlite3.OperationalError):
+        raise HTTPException(status_code=400, detail="Invalid search query")
+
+    results = []
+    for row, is_archived in [(row, False) for row in rows] + [(row, True) for row in archived]:
+        results.append({
+            "type": row["kind"],
+            "post_id": row["post_id"],
+            "comment_id": row["comment_id"],
+            "channel_id": row["channel_id"],
+            "author": parse_author(row["body"]),
+            "text": row["body"],
+            "snippet": row["snippet"],
+            "created_at": datetime.fromisoformat(row["created_at"]) if row["created_at"] else None,
+            # FTS5 rank is bm25(), where lower is better; flip it so higher is better
+            "score": round(-row["rank"], 4),
+            "archived": is_archived,
+        })
+
+    return {"query": match, "count": len(results), "results": results}
@@ -13,4 +13,10 @@ class ReactionCreate(BaseModel):
 
 class CommentCreate(BaseModel):
     text: str
-    parent_id: Optional[int] = None
\ No newline at end of file
+    parent_id: Optional[int] = None
+
+class ReactionBulkCreate(ReactionCreate):
+    post_id: int
+
+class CommentBulkCreate(CommentCreate):
+    post_id: int
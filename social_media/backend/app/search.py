@@ -0,0 +1,91 @@
+"""
+Full-text index over post content and comment text.
+
+`search_index` is an FTS5 table kept current by triggers on posts and
+comments, so every write path (single, bulk, clears) is covered without any
+application code. Rowids are derived from the source row (posts 2*id,
+comments 2*id + 1) so the update/delete triggers hit the index by rowid.
+Channel and creation time are stored UNINDEXED for filtering; comments take
+the channel of their post.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+SEARCH_TABLE = "search_index"
+
+SEARCH_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        body,
+        kind UNINDEXED,
+        post_id UNINDEXED,
+        comment_id UNINDEXED,
+        channel_id UNINDEXED,
+        created_at UNINDEXED,
+        tokenize = 'unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_search_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id, comment_id, channel_id, created_at)
+        VALUES (new.id * 2, new.content, 'post', new.id, NULL, new.channel_id, new.created_at);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_search_update AFTER UPDATE OF content, channel_id ON posts BEGIN
+        UPDATE {SEARCH_TABLE} SET body = new.content, channel_id = new.channel_id
+        WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS posts_search_delete AFTER DELETE ON posts BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS comments_search_insert AFTER INSERT ON comments BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id, comment_id, channel_id, created_at)
+        VALUES (
+            new.id * 2 + 1, new.text, 'comment', new.post_id, new.id,
+            (SELECT channel_id FROM posts WHERE id = new.post_id), new.created_at
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS comments_search_update AFTER UPDATE OF text ON comments BEGIN
+        UPDATE {SEARCH_TABLE} SET body = new.text WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS comments_search_delete AFTER DELETE ON comments BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+BACKFILL_SQL = [
+    f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id, comment_id, channel_id, created_at)
+    SELECT id * 2, content, 'post', id, NULL, channel_id, created_at FROM posts
+    """,
+    f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id, comment_id, channel_id, created_at)
+    SELECT c.id * 2 + 1, c.text, 'comment', c.post_id, c.id, p.channel_id, c.created_at
+    FROM comments c LEFT JOIN posts p ON p.id = c.post_id
+    """,
+]
+
+
+def create_search_index(conn: Connection):
+    """Create the FTS table and triggers if missing; index existing rows the first time"""
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": SEARCH_TABLE}
+    ).first()
+    for statement in SEARCH_DDL:
+        conn.execute(text(statement))
+    if not exists:
+        for statement in BACKFILL_SQL:
+            conn.execute(text(statement))
+
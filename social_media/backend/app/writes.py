@@ -0,0 +1,277 @@
+"""
+Post and comment inserts, and optional group commit for single-row writes.
+
+insert_posts / insert_comments stage a batch in the caller's transaction (the
+bulk endpoints and the group-commit writer both use them).
+
+With `writes.group_commit` enabled, create_post and add_comment queue their
+row instead of committing it themselves. One writer task takes up to
+`writes.max_batch` queued rows every `writes.flush_interval_ms` (sooner once
+that many are waiting), inserts them in one transaction and then resolves
+each caller with its row, ids and server defaults filled in. A burst pays one
+commit (and fsync) per batch instead of one per row, at the cost of up to
+one flush interval of added latency.
+
+`writes.durability` sets what a resolved caller can rely on:
+
+- "full": batches commit with synchronous=FULL and survive power loss.
+- "normal": the connection default (WAL + NORMAL); survives an app crash,
+  the last batches may be lost on power loss.
+- "off": synchronous=OFF; the OS decides when data reaches the disk.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, insert, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import config
+from .database import AsyncSessionLocal
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_SYNCHRONOUS = {"full": "FULL", "normal": None, "off": "OFF"}
+
+# Latency samples kept for the percentiles in WriteMetrics.snapshot()
+METRICS_SAMPLES = 2048
+
+
+async def insert_posts(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[Post]:
+    """Insert many posts in the current transaction; returned in input order"""
+    return list(await db.scalars(
+        insert(Post).returning(Post, sort_by_parameter_order=True), rows
+    ))
+
+
+async def insert_comments(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[Comment]:
+    """Insert many comments and bump their posts' comment counters in the current transaction"""
+    comments = list(await db.scalars(
+        insert(Comment).returning(Comment, sort_by_parameter_order=True), rows
+    ))
+    per_post = Counter(row["post_id"] for row in rows)
+    posts = Post.__table__
+    await db.execute(
+        update(posts)
+        .where(posts.c.id == bindparam("b_post_id"))
+        .values(comment_count=posts.c.comment_count + bindparam("b_count")),
+        [{"b_post_id": post_id, "b_count": count} for post_id, count in per_post.items()]
+    )
+    return comments
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_summary(samples: List[float]) -> Dict[str, Optional[float]]:
+    summary = {}
+    for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        value = percentile(samples, q)
+        summary[name] = round(value, 2) if value is not None else None
+    return summary
+
+
+class WriteMetrics:
+    """Throughput and latency of the group-commit writer"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.batches = 0
+        self.rows = 0
+        self.failed_batches = 0
+        self.max_batch_rows = 0
+        self.commit_ms = deque(maxlen=METRICS_SAMPLES)   # one transaction
+        self.wait_ms = deque(maxlen=METRICS_SAMPLES)     # enqueue -> caller resolved
+        self._recent = deque()                           # (monotonic time, rows) of the last minute
+
+    def record_batch(self, rows: int, commit_ms: float):
+        now = time.monotonic()
+        self.batches += 1
+        self.rows += rows
+        self.max_batch_rows = max(self.max_batch_rows, rows)
+        self.commit_ms.append(commit_ms)
+        self._recent.append((now, rows))
+        while self._recent and self._recent[0][0] < now - 60:
+            self._recent.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        recent = [rows for at, rows in self._recent if at >= now - 60]
+        window = min(60.0, now - self.started_at) or 1.0
+        commit_ms, wait_ms = list(self.commit_ms), list(self.wait_ms)
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "failed_batches": self.failed_batches,
+            "avg_batch_rows": round(self.rows / self.batches, 1) if self.batches else 0,
+            "max_batch_rows": self.max_batch_rows,
+            "rows_per_s_1m": round(sum(recent) / window, 1),
+            "commit_ms": latency_summary(commit_ms),
+            "wait_ms": latency_summary(wait_ms),
+        }
+
+
+@dataclass
+class PendingWrite:
+    kind: str  # "post" or "comment"
+    values: Dict[str, Any]
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class GroupCommitWriter:
+    """Queues single-row post/comment inserts and commits them in batches"""
+
+    def __init__(self, enabled: bool, flush_interval_ms: int, max_batch: int, durability: str,
+                 session_factory=AsyncSessionLocal):
+        if durability not in DURABILITY_SYNCHRONOUS:
+            raise ValueError(f"writes.durability must be one of {sorted(DURABILITY_SYNCHRONOUS)}")
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self.durability = durability
+        self.session_factory = session_factory
+        self.metrics = WriteMetrics()
+        self._pending: List[PendingWrite] = []
+        # Held while writing, so stop() waits for a batch already in flight
+        self._flush_lock = asyncio.Lock()
+        self._has_pending: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def submit_post(self, values: Dict[str, Any]) -> Post:
+        """Queue a post; returns it once its batch has committed"""
+        return await self._submit("post", values)
+
+    async def submit_comment(self, values: Dict[str, Any]) -> Comment:
+        """Queue a comment (values include post_id); returns it once its batch has committed"""
+        return await self._submit("comment", values)
+
+    async def _submit(self, kind: str, values: Dict[str, Any]):
+        write = PendingWrite(kind, values, asyncio.get_running_loop().create_future())
+        self._pending.append(write)
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await write.future
+
+    async def flush(self) -> int:
+        """Write up to max_batch queued rows. Returns the number written."""
+        async with self._flush_lock:
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        batch = self._pending[:self.max_batch]
+        del self._pending[:len(batch)]
+        if len(self._pending) < self.max_batch:
+            self._full.clear()
+        if not self._pending:
+            self._has_pending.clear()
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            results = await self._write(batch)
+        except Exception as e:
+            # Retry row by row so one bad row only fails its own caller
+            self.metrics.failed_batches += 1
+            logger.error(f"Group commit of {len(batch)} rows failed, retrying individually: {e}")
+            for write in batch:
+                try:
+                    self._resolve(write, (await self._write([write]))[0])
+                except Exception as row_error:
+                    if not write.future.done():
+                        write.future.set_exception(row_error)
+            return 0
+
+        self.metrics.record_batch(len(batch), (time.perf_counter() - started) * 1000)
+        for write, row in zip(batch, results):
+            self._resolve(write, row)
+        return len(batch)
+
+    def _resolve(self, write: PendingWrite, row):
+        self.metrics.wait_ms.append((time.perf_counter() - write.queued_at) * 1000)
+        if not write.future.done():
+            write.future.set_result(row)
+
+    async def _write(self, batch: List[PendingWrite]) -> list:
+        """One transaction for the batch; rows come back in batch order"""
+        post_writes = [w for w in batch if w.kind == "post"]
+        comment_writes = [w for w in batch if w.kind == "comment"]
+        synchronous = DURABILITY_SYNCHRONOUS[self.durability]
+        async with self.session_factory() as db:
+            if synchronous:
+                await db.execute(text(f"PRAGMA synchronous={synchronous}"))
+            try:
+                rows = {}
+                # Posts first: a comment may belong to a post in the same batch
+                if post_writes:
+                    posts = await insert_posts(db, [w.values for w in post_writes])
+                    rows.update(zip(map(id, post_writes), posts))
+                if comment_writes:
+                    comments = await insert_comments(db, [w.values for w in comment_writes])
+                    rows.update(zip(map(id, comment_writes), comments))
+                await db.commit()
+            finally:
+                if synchronous:
+                    await db.execute(text(f"PRAGMA synchronous={config.sqlite_synchronous}"))
+        return [rows[id(w)] for w in batch]
+
+    async def _run(self):
+        while True:
+            await self._has_pending.wait()
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                # Shielded: cancelling the writer must not abandon a batch mid-transaction
+                await asyncio.shield(self.flush())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Group commit writer error: {e}")
+
+    def start(self):
+        """Start the writer on the running event loop (no-op unless enabled)"""
+        if not self.enabled:
+            return
+        self._has_pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer and commit whatever is still queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            while self._pending:
+                await self.flush()
+
+
+# Global group-commit writer
+write_buffer = GroupCommitWriter(
+    enabled=config.group_commit_enabled,
+    flush_interval_ms=config.group_commit_flush_interval_ms,
+    max_batch=config.group_commit_max_batch,
+    durability=config.group_commit_durability,
+)
@@ -0,0 +1,100 @@
+"""
+Benchmark peak memory of /api/export: the JSON body built from
+format_db_state vs the NDJSON stream (iter_db_state -> ndjson_chunks).
+
+Builds a throwaway SQLite database for each size and measures the Python heap
+peak with tracemalloc while each body is produced. The JSON peak grows with
+the database; the NDJSON peak should stay flat. Both must carry the same posts.
+
+Usage (from social_media/backend):
+    python scripts/benchmark_export_memory.py
+    python scripts/benchmark_export_memory.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.responses import FastJSONResponse, dumps, ndjson_chunks
+from app.routes.api_index import format_db_state, iter_db_state
+from benchmark_format_db_state import build_database
+
+
+async def json_body(Session):
+    """Digest of each post as a line, from the full list the JSON body is built from"""
+    async with Session() as db:
+        posts = await format_db_state(db)
+        body = FastJSONResponse(posts).body
+        digest = hashlib.sha256()
+        for post in posts:
+            digest.update(dumps(post) + b"\n")
+    return len(body), digest.hexdigest()
+
+
+async def ndjson_body(Session):
+    async with Session() as db:
+        size, digest = 0, hashlib.sha256()
+        async for chunk in ndjson_chunks(iter_db_state(db)):
+            size += len(chunk)
+            digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+def measure(fn, path: str):
+    async def go():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        Session = async_sessionmaker(engine, class_=AsyncSession)
+        try:
+            return await fn(Session)
+        finally:
+            await engine.dispose()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = asyncio.run(go())
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run(num_comments: int) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path, num_comments)
+        json_s, json_peak, (json_bytes, json_digest) = measure(json_body, path)
+        ndjson_s, ndjson_peak, (ndjson_bytes, ndjson_digest) = measure(ndjson_body, path)
+
+    same = json_digest == ndjson_digest
+    mb = 1024 * 1024
+    print(
+        f"{num_comments:>9,} comments | json {json_s:6.2f}s peak {json_peak / mb:8.1f}MB ({json_bytes / mb:6.1f}MB body) | "
+        f"ndjson {ndjson_s:6.2f}s peak {ndjson_peak / mb:6.1f}MB ({ndjson_bytes / mb:6.1f}MB streamed) | "
+        f"same posts: {'yes' if same else 'NO'}"
+    )
+    return same
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="comment counts to benchmark")
+    args = parser.parse_args()
+
+    print("/api/export peak memory: JSON list vs NDJSON stream")
+    results = [run(size) for size in args.sizes]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
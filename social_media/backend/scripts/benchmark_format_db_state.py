@@ -0,0 +1,195 @@
+"""
+Benchmark format_db_state: legacy per-post comment queries vs the chunked,
+single-pass thread builder.
+
+Builds a throwaway SQLite database for each size, times both versions and
+checks that they serialize to byte-identical JSON.
+
+Without an index on comments.post_id every legacy per-post query is a full
+table scan, so the legacy run grows quadratically (~80s at 100k comments) and
+is skipped above --legacy-limit.
+
+Usage (from social_media/backend):
+    python scripts/benchmark_format_db_state.py
+    python scripts/benchmark_format_db_state.py --sizes 10000 100000 --legacy-limit 100000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base
+from app.models import Post, Comment
+from app.parsing import comment_body, parse_author, post_body
+from app.routes.api_index import format_db_state
+
+COMMENTS_PER_POST = 10
+REPLY_RATIO = 0.3
+
+
+def legacy_format_db_state(db):
+    """The original implementation: one comment query per post, recursive flatten."""
+    all_posts = db.query(Post).order_by(Post.created_at.asc()).all()
+    output_data = []
+    for post in all_posts:
+        post_data = {
+            "post_id": post.id,
+            "channel": post.channel_id,
+            "author": parse_author(post.content),
+            "content": post.content.split("\n\n", 1)[-1],
+            "timestamp": post.created_at.strftime("%d-%m-%Y %H:%M:%S"),
+            "comments": []
+        }
+        comments_query = db.query(Comment).filter(Comment.post_id == post.id).order_by(Comment.created_at.asc()).all()
+        comment_map = {
+            c.id: {
+                "db_id": c.id, "json_comment_id": c.id, "parent_db_id": c.parent_id,
+                "handler_id": parse_author(c.text), "type": "reply" if c.parent_id else "comment",
+                "comment": c.text.split(": ", 1)[-1],
+                "timestamp": c.created_at.strftime("%d-%m-%Y %H:%M:%S"),
+                "replies": []
+            } for c in comments_query
+        }
+        root_comments = []
+        for c_data in comment_map.values():
+            if c_data["parent_db_id"]:
+                parent = comment_map.get(c_data["parent_db_id"])
+                if parent: parent["replies"].append(c_data)
+            else:
+                root_comments.append(c_data)
+
+        def flatten_comments(comments_list):
+            flat_list = []
+            for c in comments_list:
+                parent_id = comment_map[c['parent_db_id']]['json_comment_id'] if c['parent_db_id'] else None
+                flat_list.append({
+                    "comment_id": c['json_comment_id'], "parent_comment_id": parent_id,
+                    "handler_id": c['handler_id'], "type": c['type'], "comment": c['comment'],
+                    "timestamp": c['timestamp'],
+                })
+                flat_list.extend(flatten_comments(c['replies']))
+            return flat_list
+
+        post_data["comments"] = flatten_comments(root_comments)
+        output_data.append(post_data)
+    return output_data
+
+
+def build_database(path: str, num_comments: int):
+    """Creates the schema and fills it with synthetic posts, comments and replies."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    rng = random.Random(42)
+    start = datetime(2026, 1, 1)
+    num_posts = max(num_comments // COMMENTS_PER_POST, 1)
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO posts (id, content, author, body, channel_id, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (i, content, parse_author(content), post_body(content), f"channel-{i % 6}",
+             (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"))
+            for i in range(1, num_posts + 1)
+            for content in [f"@User{i % 97} says: synthetic post {i}"]
+        ),
+    )
+
+    comments_by_post = {}
+    rows = []
+    for cid in range(1, num_comments + 1):
+        post_id = rng.randint(1, num_posts)
+        siblings = comments_by_post.setdefault(post_id, [])
+        parent_id = rng.choice(siblings) if siblings and rng.random() < REPLY_RATIO else None
+        siblings.append(cid)
+        created = start + timedelta(seconds=num_posts + cid // 3)
+        comment_text = f"@Commenter{cid % 53} says: comment {cid}"
+        rows.append((cid, post_id, parent_id, comment_text, parse_author(comment_text), comment_body(comment_text),
+                     created.strftime("%Y-%m-%d %H:%M:%S")))
+    conn.executemany(
+        "INSERT INTO comments (id, post_id, parent_id, text, author, body, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_call(fn, db):
+    started = time.perf_counter()
+    result = fn(db)
+    return time.perf_counter() - started, result
+
+
+async def time_format_db_state(path: str):
+    """Time the app's async format_db_state against the same database file"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, class_=AsyncSession)
+    async with Session() as db:
+        started = time.perf_counter()
+        result = await format_db_state(db)
+        seconds = time.perf_counter() - started
+    await engine.dispose()
+    return seconds, result
+
+
+def run(num_comments: int, legacy_limit: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path, num_comments)
+
+        engine = create_engine(f"sqlite:///{path}")
+        Session = sessionmaker(bind=engine)
+
+        legacy_result = None
+        if num_comments <= legacy_limit:
+            with Session() as db:
+                legacy_seconds, legacy_result = time_call(legacy_format_db_state, db)
+        engine.dispose()
+        new_seconds, new_result = asyncio.run(time_format_db_state(path))
+
+    if legacy_result is None:
+        print(
+            f"{num_comments:>9,} comments | legacy  skipped | "
+            f"single-pass {new_seconds:8.2f}s"
+        )
+        return True
+
+    identical = json.dumps(legacy_result, indent=2) == json.dumps(new_result, indent=2)
+    print(
+        f"{num_comments:>9,} comments | legacy {legacy_seconds:8.2f}s | "
+        f"single-pass {new_seconds:8.2f}s | speedup {legacy_seconds / new_seconds:6.1f}x | "
+        f"identical JSON: {'yes' if identical else 'NO'}"
+    )
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="comment counts to benchmark")
+    parser.add_argument("--legacy-limit", type=int, default=100_000,
+                        help="skip the legacy implementation above this many comments")
+    args = parser.parse_args()
+
+    print(f"format_db_state benchmark ({COMMENTS_PER_POST} comments/post, {REPLY_RATIO:.0%} replies)")
+    results = [run(size, args.legacy_limit) for size in args.sizes]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark single-row post creation: one commit per post (create_post's
+default path) vs the group-commit writer, under concurrent callers.
+
+Each run creates a throwaway SQLite database with the app's pragmas, fires
+--posts creations from --concurrency concurrent tasks (each post also gets one
+comment, like a campaign burst) and reports rows/s and per-call latency for
+every durability setting. Group commit must store every row; per-row commits
+that give up with "database is locked" are counted instead.
+
+Usage (from social_media/backend):
+    python scripts/benchmark_group_commit.py
+    python scripts/benchmark_group_commit.py --posts 5000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.database import Base, set_sqlite_pragmas
+from app.models import Comment, Post
+from app.writes import DURABILITY_SYNCHRONOUS, GroupCommitWriter, percentile
+
+
+async def per_row_commit(Session, i: int):
+    """What create_post + add_comment do without group commit"""
+    async with Session() as db:
+        post = Post(content=f"@Bench says: post {i}", channel_id=f"channel-{i % 6}")
+        db.add(post)
+        await db.commit()
+        await db.refresh(post)
+        db.add(Comment(post_id=post.id, text=f"@Bench says: comment {i}"))
+        await db.execute(
+            update(Post).where(Post.id == post.id).values(comment_count=Post.comment_count + 1)
+        )
+        await db.commit()
+
+
+def group_commit(writer: GroupCommitWriter):
+    async def create(Session, i: int):
+        post = await writer.submit_post({
+            "content": f"@Bench says: post {i}", "image_url": None,
+            "channel_id": f"channel-{i % 6}", "scheduled_at": None,
+        })
+        await writer.submit_comment({"post_id": post.id, "text": f"@Bench says: comment {i}", "parent_id": None})
+    return create
+
+
+async def run_burst(path: str, posts: int, concurrency: int, durability: str = None):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    writer = None
+    if durability is None:
+        create = per_row_commit
+    else:
+        writer = GroupCommitWriter(True, config.group_commit_flush_interval_ms,
+                                   config.group_commit_max_batch, durability, session_factory=Session)
+        writer.start()
+        create = group_commit(writer)
+
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(posts):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await create(Session, i)
+            except OperationalError:  # "database is locked" once busy_timeout runs out
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    if writer:
+        await writer.stop()
+
+    async with Session() as db:
+        stored = (await db.scalar(select(func.count(Post.id))), await db.scalar(select(func.count(Comment.id))))
+    await engine.dispose()
+    return seconds, latencies, errors, stored, writer.metrics.snapshot() if writer else None
+
+
+def run(posts: int, concurrency: int) -> bool:
+    print(f"{posts:,} posts + {posts:,} comments, {concurrency} concurrent callers")
+    ok = True
+    for durability in [None, *DURABILITY_SYNCHRONOUS]:
+        with tempfile.TemporaryDirectory() as tmp:
+            seconds, latencies, errors, stored, metrics = asyncio.run(
+                run_burst(os.path.join(tmp, "bench.db"), posts, concurrency, durability)
+            )
+        label = "per-row commit" if durability is None else f"group ({durability})"
+        if durability is not None:
+            ok = ok and stored == (posts, posts) and not errors
+        line = (
+            f"  {label:<16} {sum(stored) / seconds:9,.0f} rows/s | call p50 {percentile(latencies, 0.5):7.2f}ms "
+            f"p95 {percentile(latencies, 0.95):7.2f}ms"
+        )
+        if metrics:
+            line += f" | {metrics['batches']:,} batches, avg {metrics['avg_batch_rows']} rows"
+        if errors:
+            line += f" | {errors:,} calls failed (database is locked)"
+        print(line + f" | stored {stored[0]:,}/{stored[1]:,}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=2000, help="posts to create (each gets one comment)")
+    parser.add_argument("--concurrency", type=int, default=100, help="concurrent callers")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.posts, args.concurrency) else 1)
+
+
+if __name__ == "__main__":
+    main()
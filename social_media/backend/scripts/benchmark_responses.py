@@ -0,0 +1,116 @@
+"""
+Benchmark response encoding for /api/sync and /posts/: FastAPI's default
+(jsonable_encoder + json.dumps, uncompressed) vs FastJSONResponse plus
+gzip/brotli from CompressionMiddleware.
+
+Builds a throwaway SQLite database for each size, loads the same payloads the
+endpoints return (sync page of up to 5000 posts, /posts/ page of 1000) and
+reports serialization time and bytes on the wire for each encoding. Both
+encoders must produce the same JSON document.
+
+Usage (from social_media/backend):
+    python scripts/benchmark_responses.py
+    python scripts/benchmark_responses.py --sizes 10000 100000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.models import Post
+from app.responses import FastJSONResponse, orjson
+from app.routes.api_index import collect_changes
+from benchmark_format_db_state import build_database
+from shared.compression import brotli
+
+
+async def load_payloads(path: str):
+    """The dicts sync_data and get_posts hand to their response classes"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, class_=AsyncSession)
+    async with Session() as db:
+        posts, next_post_id, next_comment_id, has_more = await collect_changes(db, 0, 0, 5000)
+        sync_payload = {"consumer": None, "cursor": "benchmark", "has_more": has_more, "posts": posts}
+        rows = await db.scalars(select(Post).order_by(Post.id.desc()).limit(1000))
+        posts_payload = [
+            {
+                "id": post.id, "content": post.content, "image_url": post.image_url,
+                "created_at": post.created_at, "scheduled_at": post.scheduled_at,
+                "channel_id": post.channel_id, "reaction_count": post.reaction_count,
+                "comment_count": post.comment_count, "reaction_counts": post.reaction_counts or {},
+            }
+            for post in rows
+        ]
+    await engine.dispose()
+    return {"/api/sync": sync_payload, "/posts/": posts_payload}
+
+
+def best_of(repeat: int, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(endpoint: str, payload, repeat: int) -> bool:
+    legacy_s, legacy_body = best_of(repeat, lambda: JSONResponse(jsonable_encoder(payload)).body)
+    fast_s, fast_body = best_of(repeat, lambda: FastJSONResponse(payload).body)
+    identical = json.loads(legacy_body) == json.loads(fast_body)
+
+    gzip_s, gzipped = best_of(repeat, lambda: gzip.compress(fast_body, config.compression_gzip_level))
+    print(
+        f"  {endpoint:<10} default {legacy_s * 1000:8.1f}ms {len(legacy_body):>11,}B | "
+        f"fast {fast_s * 1000:7.1f}ms ({legacy_s / fast_s:4.1f}x) | "
+        f"gzip {len(gzipped):>10,}B (+{gzip_s * 1000:.1f}ms)"
+        + (
+            f" | br {len(brotli.compress(fast_body, quality=config.compression_brotli_quality)):>10,}B"
+            if brotli is not None else ""
+        )
+        + f" | same JSON: {'yes' if identical else 'NO'}"
+    )
+    return identical
+
+
+def run(num_comments: int, repeat: int) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path, num_comments)
+        payloads = asyncio.run(load_payloads(path))
+    print(f"{num_comments:,} comments")
+    return all([report(endpoint, payload, repeat) for endpoint, payload in payloads.items()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="comment counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(
+        f"Response encoding benchmark (encoder: {'orjson' if orjson is not None else 'json'}, "
+        f"brotli: {'yes' if brotli is not None else 'not installed'})"
+    )
+    results = [run(size, args.repeat) for size in args.sizes]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
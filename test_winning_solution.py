@@ -44,7 +44,7 @@ async def test_complete_flow():
         async with httpx.AsyncClient(timeout=10.0) as client:
             response = await client.get("http://localhost:8001/api/sync")
             if response.status_code == 200:
-                posts = response.json()  # /api/sync returns list directly
+                posts = response.json().get('posts', [])  # no cursor -> first page of everything
                 print(f"✅ Social media platform running: {len(posts)} posts available")
                 
                 # Show sample posts